@@ -5,10 +5,13 @@ sleep 10s
 echo "Migrating database..."
 python manage.py makemigrations
 python manage.py migrate
+python manage.py createcachetable
 
 echo "Seeding database..."
 python src/api/seeds/create_fixtures.py
 /bin/bash docker/seeds.sh
+python manage.py recount_garages
 
-echo "Migrations and seeding completed. Starting up server..."
-gunicorn src.core.wsgi:application -b 0.0.0.0:8000 --reload
+echo "Migrations and seeding completed. Starting up job worker and server..."
+python manage.py run_jobs &
+gunicorn src.core.asgi:application -k uvicorn.workers.UvicornWorker -b 0.0.0.0:8000 --reload
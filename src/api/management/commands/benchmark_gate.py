@@ -0,0 +1,192 @@
+from collections import Counter
+from datetime import timedelta
+from secrets import token_hex
+from time import perf_counter
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from src.api.models import (
+    Charge,
+    Garage,
+    GarageSettings,
+    LicencePlate,
+    Location,
+    ParkingLot,
+    Price,
+    Reservation,
+)
+from src.api.views import LicencePlateRPiView
+from src.users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Command which benchmarks the decisions of the gate in a large garage. A garage with
+    `--lots` parking lots, most of which are occupied, is created in a transaction which is
+    rolled back afterwards. Then `--cars` licence plates enter and leave the garage, half of
+    them with a reservation, through the decision path of `LicencePlateRPiView`. The user
+    pays automatically, and every car stays for an hour, thus every exit records a charge.
+
+    The time until the response is ready is reported separately from the time of the writes
+    which are done after the response is sent. The authentication of the request is not
+    part of the measurement.
+    """
+
+    help = "Benchmarks the entry and exit decisions of the gate in a large garage."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--lots", type=int, default=1000)
+        parser.add_argument("--cars", type=int, default=200)
+        parser.add_argument(
+            "--target", type=float, default=50.0, help="Target p99 in milliseconds."
+        )
+
+    def handle(self, *args, **options) -> None:
+        # Closing the response closes the database connection as well, which would end
+        # the transaction of the benchmark.
+        request_finished.disconnect(close_old_connections)
+        try:
+            with transaction.atomic():
+                decisions, side_effects, statuses, exits, charges = self._run(
+                    options["lots"], options["cars"]
+                )
+                transaction.set_rollback(True)
+        finally:
+            request_finished.connect(close_old_connections)
+        for name, timings in [
+            ("decision", decisions),
+            ("after response", side_effects),
+        ]:
+            self.stdout.write(
+                f"{name}: p50 {_percentile(timings, 50):.1f} ms, "
+                f"p99 {_percentile(timings, 99):.1f} ms, max {max(timings):.1f} ms "
+                f"({len(timings)} requests)"
+            )
+        self.stdout.write(
+            "statuses: "
+            + ", ".join(f"{code}: {n}" for code, n in sorted(statuses.items()))
+        )
+        self.stdout.write(f"exits: {exits}, charges: {charges}")
+        if exits != options["cars"] or charges != options["cars"]:
+            raise CommandError(
+                f"{exits} of {options['cars']} cars left the garage with {charges} "
+                "charges, thus the timings don't cover every exit."
+            )
+        p99 = _percentile(decisions, 99)
+        if p99 <= options["target"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"p99 of {p99:.1f} ms within {options['target']} ms."
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.ERROR(f"p99 of {p99:.1f} ms exceeds {options['target']} ms.")
+            )
+
+    def _run(
+        self, lots: int, cars: int
+    ) -> tuple[list[float], list[float], Counter, int, int]:
+        now = timezone.now()
+        owner = User.objects.create(email=f"{token_hex(8)}@benchmark.com", role=2)
+        user = User.objects.create(
+            email=f"{token_hex(8)}@benchmark.com",
+            role=1,
+            stripe_identifier="benchmark",
+        )
+        location = Location.objects.create(
+            country="BE",
+            province="VBR",
+            municipality="Leuven",
+            post_code=3000,
+            street="Benchmarkstraat",
+            number=1,
+        )
+        garage = Garage.objects.create(
+            user=owner,
+            name="Benchmark",
+            garage_settings=GarageSettings.objects.create(
+                location=location,
+                max_height=2,
+                max_width=2,
+                max_handicapped_lots=0,
+            ),
+        )
+        Price.objects.create(
+            garage=garage,
+            price_string="Benchmark",
+            price=1,
+            stripe_identifier="benchmark",
+        )
+        pls = ParkingLot.objects.bulk_create(
+            ParkingLot(
+                garage=garage,
+                parking_lot_no=i,
+                floor_number=0,
+                occupied=i < lots * 0.8,
+            )
+            for i in range(lots)
+        )
+        lps = LicencePlate.objects.bulk_create(
+            LicencePlate(user=user, licence_plate=f"1BEN{i:03d}", enabled=True)
+            for i in range(cars)
+        )
+        Reservation.objects.bulk_create(
+            Reservation(
+                garage=garage,
+                user=user,
+                licence_plate=lp,
+                parking_lot=pls[-(i % (lots // 5)) - 1],
+                from_date=now - timedelta(minutes=10),
+                to_date=now + timedelta(hours=2),
+            )
+            for i, lp in enumerate(lps[::2])
+        )
+        Garage.objects.recount(garage.pk)
+
+        view = LicencePlateRPiView()
+        decisions: list[float] = []
+        side_effects: list[float] = []
+        statuses: Counter = Counter()
+        for lp in lps:
+            # Enter and leave the garage.
+            for leaving in (False, True):
+                if leaving:
+                    # The car stayed for an hour, thus it's charged when it leaves.
+                    LicencePlate.objects.filter(pk=lp.pk).update(
+                        entered_at=now - timedelta(hours=1)
+                    )
+                    # The exit is read right after the entry, thus the decision of the
+                    # entry is forgotten such that the exit isn't debounced. The version
+                    # of the cached licence plate is replaced once the writes are
+                    # committed, which never happens in the transaction of the benchmark,
+                    # thus it's removed here.
+                    cache.delete_many(
+                        [
+                            f"gate:{garage.pk}:{lp.licence_plate}",
+                            f"plates:{lp.licence_plate}:version",
+                        ]
+                    )
+                start = perf_counter()
+                response = view.handle_licence_plate(
+                    {"licence_plate": lp.licence_plate, "garage_id": garage.pk}
+                )
+                decisions.append((perf_counter() - start) * 1000)
+                statuses[response.status_code] += 1
+                start = perf_counter()
+                response.close()
+                side_effects.append((perf_counter() - start) * 1000)
+        exits = LicencePlate.objects.filter(
+            pk__in=[lp.pk for lp in lps], garage=None
+        ).count()
+        charges = Charge.objects.filter(garage=garage).count()
+        return decisions, side_effects, statuses, exits, charges
+
+
+def _percentile(timings: list[float], percentile: int) -> float:
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, len(timings) * percentile // 100)]
@@ -0,0 +1,126 @@
+import random
+import string
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from src.core.settings import PLATE_MATCH_DISTANCE
+from src.core.utils import PlateIndex
+from src.core.utils.plate_index import CONFUSABLE_CHARACTERS
+
+
+class Command(BaseCommand):
+    """
+    Command which benchmarks the matching of misread licence plates. An index over
+    `--plates` random licence plates is built in memory, after which `--reads` reads are
+    matched: registered plates with one or two confusable characters swapped, registered
+    plates with another character misread, unregistered plates, and unregistered plates
+    which differ from a registered plate in a letter or digit which looks alike, like
+    `1ABD123` for `1ABO123`.
+
+    Per kind of read, the share of reads which is matched with the right plate, with a
+    wrong plate or not at all is reported, together with the latency of the lookups. An
+    unregistered plate is right if it isn't matched.
+    """
+
+    help = "Benchmarks the matching of misread licence plates."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--plates", type=int, default=100_000)
+        parser.add_argument("--reads", type=int, default=10_000)
+        parser.add_argument("--distance", type=float, default=PLATE_MATCH_DISTANCE)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options) -> None:
+        rng = random.Random(options["seed"])
+        plates = set()
+        while len(plates) < options["plates"]:
+            plates.add(_random_plate(rng))
+        registered = list(plates)
+
+        start = perf_counter()
+        index = PlateIndex(options["distance"], registered)
+        self.stdout.write(
+            f"Indexed {len(index)} plates in {perf_counter() - start:.2f} s, "
+            f"max distance {options['distance']}."
+        )
+
+        # Per kind, the read of a registered plate and the plate it should be matched with.
+        kinds = {
+            "confused": lambda plate: (_confuse(rng, plate, rng.randint(1, 2)), plate),
+            "misread": lambda plate: (_misread(rng, plate), plate),
+            "unregistered": lambda _: (_random_plate(rng), None),
+            "neighbour": lambda plate: (_neighbour(rng, plate), None),
+        }
+        for kind, read in kinds.items():
+            counts = {"right": 0, "wrong": 0, "none": 0}
+            timings = []
+            for _ in range(options["reads"]):
+                misread, expected = read(rng.choice(registered))
+                if misread in plates:
+                    continue
+                start = perf_counter()
+                match = index.match(misread)
+                timings.append((perf_counter() - start) * 1000)
+                if match == expected:
+                    counts["right"] += 1
+                else:
+                    counts["none" if match is None else "wrong"] += 1
+            timings.sort()
+            total = len(timings)
+            self.stdout.write(
+                f"{kind:>12}: "
+                + ", ".join(f"{k} {v / total:.1%}" for k, v in counts.items())
+                + f" | p50 {_percentile(timings, 50):.3f} ms,"
+                f" p99 {_percentile(timings, 99):.3f} ms,"
+                f" max {timings[-1]:.3f} ms ({total} reads)"
+            )
+
+
+def _random_plate(rng: random.Random) -> str:
+    return (
+        rng.choice("12345678")
+        + "".join(rng.choices(string.ascii_uppercase, k=3))
+        + "".join(rng.choices(string.digits, k=3))
+    )
+
+
+def _confuse(rng: random.Random, plate: str, swaps: int) -> str:
+    """
+    Returns `plate` with up to `swaps` characters replaced by one they're confused with.
+    """
+    confused = {a: b for pair in CONFUSABLE_CHARACTERS for a, b in (pair, pair[::-1])}
+    positions = [i for i, c in enumerate(plate) if c in confused]
+    chars = list(plate)
+    for i in rng.sample(positions, min(swaps, len(positions))):
+        chars[i] = confused[chars[i]]
+    return "".join(chars)
+
+
+# Letters and digits which look alike, but are all valid at their position.
+_LOOKALIKES = ["ODQ", "IL", "EF", "MN", "UV", "38", "17", "69"]
+
+
+def _neighbour(rng: random.Random, plate: str) -> str:
+    """
+    Returns `plate` with a character replaced by one which looks alike and has the same
+    class, or a random plate if it has none.
+    """
+    groups = {c: group for group in _LOOKALIKES for c in group}
+    positions = [i for i, c in enumerate(plate) if c in groups]
+    if not positions:
+        return _random_plate(rng)
+    i = rng.choice(positions)
+    return (
+        plate[:i] + rng.choice(groups[plate[i]].replace(plate[i], "")) + plate[i + 1 :]
+    )
+
+
+def _misread(rng: random.Random, plate: str) -> str:
+    i = rng.randrange(len(plate))
+    alphabet = string.digits if plate[i].isdigit() else string.ascii_uppercase
+    return plate[:i] + rng.choice(alphabet.replace(plate[i], "")) + plate[i + 1 :]
+
+
+def _percentile(timings: list[float], percentile: int) -> float:
+    return timings[min(len(timings) - 1, len(timings) * percentile // 100)]
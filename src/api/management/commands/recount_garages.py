@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from src.api.models import Garage
+
+
+class Command(BaseCommand):
+    """
+    Command which recomputes the counters of the garages from the parking lots, reservations
+    and licence plates in the database. Run it after loading fixtures or when the counters
+    are suspected to be out of sync.
+    """
+
+    help = (
+        "Recomputes the counters of all garages, or of the garages with the given pks."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("garage_pks", nargs="*", type=int)
+
+    def handle(self, *args, **options) -> None:
+        garage_pks = options["garage_pks"] or Garage.objects.values_list(
+            "pk", flat=True
+        )
+        for pk in garage_pks:
+            Garage.objects.recount(pk)
+            garage = Garage.objects.get(pk=pk)
+            self.stdout.write(
+                f"Garage {pk}: {garage.parking_lots_count} parking lots, "
+                f"{garage.occupied_count} occupied, {garage.booked_count} booked, "
+                f"{garage.disabled_count} disabled, {garage.entered} entered."
+            )
@@ -0,0 +1,42 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from src.api.models import Job
+
+
+class Command(BaseCommand):
+    """
+    Command which runs the jobs enqueued by the requests, see `src.core.utils.jobs`. Multiple
+    workers can run at the same time, as every job is claimed by a single worker.
+    """
+
+    help = "Runs the background jobs until stopped, or until no job is due with --once."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--once", action="store_true")
+        parser.add_argument("--batch", type=int, default=10)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when no job is due.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        while True:
+            close_old_connections()
+            jobs = Job.objects.claim(options["batch"])
+            for job in jobs:
+                pk = job.pk
+                if Job.objects.run(job):
+                    self.stdout.write(f"Job {pk} ({job.task}) succeeded.")
+                else:
+                    self.stderr.write(
+                        f"Job {pk} ({job.task}) failed on attempt {job.attempts}."
+                    )
+            if not jobs:
+                if options["once"]:
+                    return
+                sleep(options["interval"])
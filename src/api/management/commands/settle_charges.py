@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from src.api.models import Charge
+from src.users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Command which settles the pending charges of all users with Stripe, for the charges of
+    which the job failed permanently, see `src.api.tasks.settle_charges`. Run it
+    periodically next to `run_jobs`.
+    """
+
+    help = "Settles the pending charges of all users with Stripe."
+
+    def handle(self, *args, **options) -> None:
+        user_ids = (
+            Charge.objects.filter(settled_at=None)
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        for user in User.objects.filter(pk__in=list(user_ids)):
+            try:
+                settled = Charge.objects.settle(user)
+            except Exception as e:
+                self.stderr.write(f"User {user.pk}: {e}")
+                continue
+            self.stdout.write(f"User {user.pk}: settled {settled} charges.")
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.2 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_alter_parkinglot_licence_plate"),
+        ("api", "0011_alter_price_price"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garage",
+            name="revision",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.1.2 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_garage_revision"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garage",
+            name="booked_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="garage",
+            name="booked_counted_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="garage",
+            name="disabled_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="garage",
+            name="occupied_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="garage",
+            name="parking_lots_count",
+            field=models.IntegerField(default=0),
+        ),
+    ]
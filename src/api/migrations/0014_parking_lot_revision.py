@@ -0,0 +1,29 @@
+# Generated by Django 4.1.2 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_garage_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garage",
+            name="resync_revision",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="parkinglot",
+            name="revision",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="parkinglot",
+            index=models.Index(
+                fields=["garage", "revision"], name="parking_lot_garage__05aab7_idx"
+            ),
+        ),
+    ]
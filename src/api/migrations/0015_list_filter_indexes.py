@@ -0,0 +1,31 @@
+# Generated by Django 4.1.2 on 2026-10-18 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_parking_lot_revision"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(
+                fields=["province", "municipality"], name="locations_provinc_f6874d_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "seen"], name="notificatio_user_id_3b0f12_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["user", "from_date"], name="reservation_user_id_73243c_idx"
+            ),
+        ),
+    ]
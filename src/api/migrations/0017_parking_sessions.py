@@ -0,0 +1,89 @@
+# Generated by Django 4.1.2 on 2026-10-18 18:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_sessions(apps, schema_editor):
+    """
+    Opens a parking session for every licence plate which is inside a garage.
+    """
+    LicencePlate = apps.get_model("api", "LicencePlate")
+    ParkingSession = apps.get_model("api", "ParkingSession")
+    ParkingSession.objects.bulk_create(
+        ParkingSession(
+            licence_plate=lp,
+            plate=lp.licence_plate,
+            garage_id=lp.garage_id,
+            entered_at=lp.entered_at or lp.updated_at,
+            paid_until=lp.paid_at,
+        )
+        for lp in LicencePlate.objects.exclude(garage=None)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_jobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ParkingSession",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("plate", models.CharField(max_length=192)),
+                ("entered_at", models.DateTimeField()),
+                ("exited_at", models.DateTimeField(null=True)),
+                ("paid_until", models.DateTimeField(null=True)),
+                (
+                    "garage",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="api.garage"
+                    ),
+                ),
+                (
+                    "licence_plate",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="api.licenceplate",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "parking_sessions",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="parkingsession",
+            index=models.Index(
+                fields=["garage", "entered_at"], name="parking_ses_garage__6ec3c8_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="parkingsession",
+            index=models.Index(
+                fields=["plate", "exited_at"], name="parking_ses_plate_da3a56_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="parkingsession",
+            index=models.Index(
+                fields=["licence_plate", "exited_at"],
+                name="parking_ses_licence_8094c0_idx",
+            ),
+        ),
+        migrations.RunPython(open_sessions, migrations.RunPython.noop),
+    ]
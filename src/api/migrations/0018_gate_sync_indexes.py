@@ -0,0 +1,26 @@
+# Generated by Django 4.1.2 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0017_parking_sessions"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="licenceplate",
+            index=models.Index(
+                fields=["updated_at"], name="licence_pla_updated_dba75e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="parkingsession",
+            index=models.Index(
+                fields=["licence_plate", "updated_at"],
+                name="parking_ses_licence_2ef034_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.1.2 on 2026-10-18 18:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("api", "0018_gate_sync_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Charge",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("plate", models.CharField(max_length=192)),
+                ("items", models.JSONField(default=list)),
+                ("amount", models.IntegerField()),
+                ("settled_at", models.DateTimeField(null=True)),
+                ("invoice_id", models.CharField(max_length=192, null=True)),
+                (
+                    "garage",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="api.garage",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "charges",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="charge",
+            index=models.Index(
+                fields=["user", "settled_at"], name="charges_user_id_dd6ced_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="charge",
+            index=models.Index(
+                fields=["settled_at"], name="charges_settled_994085_idx"
+            ),
+        ),
+    ]
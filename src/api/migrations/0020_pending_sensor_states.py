@@ -0,0 +1,38 @@
+# Generated by Django 4.1.2 on 2026-10-18 19:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0019_charges"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingSensorState",
+            fields=[
+                (
+                    "parking_lot",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="pending_state",
+                        serialize=False,
+                        to="api.parkinglot",
+                    ),
+                ),
+                ("occupied", models.BooleanField()),
+                ("since", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "pending_sensor_states",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="pendingsensorstate",
+            index=models.Index(fields=["since"], name="pending_sen_since_14e6f8_idx"),
+        ),
+    ]
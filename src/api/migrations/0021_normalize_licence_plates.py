@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def normalize_licence_plates(apps, schema_editor):
+    """
+    Stores the licence plates normalized, like `LicencePlate.save()` does, such that they're
+    found at the gate. A licence plate of which the normalized plate is already taken is
+    left as is.
+    """
+    LicencePlate = apps.get_model("api", "LicencePlate")
+    taken = set(LicencePlate.objects.values_list("licence_plate", flat=True))
+    for lp in LicencePlate.objects.all():
+        plate = "".join(lp.licence_plate.split()).upper()
+        if plate != lp.licence_plate and plate not in taken:
+            LicencePlate.objects.filter(pk=lp.pk).update(licence_plate=plate)
+            taken.add(plate)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0020_pending_sensor_states"),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_licence_plates, migrations.RunPython.noop),
+    ]
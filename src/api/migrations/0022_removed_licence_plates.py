@@ -0,0 +1,42 @@
+# Generated by Django 4.1.2 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0021_normalize_licence_plates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RemovedLicencePlate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("plate", models.CharField(max_length=192)),
+                ("removed_at", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "removed_licence_plates",
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="parkingsession",
+            name="parking_ses_licence_2ef034_idx",
+        ),
+        migrations.AddIndex(
+            model_name="removedlicenceplate",
+            index=models.Index(
+                fields=["removed_at"], name="removed_lic_removed_1fcef9_idx"
+            ),
+        ),
+    ]
@@ -6,8 +6,13 @@ from src.api.models.garage.garage_settings import GarageSettings
 from src.api.models.garage.opening_hour import OpeningHour
 from src.api.models.garage.location import Location
 
-from src.api.models.licence_plate import LicencePlate
+from src.api.models.licence_plate import LicencePlate, RemovedLicencePlate
+from src.api.models.parking_session import ParkingSession
 from src.api.models.garage.parking_lot import ParkingLot
+from src.api.models.garage.sensor_ingestion import PendingSensorState
 from src.api.models.user.reservation import Reservation
 
 from src.api.models.user.notification import Notification
+
+from src.api.models.job import Job, DeadJob
+from src.api.models.charge import Charge
@@ -0,0 +1,98 @@
+from django.db import models, transaction
+from django.utils import timezone
+
+from src.core.models import TimeStampMixin
+from src.core.settings import CHARGE_BATCH
+from src.core.utils.metrics import get_count, increment, register_metrics
+
+
+class ChargeManager(models.Manager):
+    """
+    Manager of the charges, which are recorded when a licence plate leaves a garage and
+    settled with Stripe afterwards, see `src.api.tasks.settle_charges`.
+    """
+
+    def record(self, licence_plate, garage_id: int, items: list[dict]) -> "Charge":
+        """
+        Records a charge for the stay of `licence_plate` in the garage with `garage_id`,
+        given the prices and quantities in `items`, as returned by
+        `LicencePlate.get_prices_to_pay()`. The prices are copied, such that a change of a
+        price afterwards doesn't change the charge.
+        """
+        lines = [
+            {
+                "price": item["price"].pk,
+                "description": f"{item['price'].price_string} x{item['quantity']}",
+                "amount": item["price"].amount(item["quantity"]),
+                "currency": item["price"].valuta,
+            }
+            for item in items
+        ]
+        return self.create(
+            user_id=licence_plate.user_id,
+            plate=licence_plate.licence_plate,
+            garage_id=garage_id,
+            items=lines,
+            amount=sum(line["amount"] for line in lines),
+        )
+
+    def settle(self, user) -> int:
+        """
+        Settles the pending charges of `user` in batches of `CHARGE_BATCH`, each with a
+        single Stripe invoice, and returns the amount of settled charges. The charges are
+        locked while their invoice is created, thus concurrent settlements of the same user
+        don't invoice them twice.
+        """
+        settled = 0
+        while True:
+            with transaction.atomic():
+                charges = list(
+                    self.select_for_update()
+                    .filter(user_id=user.pk, settled_at=None)
+                    .order_by("pk")[:CHARGE_BATCH]
+                )
+                if not charges:
+                    return settled
+                invoice_id = user.invoice_charges(charges)
+                self.filter(pk__in=[c.pk for c in charges]).update(
+                    settled_at=timezone.now(), invoice_id=invoice_id
+                )
+            increment("charges:settled", len(charges))
+            settled += len(charges)
+
+
+class Charge(TimeStampMixin, models.Model):
+    """
+    Model for the amount a user has to pay for a stay of a licence plate in a garage,
+    which is recorded in the same transaction in which the stay is closed. The `items` are
+    the lines of the invoice, with their `amount` in cents. A charge is pending until it's
+    settled with the Stripe invoice `invoice_id`.
+    """
+
+    user = models.ForeignKey("users.User", on_delete=models.SET_NULL, null=True)
+    plate = models.CharField(max_length=192)
+    garage = models.ForeignKey("api.Garage", on_delete=models.SET_NULL, null=True)
+    items = models.JSONField(default=list)
+    amount = models.IntegerField()
+    settled_at = models.DateTimeField(null=True)
+    invoice_id = models.CharField(max_length=192, null=True)
+
+    objects = ChargeManager()
+
+    class Meta:
+        db_table = "charges"
+        app_label = "api"
+        indexes = [
+            models.Index(fields=["user", "settled_at"]),
+            models.Index(fields=["settled_at"]),
+        ]
+
+
+def _metrics() -> dict[str, int]:
+    return {
+        "pending": Charge.objects.filter(settled_at=None).count(),
+        "settled": get_count("charges:settled"),
+    }
+
+
+register_metrics("charges", _metrics)
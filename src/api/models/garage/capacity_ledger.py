@@ -0,0 +1,259 @@
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from math import ceil, floor
+from typing import Any
+
+from django.utils import timezone
+
+from src.api.models.utils.garage_registry import GarageRegistry
+from src.core.settings import CAPACITY_BUCKET, CAPACITY_HORIZON
+
+
+class CapacityLedger:
+    """
+    Ledger of the capacity of a single garage. For every time bucket of `CAPACITY_BUCKET`
+    from `start` until `CAPACITY_HORIZON` later, it keeps how many parking lots are reserved
+    and how many are occupied in two compact arrays. Next to that, it keeps the total
+    amount of parking lots and the disabled ones, which are the same for every bucket.
+
+    A reservation counts for all buckets between its start and end. An occupied parking lot
+    counts from now until the car is expected to leave (see `ParkingLot._parked_until()`),
+    except for the buckets in which the parking lot is reserved, such that no parking lot is
+    counted twice. This makes the ledger a conservative estimate: reservations of which the
+    user didn't show up keep counting until they end.
+    """
+
+    def __init__(self, start: datetime) -> None:
+        self._bucket_size = CAPACITY_BUCKET.total_seconds()
+        self._start_ts = (
+            floor(start.timestamp() / self._bucket_size) * self._bucket_size
+        )
+        self.size = int(CAPACITY_HORIZON / CAPACITY_BUCKET)
+        self.reserved = array("H", [0]) * self.size
+        self.occupied = array("H", [0]) * self.size
+        self.lots: set[int] = set()
+        self.disabled: set[int] = set()
+        self._reservations: dict[int, tuple[int, int, int]] = {}
+        self._lot_reservations: dict[int, set[int]] = defaultdict(set)
+        self._parked_until: dict[int, datetime] = {}
+        self._occupied_buckets: dict[int, list[int]] = {}
+
+    @property
+    def start(self) -> datetime:
+        return datetime.fromtimestamp(self._start_ts).astimezone()
+
+    @property
+    def end(self) -> datetime:
+        return datetime.fromtimestamp(
+            self._start_ts + self.size * self._bucket_size
+        ).astimezone()
+
+    def free(self, bucket: int) -> int:
+        """
+        Returns the amount of free parking lots in the bucket with index `bucket`.
+        """
+        return max(
+            len(self.lots)
+            - len(self.disabled)
+            - self.reserved[bucket]
+            - self.occupied[bucket],
+            0,
+        )
+
+    def min_free(self, from_date: datetime, to_date: datetime) -> int:
+        """
+        Returns the lowest amount of free parking lots over the buckets of the given time
+        frame, which is computed in O(buckets).
+        """
+        return min(
+            (self.free(b) for b in range(*self._buckets(from_date, to_date))),
+            default=len(self.lots) - len(self.disabled),
+        )
+
+    def can_reserve(self, from_date: datetime, to_date: datetime) -> bool:
+        """
+        Returns if the garage can take one more reservation in the given time frame.
+        """
+        return self.min_free(from_date, to_date) > 0
+
+    def heatmap(self, from_date: datetime, to_date: datetime) -> dict[str, Any]:
+        """
+        Returns the reserved, occupied and free parking lots for the buckets of the given
+        time frame. The time frame is limited to the buckets kept in the ledger.
+        """
+        b0, b1 = self._buckets(from_date, to_date)
+        return {
+            "from_date": datetime.fromtimestamp(
+                self._start_ts + b0 * self._bucket_size
+            ).astimezone(),
+            "bucket_size": int(self._bucket_size),
+            "total": len(self.lots),
+            "disabled": len(self.disabled),
+            "reserved": self.reserved[b0:b1].tolist(),
+            "occupied": self.occupied[b0:b1].tolist(),
+            "free": [self.free(b) for b in range(b0, b1)],
+        }
+
+    def set_reservation(self, reservation) -> None:
+        """
+        Adds or updates a reservation in the ledger.
+        """
+        self.remove_reservation(reservation.pk)
+        b0, b1 = self._buckets(reservation.from_date, reservation.to_date)
+        lot_id = reservation.parking_lot_id
+        self._reservations[reservation.pk] = (lot_id, b0, b1)
+        self._lot_reservations[lot_id].add(reservation.pk)
+        for b in range(b0, b1):
+            self.reserved[b] += 1
+        self._update_occupied(lot_id)
+
+    def remove_reservation(self, pk: int) -> None:
+        if (r := self._reservations.pop(pk, None)) is None:
+            return
+        lot_id, b0, b1 = r
+        self._lot_reservations[lot_id].discard(pk)
+        for b in range(b0, b1):
+            self.reserved[b] -= 1
+        self._update_occupied(lot_id)
+
+    def set_parking_lot(self, parking_lot) -> None:
+        """
+        Adds or updates a parking lot in the ledger.
+        """
+        self.lots.add(parking_lot.pk)
+        if parking_lot.disabled:
+            self.disabled.add(parking_lot.pk)
+        else:
+            self.disabled.discard(parking_lot.pk)
+        if (parked_until := parking_lot._parked_until()) is not None:
+            self._parked_until[parking_lot.pk] = parked_until
+        else:
+            self._parked_until.pop(parking_lot.pk, None)
+        self._update_occupied(parking_lot.pk)
+
+    def remove_parking_lot(self, pk: int) -> None:
+        self.lots.discard(pk)
+        self.disabled.discard(pk)
+        self._parked_until.pop(pk, None)
+        self._update_occupied(pk)
+
+    def _update_occupied(self, lot_id: int) -> None:
+        """
+        Recomputes the buckets in which the parking lot with `lot_id` counts as occupied.
+        """
+        for b in self._occupied_buckets.pop(lot_id, []):
+            self.occupied[b] -= 1
+        if (parked_until := self._parked_until.get(lot_id)) is None:
+            return
+        reserved = set()
+        for pk in self._lot_reservations[lot_id]:
+            _, b0, b1 = self._reservations[pk]
+            reserved.update(range(b0, b1))
+        buckets = [
+            b
+            for b in range(*self._buckets(timezone.now(), parked_until))
+            if b not in reserved
+        ]
+        for b in buckets:
+            self.occupied[b] += 1
+        self._occupied_buckets[lot_id] = buckets
+
+    def _buckets(self, from_date: datetime, to_date: datetime) -> tuple[int, int]:
+        """
+        Returns the range of the indices of the buckets which overlap with the given time
+        frame, limited to the buckets kept in the ledger.
+        """
+        b0 = floor((from_date.timestamp() - self._start_ts) / self._bucket_size)
+        b1 = ceil((to_date.timestamp() - self._start_ts) / self._bucket_size)
+        return min(max(b0, 0), self.size), min(max(b1, 0), self.size)
+
+
+class _CapacityLedgers(GarageRegistry[CapacityLedger]):
+    """
+    Registry of the capacity ledgers of the garages.
+    """
+
+    def build(self, garage_id: int) -> CapacityLedger:
+        return self.build_many([garage_id])[garage_id]
+
+    def build_many(self, garage_ids: list[int]) -> dict[int, CapacityLedger]:
+        from src.api.models import ParkingLot, Reservation
+
+        now = timezone.now()
+        ledgers = {garage_id: CapacityLedger(now) for garage_id in garage_ids}
+        if not ledgers:
+            return ledgers
+        start, end = ledgers[garage_ids[0]].start, ledgers[garage_ids[0]].end
+        for pl in ParkingLot.objects.filter(garage_id__in=garage_ids).select_related(
+            "licence_plate"
+        ):
+            ledgers[pl.garage_id].set_parking_lot(pl)
+        for r in Reservation.objects.filter(
+            garage_id__in=garage_ids, to_date__gte=start, from_date__lt=end
+        ):
+            ledgers[r.garage_id].set_reservation(r)
+        return ledgers
+
+    def apply(
+        self,
+        ledger: CapacityLedger,
+        *,
+        reservation=None,
+        parking_lot=None,
+        parking_lots=None,
+        deleted: bool = False,
+        **change: Any,
+    ) -> None:
+        if reservation is not None:
+            if deleted:
+                ledger.remove_reservation(reservation.pk)
+            else:
+                ledger.set_reservation(reservation)
+        if parking_lot is not None:
+            parking_lots = [parking_lot]
+        for pl in parking_lots or []:
+            if deleted:
+                ledger.remove_parking_lot(pl.pk)
+            else:
+                ledger.set_parking_lot(pl)
+
+
+_ledgers = _CapacityLedgers()
+
+
+def get_capacity_ledger(garage_id: int, until: datetime) -> CapacityLedger:
+    """
+    Returns the capacity ledger of the garage with `garage_id`, which reaches at least
+    until `until` if that is within `CAPACITY_HORIZON` from now.
+    """
+    ledger = _ledgers.get(garage_id)
+    if _is_outdated(ledger, until):
+        _ledgers.discard(garage_id)
+        ledger = _ledgers.get(garage_id)
+    return ledger
+
+
+def get_capacity_ledgers(
+    garage_ids: list[int], until: datetime
+) -> dict[int, CapacityLedger]:
+    """
+    Returns the capacity ledgers of the existing garages with `garage_ids` in the same way
+    as `get_capacity_ledger()`, using a fixed amount of queries.
+    """
+    ledgers = _ledgers.get_many(garage_ids)
+    if outdated := [g for g, ledger in ledgers.items() if _is_outdated(ledger, until)]:
+        for garage_id in outdated:
+            _ledgers.discard(garage_id)
+        ledgers.update(_ledgers.get_many(outdated))
+    return ledgers
+
+
+def _is_outdated(ledger: CapacityLedger, until: datetime) -> bool:
+    """
+    Returns if the ledger doesn't reach until `until`, while a new one would.
+    """
+    return (
+        ledger.end < until.astimezone()
+        and ledger.start < timezone.now() - CAPACITY_BUCKET
+    )
@@ -2,27 +2,225 @@ from datetime import datetime
 from random import randint
 
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 
-from src.core.settings import OFFSET
+from src.core.settings import OFFSET, BOOKED_COUNT_TTL
 from src.core.models import TimeStampMixin
 from src.core.exceptions import DeletionException
 
 
+class GarageManager(models.Manager):
+    """
+    Custom manager for the `Garage`-class, which implements the reading and bumping of the
+    revision of a garage and the maintenance of its counters.
+    """
+
+    def revision(self, pk: int) -> int | None:
+        """
+        Returns the current revision of the garage with `pk`, or `None` if the garage
+        doesn't exist.
+        """
+        return self.filter(pk=pk).values_list("revision", flat=True).first()
+
+    def revisions(self, pks: list[int]) -> dict[int, int]:
+        """
+        Returns the current revisions of the garages with `pks` which exist, in one query.
+        """
+        return dict(self.filter(pk__in=pks).values_list("pk", "revision"))
+
+    def bump_revision(
+        self, pk: int, *, resync: bool = False, **counters: int
+    ) -> int | None:
+        """
+        Atomically increments the revision of the garage with `pk` and returns the new
+        revision. The revision is bumped in the database, such that all workers notice it.
+        The given `counters` are atomically incremented with their value in the same query.
+        If `resync`, the `resync_revision` is set to the new revision as well.
+        """
+        updates = {name: F(name) + value for name, value in counters.items() if value}
+        if resync:
+            updates["resync_revision"] = F("revision") + 1
+        self.filter(pk=pk).update(revision=F("revision") + 1, **updates)
+        return self.revision(pk)
+
+    def recount_booked(self, pk: int) -> int:
+        """
+        Recomputes the `booked_count` of the garage with `pk` from the reservation index of
+        the garage and returns it.
+        """
+        from src.api.models import Reservation
+
+        now = timezone.now()
+        booked = len(
+            {
+                r.parking_lot_id
+                for r in Reservation.objects.overlapping(pk, now, now + OFFSET)
+                if r.is_valid and not r.showed
+            }
+        )
+        self.filter(pk=pk).update(booked_count=booked, booked_counted_at=now)
+        return booked
+
+    def refresh_booked_counts(self, garages: list["Garage"]) -> None:
+        """
+        Recounts the `booked_count` of the `garages` of which it's older than
+        `BOOKED_COUNT_TTL`, like `Garage.refresh_booked()`, with their reservation indices
+        looked up together and a single update.
+        """
+        from src.api.models import Reservation
+
+        now = timezone.now()
+        stale = [
+            garage
+            for garage in garages
+            if garage.booked_counted_at is None
+            or now - garage.booked_counted_at > BOOKED_COUNT_TTL
+        ]
+        if not stale:
+            return
+        reservations = Reservation.objects.overlapping_many(
+            [garage.pk for garage in stale], now, now + OFFSET
+        )
+        for garage in stale:
+            garage.booked_count = len(
+                {
+                    r.parking_lot_id
+                    for r in reservations.get(garage.pk, [])
+                    if r.is_valid and not r.showed
+                }
+            )
+            garage.booked_counted_at = now
+        self.bulk_update(stale, ["booked_count", "booked_counted_at"])
+
+    def recount(self, pk: int) -> None:
+        """
+        Recomputes all counters of the garage with `pk` from the parking lots, reservations
+        and licence plates in the database.
+        """
+        from src.api.models import ParkingLot, LicencePlate
+
+        pls = ParkingLot.objects.filter(garage_id=pk)
+        self.filter(pk=pk).update(
+            entered=LicencePlate.objects.filter(garage_id=pk).count(),
+            parking_lots_count=pls.count(),
+            occupied_count=pls.filter(occupied=True).count(),
+            disabled_count=pls.filter(disabled=True).count(),
+        )
+        self.recount_booked(pk)
+
+
 class Garage(TimeStampMixin, models.Model):
+    """
+    Model for a parking garage. The `revision`-column is bumped on every change of the
+    reservations and parking lots in the garage, which is used to invalidate in-memory data
+    of the garage (see `GarageRegistry`). Parking lots which are changed get the new
+    revision, such that clients can fetch the changes since a revision. When a parking lot
+    is removed, the `resync_revision`-column is set, as from then on clients have to fetch
+    all parking lots again.
+
+    The counters of the garage are maintained with atomic increments in the database: the
+    `entered`-column on every entry and exit at the gate and the parking lot counters on
+    every change of a parking lot. As the booked parking lots depend on the time, the
+    `booked_count` is recounted on every change of a reservation and when it's older than
+    `BOOKED_COUNT_TTL`. The `recount_garages`-command recomputes all counters.
+    """
+
+    COUNTERS = [
+        "revision",
+        "resync_revision",
+        "entered",
+        "parking_lots_count",
+        "occupied_count",
+        "disabled_count",
+        "booked_count",
+        "booked_counted_at",
+    ]
+
     user = models.ForeignKey("users.User", on_delete=models.CASCADE)
     garage_settings = models.ForeignKey("api.GarageSettings", on_delete=models.CASCADE)
     name = models.CharField(max_length=192)
     entered = models.IntegerField(default=0)
+    revision = models.PositiveBigIntegerField(default=0)
+    resync_revision = models.PositiveBigIntegerField(default=0)
+    parking_lots_count = models.IntegerField(default=0)
+    occupied_count = models.IntegerField(default=0)
+    disabled_count = models.IntegerField(default=0)
+    booked_count = models.IntegerField(default=0)
+    booked_counted_at = models.DateTimeField(null=True)
+
+    objects = GarageManager()
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Saves the garage without overwriting the counters, which are only changed with
+        atomic updates.
+        """
+        if (
+            self.pk is not None
+            and not self._state.adding
+            and kwargs.get("update_fields") is None
+        ):
+            kwargs["update_fields"] = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTERS
+            ]
+        super().save(*args, **kwargs)
 
     @property
     def increment_entered(self) -> None:
-        self.entered += 1
-        self.save()
+        from src.api.models.garage.occupancy_events import publish_occupancy
+
+        Garage.objects.filter(pk=self.pk).update(entered=F("entered") + 1)
+        self.refresh_from_db(fields=["entered"])
+        publish_occupancy(self.pk)
 
     @property
     def decrement_entered(self) -> None:
-        self.entered -= 1
-        self.save()
+        from src.api.models.garage.occupancy_events import publish_occupancy
+
+        Garage.objects.filter(pk=self.pk).update(entered=F("entered") - 1)
+        self.refresh_from_db(fields=["entered"])
+        publish_occupancy(self.pk)
+
+    @property
+    def free_lots(self) -> int:
+        """
+        Returns the amount of parking lots which are neither occupied, booked nor disabled.
+        """
+        return max(
+            self.parking_lots_count
+            - self.occupied_count
+            - self.booked_count
+            - self.disabled_count,
+            0,
+        )
+
+    @property
+    def is_full(self) -> bool:
+        """
+        Returns if all parking lots are occupied, booked or disabled.
+        """
+        return self.free_lots == 0
+
+    @property
+    def is_fully_occupied(self) -> bool:
+        """
+        Returns if all parking lots are physically occupied.
+        """
+        return self.occupied_count >= self.parking_lots_count
+
+    def refresh_booked(self) -> None:
+        """
+        Recounts the `booked_count` if it's older than `BOOKED_COUNT_TTL`.
+        """
+        if (
+            self.booked_counted_at is None
+            or timezone.now() - self.booked_counted_at > BOOKED_COUNT_TTL
+        ):
+            self.booked_count = Garage.objects.recount_booked(self.pk)
+            self.booked_counted_at = timezone.now()
 
     @property
     def next_free_spot(self) -> datetime | None:
@@ -56,42 +254,46 @@ class Garage(TimeStampMixin, models.Model):
         return super().delete()
 
     def parking_lots(self) -> list:
+        """
+        Returns the parking lots of the garage, with their availability computed for the
+        time frame of a default user.
+        """
         from src.api.models import ParkingLot
 
-        return list(ParkingLot.objects.filter(garage=self))
+        return ParkingLot.objects.is_available(self.pk)
 
-    def reservations(self, pls: list | None = None) -> int:
+    def reservations(self) -> int:
         """
         Returns the amount of booked parking lots in the garage for a user with default park time.
         """
-        if pls is None:
-            pls = self.parking_lots()
-        return len(list(filter(lambda pl: pl.booked(), pls)))
+        self.refresh_booked()
+        return self.booked_count
 
-    def occupied_lots(self, from_date: datetime, to_date: datetime) -> int:
+    def occupied_lots(self) -> int:
         """
-        Returns the amount of occupied spots for a given startTime and endTime, i.e.
-        the parking lots which are physically occupied and parking lots which are
-        reserved.
+        Returns the amount of occupied spots, i.e. the parking lots which are physically
+        occupied and parking lots which are reserved.
         """
-        pls = self.parking_lots()
-        occupied_lots = len(list(filter(lambda pl: pl.occupied, pls)))
-        reserved_lots = self.reservations(pls)
-        return occupied_lots + reserved_lots
+        return self.occupied_count + self.reservations()
+
+    def can_take_reservation(self, from_date: datetime, to_date: datetime) -> bool:
+        """
+        Returns if the garage has capacity for one more reservation in the given time
+        frame, based on the capacity ledger of the garage.
+        """
+        from src.api.models.garage.capacity_ledger import get_capacity_ledger
+
+        return get_capacity_ledger(self.pk, to_date).can_reserve(from_date, to_date)
 
     def get_last_entered(self):
         """
-        Gets the last entered licence plate of a garage.
-        If no licence plates have entered the garage, none is returned.
+        Gets the last entered licence plate of a garage, which is looked up on the index
+        of the parking sessions. If no licence plates have entered the garage, none is
+        returned.
         """
-        from src.api.models import LicencePlate
+        from src.api.models import ParkingSession
 
-        entered_lps = LicencePlate.objects.filter(garage=self)
-        return min(
-            entered_lps,
-            key=lambda lp: abs(datetime.now().astimezone() - lp.entered_at.astimezone()),  # type: ignore
-            default=None,
-        )
+        return ParkingSession.objects.last_entered(self.pk)
 
     def get_random(
         self,
@@ -101,25 +303,24 @@ class Garage(TimeStampMixin, models.Model):
         """
         Returns a random free parking lot from the garage.
         """
+        from src.api.models import ParkingLot
+
         pls = list(
             filter(
-                lambda pl: pl.available(from_date, end_date),
-                self.parking_lots(),
+                lambda pl: pl.available(),
+                ParkingLot.objects.is_available(self.pk, from_date, end_date),
             )
         )
-        return pls[randint(0, len(pls))]
+        return pls[randint(0, len(pls) - 1)]
 
     def _get_next_free_spot(self) -> datetime | None:
         """
-        Returns the time that a new spot will become free in the parking garage.
+        Returns the time that a new spot will become free in the parking garage, which is
+        looked up in the release index of the garage.
         """
-        pls = self.parking_lots()
-        occupied_until: list[datetime | None] = list(
-            map(lambda pl: pl.occupied_until(), pls)
-        )
-        if None in occupied_until:
-            return None
-        return min(occupied_until, key=lambda d: d.timestamp(), default=None)  # type: ignore
+        from src.api.models.garage.release_index import get_release_index
+
+        return get_release_index(self.pk).next_free_spot()
 
     class Meta:
         db_table = "garages"
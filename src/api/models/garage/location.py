@@ -15,3 +15,4 @@ class Location(TimeStampMixin, models.Model):
     class Meta:
         db_table = "locations"
         app_label = "api"
+        indexes = [models.Index(fields=["province", "municipality"])]
@@ -0,0 +1,128 @@
+import logging
+from threading import Event, Lock, Thread
+
+from django.db import close_old_connections, transaction
+
+from src.core.settings import OCCUPANCY_POLL
+from src.core.utils.broker import InProcessBroker
+
+logger = logging.getLogger(__name__)
+
+occupancy_broker = InProcessBroker()
+
+_GARAGE_FIELDS = [
+    "revision",
+    "entered",
+    "parking_lots_count",
+    "occupied_count",
+    "disabled_count",
+]
+
+
+def occupancy_channel(garage_id: int) -> str:
+    return f"occupancy:{garage_id}"
+
+
+def garage_occupancy(garage_id: int) -> dict | None:
+    """
+    Returns the counters of the garage with `garage_id` which are streamed, or `None` if
+    the garage doesn't exist.
+    """
+    from src.api.models import Garage
+
+    return Garage.objects.filter(pk=garage_id).values(*_GARAGE_FIELDS).first()
+
+
+def parking_lot_occupancy(parking_lot) -> dict:
+    return {
+        "id": parking_lot.pk,
+        "parking_lot_no": parking_lot.parking_lot_no,
+        "occupied": parking_lot.occupied,
+        "disabled": parking_lot.disabled,
+    }
+
+
+class OccupancyPoller:
+    """
+    Publishes the changes of the garages which are streamed by this process to the
+    `occupancy_broker`. The counters of those garages are polled every `OCCUPANCY_POLL`
+    with a single query, thus the changes written by the other workers and by the
+    `run_jobs`-command are streamed as well. A garage which changed is published with its
+    parking lots which got a newer revision. The changes written by this process wake the
+    poller up, such that they're published at once.
+    """
+
+    def __init__(self) -> None:
+        self._garages: dict[int, dict] = {}
+        self._lock = Lock()
+        self._wake = Event()
+        self._thread: Thread | None = None
+
+    def watch(self, garage: dict, garage_id: int) -> None:
+        """
+        Starts publishing the changes of the garage with `garage_id` after the state
+        `garage`, as returned by `garage_occupancy()`, which has to be read after the
+        subscription on the channel of the garage.
+        """
+        with self._lock:
+            known = self._garages.get(garage_id)
+            if known is None or garage["revision"] < known["revision"]:
+                self._garages[garage_id] = garage
+            if self._thread is None:
+                self._thread = Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(OCCUPANCY_POLL.total_seconds())
+            self._wake.clear()
+            close_old_connections()
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Polling the occupancy of the garages failed.")
+
+    def poll(self) -> None:
+        from src.api.models import Garage, ParkingLot
+
+        with self._lock:
+            for garage_id in list(self._garages):
+                if not occupancy_broker.has_subscribers(occupancy_channel(garage_id)):
+                    del self._garages[garage_id]
+            known = dict(self._garages)
+        if not known:
+            return
+        for garage in Garage.objects.filter(pk__in=known).values("pk", *_GARAGE_FIELDS):
+            garage_id = garage.pop("pk")
+            if garage == known[garage_id]:
+                continue
+            parking_lots = ParkingLot.objects.filter(
+                garage_id=garage_id, revision__gt=known[garage_id]["revision"]
+            )
+            occupancy_broker.publish(
+                occupancy_channel(garage_id),
+                {
+                    "garage": garage,
+                    "parking_lots": [parking_lot_occupancy(pl) for pl in parking_lots],
+                },
+            )
+            with self._lock:
+                if garage_id in self._garages:
+                    self._garages[garage_id] = garage
+
+
+occupancy_poller = OccupancyPoller()
+
+
+def publish_occupancy(garage_id: int) -> None:
+    """
+    Wakes up the `occupancy_poller` once the current transaction is committed, such that
+    the change of the garage with `garage_id` is streamed at once. Nothing is done if
+    nobody in this process is subscribed on the garage, as the other processes pick the
+    change up by polling.
+    """
+    if occupancy_broker.has_subscribers(occupancy_channel(garage_id)):
+        transaction.on_commit(occupancy_poller.wake)
@@ -1,8 +1,10 @@
-from random import randint
+from collections import defaultdict
 from datetime import datetime
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from src.api.models.garage.occupancy_events import publish_occupancy
+from src.api.models.utils.garage_registry import GarageRegistry
 from src.core.settings import OFFSET
 from src.core.utils import overlap
 from src.core.models import TimeStampMixin
@@ -10,16 +12,154 @@ from src.core.models import TimeStampMixin
 
 class ParkingLotManager(models.Manager):
     """
-    Custom manager for `ParkingLot`-class, which implements the `.is_available()`-manager
-    function.
+    Custom manager for `ParkingLot`-class, which implements the `.is_available()`- and
+    `.set_occupied()`-manager functions.
     """
 
-    def is_available(self, pk: int, from_date: datetime, to_date: datetime):
-        for pl in (pls := super().get_queryset().filter(garage_id=pk)):
-            pl.available = pl.available(from_date, to_date)
-            pl.save()
+    def is_available(
+        self,
+        pk: int,
+        from_date: datetime | None = None,
+        to_date: datetime | None = None,
+        *,
+        since_revision: int | None = None,
+    ) -> list["ParkingLot"]:
+        """
+        Returns the parking lots of the garage with `pk` with their availability for the
+        given time frame and their booked state computed. If no time frame is given, the
+        time frame of a default user is used. If `since_revision` is given, only the
+        parking lots which changed after that revision of the garage are returned.
+
+        The whole garage is handled in a constant number of queries: one for the parking
+        lots (together with their licence plates), while the reservations come from the
+        in-memory index of the garage. Nothing is written to the database.
+        """
+        now = timezone.now()
+        if from_date is None or to_date is None:
+            from_date = now
+            to_date = now + OFFSET
+        pls = self.with_reservations(
+            pk,
+            min(from_date.astimezone(), now),
+            max(to_date.astimezone(), now + OFFSET),
+            since_revision=since_revision,
+        )
+        return self.compute_available(pls, from_date, to_date)
+
+    def with_reservations(
+        self,
+        pk: int,
+        from_date: datetime,
+        to_date: datetime,
+        *,
+        since_revision: int | None = None,
+    ) -> list["ParkingLot"]:
+        """
+        Returns the parking lots of the garage with `pk` together with their reservations
+        which overlap with the given time frame, such that their availability can be
+        computed for any time frame within it without queries, see `compute_available()`.
+        If `since_revision` is given, only the parking lots which changed after that
+        revision of the garage are returned.
+        """
+        from src.api.models import Reservation
+
+        queryset = super().get_queryset().filter(garage_id=pk)
+        if since_revision is not None:
+            queryset = queryset.filter(revision__gt=since_revision)
+        pls = list(queryset.select_related("licence_plate"))
+        reservations = defaultdict(list)
+        for r in Reservation.objects.overlapping(pk, from_date, to_date):
+            reservations[r.parking_lot_id].append(r)
+        for pl in pls:
+            pl._reservations = reservations[pl.pk]
         return pls
 
+    @staticmethod
+    def compute_available(
+        pls: list["ParkingLot"], from_date: datetime, to_date: datetime
+    ) -> list["ParkingLot"]:
+        """
+        Computes the availability of the parking lots returned by `with_reservations()` for
+        the given time frame and their booked state, which has to lie within the time frame
+        they were returned for, together with the coming `OFFSET`.
+        """
+        for pl in pls:
+            pl._available = pl.available(from_date, to_date)
+            pl._booked = None
+            pl._booked = pl.booked()
+        return pls
+
+    def set_occupied(self, garage_id: int, states: list[tuple[int, bool]]) -> list[str]:
+        """
+        Applies the occupied states reported by the sensors of the garage with `garage_id`,
+        given as `(parking_lot_no, occupied)`, in a single transaction. Returns per state if
+        the parking lot was `"updated"`, `"unchanged"` or `"not_found"`.
+
+        Only the parking lots of which the state changed are written, with one conditional
+        update per new state and one change of the garage. For the parking lots which
+        became occupied, the reservation on it is reassigned and the last entered licence
+        plate is set, like `ParkingLotRPiView` does for a single parking lot.
+        """
+        from src.api.models import Garage
+
+        results = []
+        changed: dict[int, ParkingLot] = {}
+        with transaction.atomic():
+            pls = {
+                pl.parking_lot_no: pl
+                for pl in self.select_for_update(of=("self",))
+                .filter(
+                    garage_id=garage_id,
+                    parking_lot_no__in={no for no, _ in states},
+                )
+                .select_related("licence_plate")
+            }
+            garage = Garage.objects.get(pk=garage_id) if pls else None
+            last_entered = None
+            for no, occupied in states:
+                if (pl := pls.get(no)) is None:
+                    results.append("not_found")
+                    continue
+                if pl.occupied == occupied:
+                    results.append("unchanged")
+                    continue
+                pl.garage = garage
+                if occupied:
+                    pl.reassign()
+                    if last_entered is None:
+                        last_entered = garage.get_last_entered()  # type: ignore
+                    pl.licence_plate = last_entered
+                pl.occupied = occupied
+                changed[pl.pk] = pl
+                results.append("updated")
+            if not changed:
+                return results
+            now = timezone.now()
+            occupied_count = 0
+            for occupied in (True, False):
+                pks = [pl.pk for pl in changed.values() if pl.occupied == occupied]
+                if not pks:
+                    continue
+                fields = {"licence_plate": last_entered} if occupied else {}
+                # Only the parking lots which are still in the other state are counted, as
+                # another writer may have changed them in the meantime.
+                updated = self.filter(pk__in=pks, occupied=not occupied).update(
+                    occupied=occupied, updated_at=now, **fields
+                )
+                occupied_count += updated if occupied else -updated
+            revision = GarageRegistry.changed(
+                garage_id,
+                counters={"occupied_count": occupied_count},
+                parking_lots=list(changed.values()),
+            )
+            self.filter(pk__in=changed).update(revision=revision)
+            for pl in changed.values():
+                pl.updated_at = now
+                pl.revision = revision
+                pl._saved_state = pl._counted_state()
+            publish_occupancy(garage_id)
+        return results
+
 
 class ParkingLot(TimeStampMixin, models.Model):
     """
@@ -29,7 +169,8 @@ class ParkingLot(TimeStampMixin, models.Model):
         - `floor_number`: the floor on which the parking lot resides in the garage;
         - `occupied`: indicates if the parking lot is occupied at the given time (note that a parking lot is occupied both if it holds a car or when it's booked);
         - `disabled`: indicates if the parking lot is disabled by the garage owner;
-        - `booked`: indicates whether the parking lot is booked in a given time frame.
+        - `booked`: indicates whether the parking lot is booked in a given time frame;
+        - `revision`: the revision of the garage at which the parking lot or one of its reservations was last changed.
     """
 
     garage = models.ForeignKey("api.Garage", on_delete=models.CASCADE)
@@ -42,11 +183,21 @@ class ParkingLot(TimeStampMixin, models.Model):
         null=True,
     )
     disabled = models.BooleanField(default=False)
+    revision = models.PositiveBigIntegerField(default=0)
 
     objects = ParkingLotManager()
 
+    # Filled in by `ParkingLotManager.is_available()`, such that the methods below don't
+    # have to look up the reservations for every parking lot.
+    _reservations: list | None = None
+    _available: bool | None = None
+    _booked: bool | None = None
+    # The state of the parking lot as last saved, see `save()`.
+    _saved_state: tuple[int, bool, bool] | None = None
+
     class Meta:
         unique_together = ("parking_lot_no", "garage")
+        indexes = [models.Index(fields=["garage", "revision"])]
         db_table = "parking_lots"
         app_label = "api"
 
@@ -56,8 +207,12 @@ class ParkingLot(TimeStampMixin, models.Model):
         to_date: datetime | None = None,
     ) -> bool:
         """
-        Returns if the parking lot is available within the given time frame.
+        Returns if the parking lot is available within the given time frame. If no time
+        frame is given and the availability is already computed by the manager, the
+        computed value is returned.
         """
+        if from_date is None and to_date is None and self._available is not None:
+            return self._available
         if self.disabled:
             return False
         if from_date is None or to_date is None:
@@ -74,6 +229,8 @@ class ParkingLot(TimeStampMixin, models.Model):
         """
         Returns if the parking lot is booked within the time frame of a default user.
         """
+        if self._booked is not None:
+            return self._booked
         return self._has_reservation(
             datetime.now(), datetime.now() + OFFSET, showed=False
         )
@@ -99,7 +256,8 @@ class ParkingLot(TimeStampMixin, models.Model):
         )
         if pl_next_reservation:
             r = pl_next_reservation[0]
-            if r.licence_plate.licence_plate != self.garage.get_last_entered():
+            last_entered = self.garage.get_last_entered()
+            if last_entered is None or r.licence_plate_id != last_entered.pk:
                 r.reassign()
 
     def set_lp(self) -> None:
@@ -111,10 +269,82 @@ class ParkingLot(TimeStampMixin, models.Model):
         self.licence_plate = lp
         self.save()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_state = instance._counted_state()
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Saves the parking lot and registers the change in its garage, which updates the
+        counters of the garage with the difference with the state in the database, see
+        `_replace_state()`. The parking lot gets the new revision of the garage in the same
+        transaction.
+        """
+        saved_state = self._saved_state
+        with transaction.atomic():
+            if saved_state is not None:
+                saved_state = _replace_state(
+                    self.pk, saved_state, self._counted_state()
+                )
+            super().save(*args, **kwargs)
+            self._saved_state = self._counted_state()
+            if saved_state is not None and saved_state[0] != self.garage_id:
+                # The parking lot moved to another garage.
+                GarageRegistry.changed(
+                    saved_state[0],
+                    counters=_counters(saved_state, -1),
+                    resync=True,
+                    parking_lot=self,
+                    deleted=True,
+                )
+                publish_occupancy(saved_state[0])
+                saved_state = None
+            counters = _counters(self._saved_state, 1)
+            if saved_state is not None:
+                for name, value in _counters(saved_state, -1).items():
+                    counters[name] += value
+            revision = GarageRegistry.changed(
+                self.garage_id, counters=counters, parking_lot=self
+            )
+            ParkingLot.objects.filter(pk=self.pk).update(revision=revision)
+            self.revision = revision
+        publish_occupancy(self.garage_id)
+
+    def delete(self) -> tuple[int, dict[str, int]]:
+        pk = self.pk
+        deleted = super().delete()
+        self.pk = pk
+        GarageRegistry.changed(
+            self.garage_id,
+            counters=_counters(self._counted_state(), -1),
+            resync=True,
+            parking_lot=self,
+            deleted=True,
+        )
+        publish_occupancy(self.garage_id)
+        self.pk = None
+        self._saved_state = None
+        return deleted
+
+    def _counted_state(self) -> tuple[int, bool, bool]:
+        """
+        Returns the state of the parking lot which is counted in its garage.
+        """
+        return self.garage_id, self.occupied, self.disabled
+
     def occupied_until(self) -> datetime | None:
         reservation = self._has_now_reservation()
         if reservation is not None:
             return reservation.to_date
+        return self._parked_until()
+
+    def _parked_until(self) -> datetime | None:
+        """
+        Returns until when the car on the parking lot is expected to stay, without taking
+        the reservations of the parking lot into account.
+        """
         if not self.occupied:
             return None
         if self.licence_plate is None:
@@ -129,15 +359,8 @@ class ParkingLot(TimeStampMixin, models.Model):
         """
         Returns if the parking lot has a reservation for the given time frame.
         """
-
-        reservations = self._get_reservations(showed=showed, valid=True)
-        return any(
-            map(
-                lambda reservation: overlap(
-                    reservation.from_date, reservation.to_date, from_date, to_date
-                ),
-                reservations,
-            )
+        return bool(
+            self._get_reservations(from_date, to_date, showed=showed, valid=True)
         )
 
     def _has_now_reservation(
@@ -146,29 +369,76 @@ class ParkingLot(TimeStampMixin, models.Model):
         """
         Returns if the parking lot has a reservation for the moment the function is called.
         """
-        pl_reservations = self._get_reservations()
-        reservation_now = list(
-            filter(
-                lambda r: r.from_date <= datetime.now().astimezone() <= r.to_date,
-                pl_reservations,
-            )
-        )
-
+        now = timezone.now()
+        reservation_now = self._get_reservations(now, now)
         return reservation_now[0] if reservation_now else None
 
-    def _get_reservations(self, *, showed: bool | None = None, valid=False) -> list:
+    def _get_reservations(
+        self,
+        from_date: datetime,
+        to_date: datetime,
+        *,
+        showed: bool | None = None,
+        valid=False,
+    ) -> list:
         """
-        Returns alls the reservations for the parking lot.
+        Returns all the reservations for the parking lot which overlap with the given time
+        frame. These are taken from the reservations prefetched by the manager or otherwise
+        from the in-memory index of the garage's reservations.
         """
         from src.api.models import Reservation
 
-        if showed is None:
-            reservations = list(Reservation.objects.filter(parking_lot=self))
+        if self._reservations is not None:
+            reservations = [
+                r
+                for r in self._reservations
+                if overlap(r.from_date, r.to_date, from_date, to_date)
+            ]
         else:
-            reservations = list(
-                Reservation.objects.filter(parking_lot=self, showed=showed)
-            )
-        if not valid:
-            return reservations
-        else:
-            return list(filter(lambda pl: pl.is_valid, reservations))
+            reservations = [
+                r
+                for r in Reservation.objects.overlapping(
+                    self.garage_id, from_date, to_date
+                )
+                if r.parking_lot_id == self.pk
+            ]
+        return [
+            r
+            for r in reservations
+            if (showed is None or r.showed == showed) and (not valid or r.is_valid)
+        ]
+
+
+def _replace_state(
+    pk: int, saved_state: tuple[int, bool, bool], state: tuple[int, bool, bool]
+) -> tuple[int, bool, bool] | None:
+    """
+    Replaces the counted state of the parking lot with `pk` in the database by `state`,
+    with an update which only succeeds if the state in the database is still
+    `saved_state`, otherwise it's retried with the state in the database. Returns the
+    state which was replaced, or `None` if the parking lot doesn't exist anymore. Thus two
+    writers which loaded the same state never count the same change, as the second one
+    only gets to replace the state of the first one.
+    """
+    queryset = ParkingLot.objects.filter(pk=pk)
+    garage_id, occupied, disabled = state
+    while saved_state is not None:
+        if queryset.filter(
+            garage_id=saved_state[0], occupied=saved_state[1], disabled=saved_state[2]
+        ).update(garage_id=garage_id, occupied=occupied, disabled=disabled):
+            return saved_state
+        saved_state = queryset.values_list("garage_id", "occupied", "disabled").first()
+    return None
+
+
+def _counters(state: tuple[int, bool, bool], sign: int) -> dict[str, int]:
+    """
+    Returns the changes of the counters of a garage when a parking lot with the given state
+    is added (`sign` is 1) or removed (`sign` is -1).
+    """
+    _, occupied, disabled = state
+    return {
+        "parking_lots_count": sign,
+        "occupied_count": sign * int(occupied),
+        "disabled_count": sign * int(disabled),
+    }
@@ -1,4 +1,5 @@
 from datetime import timedelta
+from decimal import Decimal
 from os import getenv
 import stripe
 from django.core.exceptions import ValidationError
@@ -37,6 +38,13 @@ class Price(TimeStampMixin, models.Model):
         max_length=30, default="price_1M5XwcGRh96C3wQGkqJqXCmi"
     )
 
+    def amount(self, quantity: int = 1) -> int:
+        """
+        Returns `quantity` times the price in cents, as charged with Stripe. The price is
+        rounded to cents, as a float like 2.3 is slightly less than 230 cents.
+        """
+        return round(Decimal(str(self.price)) * 100) * quantity
+
     def delete_stripe_price(self) -> None:
         stripe.Price.modify(
             self.stripe_identifier,
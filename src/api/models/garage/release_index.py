@@ -0,0 +1,222 @@
+from collections import defaultdict
+from datetime import datetime
+from heapq import heappop, heappush
+from typing import Any
+
+from django.utils import timezone
+
+from src.api.models.utils.garage_registry import GarageRegistry
+from src.core.settings import OFFSET
+
+
+class ReleaseIndex:
+    """
+    Index of the times at which the parking lots of a single garage become free, which is
+    the `ParkingLot.occupied_until()` of every parking lot.
+
+    A parking lot is occupied until the end of the reservation it has at the moment, or
+    otherwise until the car on it is expected to leave. Next to the parking lots which are
+    free, the index keeps a min-heap of the release times of the occupied parking lots. As
+    the reservations which are active change over time, the starts and ends of the
+    reservations are kept in a second heap, which is processed up to the current time on
+    every lookup. Heap entries which became outdated are skipped lazily.
+    """
+
+    def __init__(self) -> None:
+        # Per parking lot: if it's occupied and the licence plate on it.
+        self._lots: dict[int, tuple[bool, int | None]] = {}
+        self._entered_at: dict[int, datetime | None] = {}
+        self._reservations: dict[int, tuple[int, datetime, datetime]] = {}
+        self._lot_reservations: dict[int, set[int]] = defaultdict(set)
+        # Per parking lot: the release time, `None` if it's free or if the car on it is
+        # unknown, which means it's occupied until `OFFSET` from now (see `_unknown`).
+        self._until: dict[int, datetime | None] = {}
+        self._free: set[int] = set()
+        self._unknown: set[int] = set()
+        self._heap: list[tuple[float, int]] = []
+        self._events: list[tuple[float, int]] = []
+
+    def next_free_spot(self) -> datetime | None:
+        """
+        Returns the time at which the next parking lot becomes free, or `None` if a parking
+        lot is free at the moment.
+        """
+        now = timezone.now()
+        self._advance(now)
+        if self._free or not self._lots:
+            return None
+        while self._heap:
+            ts, lot_id = self._heap[0]
+            until = self._until.get(lot_id)
+            if isinstance(until, datetime) and until.timestamp() == ts:
+                break
+            heappop(self._heap)
+        fixed = self._until[self._heap[0][1]] if self._heap else None
+        if self._unknown and (fixed is None or now + OFFSET < fixed):
+            return now + OFFSET
+        return fixed
+
+    def set_parking_lot(self, parking_lot) -> None:
+        self._lots[parking_lot.pk] = (
+            parking_lot.occupied,
+            parking_lot.licence_plate_id,
+        )
+        if parking_lot.licence_plate_id is not None:
+            self._entered_at[
+                parking_lot.licence_plate_id
+            ] = parking_lot.licence_plate.entered_at
+        self._refresh(parking_lot.pk, timezone.now())
+
+    def remove_parking_lot(self, pk: int) -> None:
+        self._lots.pop(pk, None)
+        self._until.pop(pk, None)
+        self._free.discard(pk)
+        self._unknown.discard(pk)
+
+    def set_licence_plate(self, licence_plate, *, deleted=False) -> None:
+        """
+        Updates the release times of the parking lots with the given licence plate, as the
+        time at which it entered the garage changed.
+        """
+        if licence_plate.pk not in self._entered_at:
+            return
+        self._entered_at[licence_plate.pk] = (
+            None if deleted else licence_plate.entered_at
+        )
+        for lot_id, (occupied, lp_id) in list(self._lots.items()):
+            if lp_id == licence_plate.pk:
+                if deleted:
+                    self._lots[lot_id] = (occupied, None)
+                self._refresh(lot_id, timezone.now())
+
+    def set_reservation(self, reservation) -> None:
+        self.remove_reservation(reservation.pk)
+        lot_id = reservation.parking_lot_id
+        self._reservations[reservation.pk] = (
+            lot_id,
+            reservation.from_date,
+            reservation.to_date,
+        )
+        self._lot_reservations[lot_id].add(reservation.pk)
+        heappush(self._events, (reservation.from_date.timestamp(), reservation.pk))
+        heappush(self._events, (reservation.to_date.timestamp(), reservation.pk))
+        self._refresh(lot_id, timezone.now())
+
+    def remove_reservation(self, pk: int) -> None:
+        if (r := self._reservations.pop(pk, None)) is None:
+            return
+        self._lot_reservations[r[0]].discard(pk)
+        self._refresh(r[0], timezone.now())
+
+    def _advance(self, now: datetime) -> None:
+        """
+        Processes the starts and ends of the reservations up to `now`.
+        """
+        now_ts = now.timestamp()
+        while self._events and self._events[0][0] < now_ts:
+            _, pk = heappop(self._events)
+            if (r := self._reservations.get(pk)) is not None:
+                if r[2] < now:
+                    # Ended reservations aren't needed anymore.
+                    del self._reservations[pk]
+                    self._lot_reservations[r[0]].discard(pk)
+                self._refresh(r[0], now)
+
+    def _refresh(self, lot_id: int, now: datetime) -> None:
+        """
+        Recomputes the release time of the parking lot with `lot_id` at `now`, in the same
+        way as `ParkingLot.occupied_until()`.
+        """
+        if lot_id not in self._lots:
+            return
+        occupied, lp_id = self._lots[lot_id]
+        active = sorted(
+            pk
+            for pk in self._lot_reservations[lot_id]
+            if self._reservations[pk][1] <= now <= self._reservations[pk][2]
+        )
+        until: datetime | None = None
+        unknown = False
+        if active:
+            until = self._reservations[active[0]][2]
+        elif occupied and lp_id is None:
+            unknown = True
+        elif occupied:
+            entered_at = self._entered_at.get(lp_id)
+            until = entered_at + OFFSET if entered_at is not None else None
+        self._until[lot_id] = until
+        if unknown:
+            self._unknown.add(lot_id)
+        else:
+            self._unknown.discard(lot_id)
+        if until is None and not unknown:
+            self._free.add(lot_id)
+        else:
+            self._free.discard(lot_id)
+        if until is not None:
+            heappush(self._heap, (until.timestamp(), lot_id))
+
+
+class _ReleaseIndices(GarageRegistry[ReleaseIndex]):
+    """
+    Registry of the release indices of the garages.
+    """
+
+    def build(self, garage_id: int) -> ReleaseIndex:
+        return self.build_many([garage_id])[garage_id]
+
+    def build_many(self, garage_ids: list[int]) -> dict[int, ReleaseIndex]:
+        from src.api.models import ParkingLot, Reservation
+
+        now = timezone.now()
+        indices = {garage_id: ReleaseIndex() for garage_id in garage_ids}
+        if not indices:
+            return indices
+        for pl in ParkingLot.objects.filter(garage_id__in=garage_ids).select_related(
+            "licence_plate"
+        ):
+            indices[pl.garage_id].set_parking_lot(pl)
+        for r in Reservation.objects.filter(garage_id__in=garage_ids, to_date__gte=now):
+            indices[r.garage_id].set_reservation(r)
+        return indices
+
+    def apply(
+        self,
+        index: ReleaseIndex,
+        *,
+        reservation=None,
+        parking_lot=None,
+        parking_lots=None,
+        licence_plate=None,
+        deleted: bool = False,
+        **change: Any,
+    ) -> None:
+        if reservation is not None:
+            if deleted:
+                index.remove_reservation(reservation.pk)
+            else:
+                index.set_reservation(reservation)
+        if parking_lot is not None:
+            parking_lots = [parking_lot]
+        for pl in parking_lots or []:
+            if deleted:
+                index.remove_parking_lot(pl.pk)
+            else:
+                index.set_parking_lot(pl)
+        if licence_plate is not None:
+            index.set_licence_plate(licence_plate, deleted=deleted)
+
+
+_indices = _ReleaseIndices()
+
+
+def get_release_index(garage_id: int) -> ReleaseIndex:
+    return _indices.get(garage_id)
+
+
+def get_release_indices(garage_ids: list[int]) -> dict[int, ReleaseIndex]:
+    """
+    Returns the release indices of the existing garages with `garage_ids`, using a fixed
+    amount of queries.
+    """
+    return _indices.get_many(garage_ids)
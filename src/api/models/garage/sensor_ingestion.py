@@ -0,0 +1,203 @@
+from datetime import datetime
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from src.core.settings import SENSOR_DEBOUNCE
+from src.core.utils.metrics import get_count, increment, register_metrics
+
+
+class PendingSensorState(models.Model):
+    """
+    Model for a state reported by the sensor of a parking lot which differs from the saved
+    state of the parking lot, and which is written once it stayed the same for
+    `SENSOR_DEBOUNCE`, see `ingest_sensor_states()`.
+    """
+
+    parking_lot = models.OneToOneField(
+        "api.ParkingLot",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="pending_state",
+    )
+    occupied = models.BooleanField()
+    since = models.DateTimeField()
+
+    class Meta:
+        db_table = "pending_sensor_states"
+        app_label = "api"
+        indexes = [models.Index(fields=["since"])]
+
+
+def ingest_sensor_states(garage_id: int, states: list[tuple[int, bool]]) -> list[str]:
+    """
+    Ingests the occupied states reported by the sensors of the garage with `garage_id`,
+    given as `(parking_lot_no, occupied)`, before they're written to the parking lots.
+    Returns per state if the parking lot was `"updated"`, `"unchanged"`, `"pending"` or
+    `"not_found"`.
+
+    A state which is equal to the saved state of the parking lot is dropped, as well as a
+    state which is equal to the state already pending for the parking lot, thus neither
+    causes a write. A new state becomes pending and is only written once it's reported
+    again after `SENSOR_DEBOUNCE`, or otherwise by the `flush_sensor_states` job which is
+    scheduled for then, thus a sensor which flips back within the window doesn't cause a
+    write of the parking lot. The pending states are kept in a table, such that they're
+    shared between the workers. All states are ingested in a single transaction, with the
+    pending states written in bulk, and at most one flush is waiting per garage.
+    """
+    with transaction.atomic():
+        return _ingest(garage_id, states)
+
+
+def _ingest(garage_id: int, states: list[tuple[int, bool]]) -> list[str]:
+    from src.api.models import ParkingLot
+    from src.api.tasks import flush_sensor_states
+
+    now = timezone.now()
+    rows = {
+        no: (pk, occupied, pending_occupied, since)
+        for no, pk, occupied, pending_occupied, since in ParkingLot.objects.filter(
+            garage_id=garage_id, parking_lot_no__in={no for no, _ in states}
+        ).values_list(
+            "parking_lot_no",
+            "pk",
+            "occupied",
+            "pending_state__occupied",
+            "pending_state__since",
+        )
+    }
+    stored = {
+        no: (pending_occupied, since)
+        for no, (_, _, pending_occupied, since) in rows.items()
+        if pending_occupied is not None
+    }
+    pending = {no: state for no, state in stored.items() if state[0] != rows[no][1]}
+    results: list[str | None] = []
+    for no, occupied in states:
+        if no not in rows:
+            results.append("not_found")
+        elif occupied == rows[no][1]:
+            # The sensor flipped back before the new state became stable.
+            pending.pop(no, None)
+            results.append("unchanged")
+        else:
+            if no not in pending or pending[no][0] != occupied:
+                pending[no] = (occupied, now)
+            results.append(None)
+    # Only the pending states which are still stored as they were read are dropped, in
+    # case another report changed them in the meantime.
+    for occupied in (True, False):
+        if dropped := [
+            rows[no][0]
+            for no, state in stored.items()
+            if state[0] == occupied and pending.get(no) != state
+        ]:
+            PendingSensorState.objects.filter(
+                parking_lot_id__in=dropped, occupied=occupied
+            ).delete()
+    if new := {no: state for no, state in pending.items() if stored.get(no) != state}:
+        # Django 4.1 uses the names of `unique_fields` as columns, thus the column of the
+        # parking lot is given.
+        PendingSensorState.objects.bulk_create(
+            [
+                PendingSensorState(
+                    parking_lot_id=rows[no][0], occupied=occupied, since=since
+                )
+                for no, (occupied, since) in new.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["parking_lot_id"],
+            update_fields=["occupied", "since"],
+        )
+        # A flush which is already waiting reschedules itself for the states which aren't
+        # stable yet when it runs, see `flush_sensor_states`.
+        flush_sensor_states.schedule_once(SENSOR_DEBOUNCE, garage_id)
+    applied = _apply_stable(
+        garage_id,
+        {
+            no: (rows[no][0], occupied, since)
+            for no, (occupied, since) in pending.items()
+            if now - since >= SENSOR_DEBOUNCE
+        },
+    )
+    results = [
+        result or applied.get(no, "pending") for (no, _), result in zip(states, results)
+    ]
+    if suppressed := sum(result in ("unchanged", "pending") for result in results):
+        increment("sensors:suppressed", suppressed)
+    return results  # type: ignore
+
+
+def flush_pending_states(garage_id: int) -> dict[int, str]:
+    """
+    Writes the pending states of the parking lots of the garage with `garage_id` which
+    stayed the same for `SENSOR_DEBOUNCE`, which are the ones of the parking lots of which
+    the sensors didn't report again. Returns the result per parking lot number.
+    """
+    cutoff = timezone.now() - SENSOR_DEBOUNCE
+    return _apply_stable(
+        garage_id,
+        {
+            no: (pk, occupied, since)
+            for pk, no, occupied, since in PendingSensorState.objects.filter(
+                parking_lot__garage_id=garage_id, since__lte=cutoff
+            ).values_list(
+                "parking_lot_id", "parking_lot__parking_lot_no", "occupied", "since"
+            )
+        },
+    )
+
+
+def oldest_pending_state(garage_id: int) -> datetime | None:
+    """
+    Returns since when the oldest pending state of the garage with `garage_id` is pending,
+    or `None` if no state is pending.
+    """
+    return PendingSensorState.objects.filter(
+        parking_lot__garage_id=garage_id
+    ).aggregate(oldest=models.Min("since"))["oldest"]
+
+
+def _apply_stable(
+    garage_id: int, stable: dict[int, tuple[int, bool, datetime]]
+) -> dict[int, str]:
+    """
+    Writes the stable pending states, given per parking lot number as `(parking_lot_pk,
+    occupied, since)`. Every pending state is claimed by deleting it only if it's still
+    stored as given, such that a state which flipped back in the meantime, or which is
+    written by another worker, isn't written again.
+    """
+    from src.api.models import ParkingLot
+
+    if not stable:
+        return {}
+    with transaction.atomic():
+        claimed = [
+            (no, occupied)
+            for no, (pk, occupied, since) in stable.items()
+            if PendingSensorState.objects.filter(
+                pk=pk, occupied=occupied, since=since
+            ).delete()[0]
+        ]
+        if not claimed:
+            return {}
+        applied = dict(
+            zip(
+                [no for no, _ in claimed],
+                ParkingLot.objects.set_occupied(garage_id, claimed),
+            )
+        )
+    if updated := sum(result == "updated" for result in applied.values()):
+        increment("sensors:applied", updated)
+    return applied
+
+
+def _metrics() -> dict[str, int]:
+    return {
+        "pending": PendingSensorState.objects.count(),
+        "applied": get_count("sensors:applied"),
+        "suppressed": get_count("sensors:suppressed"),
+    }
+
+
+register_metrics("sensors", _metrics)
@@ -0,0 +1,121 @@
+from django.db import models, transaction
+from django.utils import timezone
+
+from src.core.models import TimeStampMixin
+from src.core.settings import JOB_LEASE, JOB_RETRY_DELAY
+from src.core.utils.jobs import get_task
+from src.core.utils.metrics import get_count, increment, register_metrics
+
+
+class JobManager(models.Manager):
+    """
+    Manager of the jobs, which are claimed and run by the workers of the `run_jobs`-command.
+    """
+
+    def claim(self, amount: int) -> list["Job"]:
+        """
+        Claims up to `amount` jobs which are due, which are leased for `JOB_LEASE`, such
+        that no other worker runs them in the meantime. If the worker crashes, the jobs are
+        claimed again once the lease expired. Every claim counts as an attempt.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(
+                self.select_for_update(skip_locked=True)
+                .filter(run_at__lte=now)
+                .filter(models.Q(locked_until=None) | models.Q(locked_until__lt=now))
+                .order_by("run_at")[:amount]
+            )
+            self.filter(pk__in=[job.pk for job in jobs]).update(
+                locked_until=now + JOB_LEASE, attempts=models.F("attempts") + 1
+            )
+        for job in jobs:
+            job.attempts += 1
+        return jobs
+
+    def run(self, job: "Job") -> bool:
+        """
+        Runs `job` and returns if it succeeded. A job which succeeded is deleted, while a
+        job which failed is retried after a delay which doubles on every attempt, until
+        the task ran out of attempts and the job is moved to the dead jobs.
+        """
+        task = None
+        try:
+            task = get_task(job.task)
+            task(*job.args, **job.kwargs)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            # A job of which the task doesn't exist is moved to the dead jobs at once.
+            max_attempts = task.max_attempts if task is not None else 1
+            with transaction.atomic():
+                if job.attempts >= max_attempts:
+                    DeadJob.objects.create(
+                        task=job.task,
+                        args=job.args,
+                        kwargs=job.kwargs,
+                        attempts=job.attempts,
+                        error=error,
+                    )
+                    job.delete()
+                    increment("jobs:dead")
+                else:
+                    delay = JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+                    self.filter(pk=job.pk).update(
+                        run_at=timezone.now() + delay, locked_until=None, error=error
+                    )
+                    increment("jobs:retried")
+            return False
+        job.delete()
+        increment("jobs:succeeded")
+        return True
+
+
+class Job(TimeStampMixin, models.Model):
+    """
+    Model for a task which is run in the background, see `src.core.utils.jobs`. The job is
+    run from `run_at` on, and `error` contains the error of its last attempt.
+    """
+
+    task = models.CharField(max_length=192)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+
+    objects = JobManager()
+
+    class Meta:
+        db_table = "jobs"
+        app_label = "api"
+        indexes = [models.Index(fields=["run_at"])]
+
+
+class DeadJob(TimeStampMixin, models.Model):
+    """
+    Model for a job which failed on all its attempts, which is kept to inspect and retry it
+    manually.
+    """
+
+    task = models.CharField(max_length=192)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    attempts = models.IntegerField()
+    error = models.TextField()
+
+    class Meta:
+        db_table = "dead_jobs"
+        app_label = "api"
+
+
+def _metrics() -> dict[str, int]:
+    return {
+        "queued": Job.objects.count(),
+        "dead": DeadJob.objects.count(),
+        "succeeded": get_count("jobs:succeeded"),
+        "retried": get_count("jobs:retried"),
+    }
+
+
+register_metrics("jobs", _metrics)
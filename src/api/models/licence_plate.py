@@ -1,10 +1,19 @@
 from datetime import timedelta, datetime
-from django.db import models
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 from src.api.models import Price
+from src.api.models.utils.garage_registry import GarageRegistry
 from src.core.models import TimeStampMixin
+from src.core.settings import SYNC_MAX_AGE
+from src.core.utils.passes import sign_pass
+
+
+def normalize_plate(plate: str) -> str:
+    """
+    Returns `plate` without whitespace and in upper case, as it's stored and cached.
+    """
+    return "".join(plate.split()).upper()
 
 
 class LicencePlate(TimeStampMixin, models.Model):
@@ -28,13 +37,24 @@ class LicencePlate(TimeStampMixin, models.Model):
     entered_at = models.DateTimeField(null=True)
     paid_at = models.DateTimeField(null=True)
 
+    # The plate, garage and payment of the licence plate as last saved, see `save()`.
+    _saved_licence_plate: str | None = None
+    _saved_garage_id: int | None = None
+    _saved_paid_at: datetime | None = None
+
     @property
     def in_garage(self) -> bool:
-        return self.garage == None
+        return self.garage_id is None
 
     @property
     def can_leave(self) -> bool:
-        return len(self.get_prices_to_pay()[0]) == 0
+        return self.can_leave_at(timezone.now())
+
+    def can_leave_at(self, at: datetime) -> bool:
+        """
+        Returns if the licence plate can leave at `at` without paying.
+        """
+        return len(self.get_prices_to_pay(at)[0]) == 0
 
         # prices: list[Price] = Price.objects.filter(garage=self.garage)  # type: ignore
         # prices = sorted(prices, key=lambda p: p.duration)
@@ -51,29 +71,22 @@ class LicencePlate(TimeStampMixin, models.Model):
         """
         Determines if the licence plate can enter a given garage at the time of execution.
         """
-        from src.api.models import Reservation
-
-        lp_reservations = Reservation.objects.filter(garage=garage, licence_plate=self)
-        if not lp_reservations:
-            return False
-        lp_reservation = min(
-            lp_reservations,
-            key=lambda r: abs(datetime.now().astimezone() - r.from_date),
-        )
-        if (
-            lp_reservation.from_date - timedelta(minutes=30)
-            <= datetime.now().astimezone()
-            <= lp_reservation.from_date
-            + (lp_reservation.to_date - lp_reservation.from_date) / 2
-        ):
-            lp_reservation.set_showed
-            return True
-        else:
+        lp_reservation = self.has_reservation(garage)
+        if lp_reservation is None:
             return False
+        lp_reservation.set_showed
+        return True
 
-    def get_prices_to_pay(self) -> tuple[list[dict[str, str | int]], int]:
+    def get_prices_to_pay(
+        self, at: datetime | None = None
+    ) -> tuple[list[dict[str, str | int]], int]:
+        """
+        Returns the prices to pay for the stay of the licence plate until `at`, which
+        defaults to now, and the time until the next price has to be paid.
+        """
+        now = at or timezone.now()
         # Fetch garage prices from database
-        prices = Price.objects.filter(garage=self.garage)
+        prices = Price.objects.filter(garage_id=self.garage_id)
         prices = filter(lambda p: p.duration > timedelta(0), prices)
         prices = sorted(prices, key=lambda p: p.duration, reverse=True)
 
@@ -83,14 +96,14 @@ class LicencePlate(TimeStampMixin, models.Model):
         # Get time the user has to pay for
         if self.paid_at is not None:
             # If the user pays for the second time.
-            time_to_pay = timezone.now() - self.paid_at
+            time_to_pay = now - self.paid_at
         elif self.entered_at is not None:
             # If the user pays for the first time.
-            time_to_pay = timezone.now() - self.entered_at
+            time_to_pay = now - self.entered_at
         else:
             time_to_pay = timedelta(0)
-        print(timezone.now(), self.paid_at)
-        print('time to pay:', time_to_pay)
+        print(now, self.paid_at)
+        print("time to pay:", time_to_pay)
         # Go over each and reduce the time to pay by the largest possible amount
         preview_items = []
         for price in prices:
@@ -113,37 +126,84 @@ class LicencePlate(TimeStampMixin, models.Model):
 
         return preview_items, refresh_time  # type: ignore
 
-    def can_reserve(self, from_date: datetime, to_date: datetime) -> bool:
+    def exit_pass(self, shortest_duration: timedelta | None = None) -> str | None:
+        """
+        Returns a signed pass with which the licence plate can leave its garage without
+        the backend, as long as its payment covers the stay, or `None` if it didn't pay.
+        A payment covers the shortest duration of the prices of the garage, see
+        `get_prices_to_pay()`, which can be given as `shortest_duration` to sign passes
+        for multiple licence plates.
+        """
+        if self.paid_at is None or self.garage_id is None:
+            return None
+        if shortest_duration is None:
+            durations = [
+                p.duration
+                for p in Price.objects.filter(garage_id=self.garage_id)
+                if p.duration > timedelta(0)
+            ]
+            if not durations:
+                return None
+            shortest_duration = min(durations)
+        return sign_pass(
+            {
+                "type": "paid",
+                "licence_plate": self.licence_plate,
+                "garage": self.garage_id,
+            },
+            self.paid_at,
+            self.paid_at + shortest_duration,
+        )
+
+    def can_reserve(
+        self,
+        garage_id: int,
+        from_date: datetime,
+        to_date: datetime,
+        *,
+        exclude: int | None = None,
+    ) -> bool:
+        """
+        Returns if the licence plate has no other reservation in the garage which overlaps
+        with the given time frame. The reservation with pk `exclude` is not taken into
+        account, which is used when a reservation is updated.
+        """
         from src.api.models import Reservation
-        from src.core.utils import overlap
 
-        user_reservations = Reservation.objects.filter(user=self.pk)
         return not any(
-            map(
-                lambda reservation: overlap(
-                    reservation.from_date, reservation.to_date, from_date, to_date
-                ),
-                user_reservations,
-            )
+            r.licence_plate_id == self.pk and r.pk != exclude
+            for r in Reservation.objects.overlapping(garage_id, from_date, to_date)
         )
 
-    def has_reservation(self):
+    def has_reservation(self, garage=None):
         """
-        Returns if the licence plate has a reservation.
+        Returns if the licence plate has a reservation which it can enter with at the time
+        of execution, i.e. from 30 minutes before its start until half of it has passed.
         Returns the reservation or None if none.
+
+        If the `garage` is given, only the reservations in that garage are considered. The
+        reservations are looked up on the index of their licence plate, thus the lookup
+        doesn't depend on the size of the garage.
         """
         from src.api.models import Reservation
 
-        lp_reservations = Reservation.objects.filter(licence_plate=self)
+        now = timezone.now()
+        lp_reservations = Reservation.objects.filter(
+            licence_plate=self,
+            from_date__lte=now + timedelta(minutes=30),
+            to_date__gte=now,
+        )
+        if garage is not None:
+            lp_reservations = lp_reservations.filter(garage_id=garage.pk)
         if not lp_reservations:
             return None
         lp_reservation = min(
             lp_reservations,
-            key=lambda r: abs(datetime.now().astimezone() - r.from_date),
+            key=lambda r: abs(now - r.from_date),
         )
         if (
             lp_reservation.from_date - timedelta(minutes=30)
-            <= datetime.now().astimezone()
+            <= now
             <= lp_reservation.from_date
             + (lp_reservation.to_date - lp_reservation.from_date) / 2
         ):
@@ -151,14 +211,100 @@ class LicencePlate(TimeStampMixin, models.Model):
         else:
             return None
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_licence_plate = instance.licence_plate
+        instance._saved_garage_id = instance.garage_id
+        instance._saved_paid_at = instance.paid_at
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Saves the licence plate and records entering or leaving a garage, and paying, in
+        its parking sessions. The cached lookups of the licence plate are invalidated. The
+        plate is stored normalized, see `normalize_plate()`, as it's looked up at the gate.
+        """
+        from src.api.models import ParkingSession
+        from src.api.models.licence_plate_cache import invalidate_plates
+
+        self.licence_plate = normalize_plate(self.licence_plate)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.garage_id != self._saved_garage_id:
+                if self._saved_garage_id is not None:
+                    ParkingSession.objects.exit(self.pk, timezone.now())
+                if self.garage_id is not None:
+                    ParkingSession.objects.enter(
+                        self, self.garage_id, self.entered_at or timezone.now()
+                    )
+            if self.garage_id is not None and self.paid_at != self._saved_paid_at:
+                ParkingSession.objects.paid(self.pk, self.paid_at)
+            invalidate_plates(
+                *filter(None, [self._saved_licence_plate, self.licence_plate])
+            )
+            if self._saved_licence_plate not in (None, self.licence_plate):
+                RemovedLicencePlate.objects.record(self._saved_licence_plate)
+        self._changed(self._saved_garage_id, self.garage_id)
+        self._saved_licence_plate = self.licence_plate
+        self._saved_garage_id = self.garage_id
+        self._saved_paid_at = self.paid_at
+
     def delete(self) -> tuple[int, dict[str, int]]:
-        from src.api.models import Reservation
+        from src.api.models import ParkingSession, Reservation
+        from src.api.models.licence_plate_cache import invalidate_plates
 
         reservations = Reservation.objects.filter(licence_plate=self.pk)
         for reservation in reservations:
             reservation.delete()
-        return super().delete()
+        pk = self.pk
+        if self._saved_garage_id is not None:
+            ParkingSession.objects.exit(pk, timezone.now())
+        deleted = super().delete()
+        invalidate_plates(self.licence_plate)
+        RemovedLicencePlate.objects.record(self.licence_plate)
+        self.pk = pk
+        self._changed(self._saved_garage_id, self.garage_id, deleted=True)
+        self.pk = None
+        return deleted
+
+    def _changed(self, *garage_ids: int | None, deleted: bool = False) -> None:
+        """
+        Registers a change of the licence plate in the garages it entered or left, as the
+        parking lots with the licence plate are occupied until it's expected to leave.
+        """
+        for garage_id in {g for g in garage_ids if g is not None}:
+            GarageRegistry.changed(garage_id, licence_plate=self, deleted=deleted)
 
     class Meta:
         db_table = "licence_plates"
         app_label = "api"
+        indexes = [models.Index(fields=["updated_at"])]
+
+
+class RemovedLicencePlateManager(models.Manager):
+    def record(self, plate: str) -> None:
+        """
+        Records that `plate` was removed now, and prunes the removals which are older than
+        `SYNC_MAX_AGE`, as a Raspberry Pi which is further behind gets a full snapshot.
+        """
+        now = timezone.now()
+        self.filter(removed_at__lt=now - SYNC_MAX_AGE).delete()
+        self.create(plate=plate, removed_at=now)
+
+
+class RemovedLicencePlate(models.Model):
+    """
+    Model for a licence plate which was deleted or renamed at `removed_at`, such that the
+    Raspberry Pis which synchronize the changes after that drop it, see `GateSyncView`.
+    """
+
+    plate = models.CharField(max_length=192)
+    removed_at = models.DateTimeField()
+
+    objects = RemovedLicencePlateManager()
+
+    class Meta:
+        db_table = "removed_licence_plates"
+        app_label = "api"
+        indexes = [models.Index(fields=["removed_at"])]
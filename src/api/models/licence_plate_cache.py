@@ -0,0 +1,209 @@
+import logging
+from datetime import timedelta
+from secrets import token_hex
+from threading import Lock, Thread
+from time import sleep
+
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+
+from src.api.models.licence_plate import LicencePlate, normalize_plate
+from src.core.settings import (
+    PLATE_CACHE_TIMEOUT,
+    PLATE_INDEX_REBUILD,
+    PLATE_MATCH_DISTANCE,
+)
+from src.core.utils.metrics import get_count, increment, register_metrics
+from src.core.utils.plate_index import PlateIndex
+
+logger = logging.getLogger(__name__)
+
+# The fields of the user which are cached with its licence plates.
+CACHED_USER_FIELDS = ["email", "role", "is_active", "stripe_identifier"]
+
+# The versions outlive the records stored under them.
+_VERSION_TIMEOUT = PLATE_CACHE_TIMEOUT.total_seconds() * 2
+
+# How long to wait before building the index of the licence plates again after it failed.
+_BUILD_RETRY = timedelta(minutes=1)
+
+
+def get_licence_plate(plate: str) -> LicencePlate | None:
+    """
+    Returns the licence plate `plate` with its user, or `None` if it doesn't exist.
+
+    A compact record of the licence plate and the fields of its user which are used by the
+    gate is kept in the cache of Django, such that repeated lookups of the same licence
+    plate don't query the licence plates and users, in every worker. The record is stored
+    with the version of the licence plate it was read under, which is replaced once a write
+    to the licence plate, its user or its parking session is committed, see
+    `invalidate_plates()`. Thus a record which was read before a write is never used after
+    it, even if it's stored after the write. A record is only used if its version is still
+    present, as a version which expired or got culled can't tell if the record is stale.
+    Unknown licence plates are cached as well. A hit takes a single read of the cache, as
+    the hits and misses are counted in the worker, see `increment()`.
+
+    The user only has the cached fields loaded, its other fields are loaded when they're
+    accessed.
+    """
+    from src.users.models import User
+
+    plate = normalize_plate(plate)
+    record_key, version_key = f"plates:{plate}", f"plates:{plate}:version"
+    cached = cache.get_many([record_key, version_key])
+    version = cached.get(version_key)
+    lp_fields = [f.attname for f in LicencePlate._meta.concrete_fields]
+    if version is not None and cached.get(record_key, (None,))[0] == version:
+        increment("plates:hits")
+        record = cached[record_key][1]
+    else:
+        increment("plates:misses")
+        if version is None:
+            # The version expired or got culled, thus a new one is added, unless another
+            # worker or a write added one in the meantime.
+            version = token_hex(8)
+            if not cache.add(version_key, version, _VERSION_TIMEOUT):
+                version = cache.get(version_key, token_hex(8))
+        record = (
+            LicencePlate.objects.filter(licence_plate=plate)
+            .values_list(
+                *lp_fields, *[f"user__{field}" for field in CACHED_USER_FIELDS]
+            )
+            .first()
+        )
+        cache.set(record_key, (version, record), PLATE_CACHE_TIMEOUT.total_seconds())
+    if record is None:
+        return None
+    lp = LicencePlate.from_db("default", lp_fields, record[: len(lp_fields)])
+    lp.user = User.from_db(
+        "default", ["id", *CACHED_USER_FIELDS], [lp.user_id, *record[len(lp_fields) :]]
+    )
+    return lp
+
+
+def invalidate_plates(*plates: str) -> None:
+    """
+    Replaces the versions of `plates` once the current transaction is committed, which
+    makes their cached records stale in every worker.
+    """
+    keys = {f"plates:{normalize_plate(plate)}:version" for plate in plates}
+    if not keys:
+        return
+    transaction.on_commit(
+        lambda: cache.set_many({key: token_hex(8) for key in keys}, _VERSION_TIMEOUT)
+    )
+
+
+class _RegisteredPlates:
+    """
+    Index of the registered licence plates in this worker. The index is built by a
+    background thread, which rebuilds it every `PLATE_INDEX_REBUILD` to drop deleted and
+    renamed licence plates, and swaps it in once it's complete, thus a lookup never waits
+    for it. The first index is built when the server starts, see `start_plate_matching()`,
+    and until it's built, no licence plate is matched. New licence plates are added before
+    every lookup with a query on the primary key. A matched licence plate is looked up
+    again, thus one which was deleted since isn't returned.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._index: PlateIndex | None = None
+        self._max_pk = 0
+        self._thread: Thread | None = None
+
+    def start(self) -> None:
+        """
+        Starts building the index in the background, if it isn't yet.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def match(self, plate: str) -> str | None:
+        self.start()
+        with self._lock:
+            index, max_pk = self._index, self._max_pk
+        if index is None:
+            return None
+        new = list(
+            LicencePlate.objects.filter(pk__gt=max_pk)
+            .order_by("pk")
+            .values_list("pk", "licence_plate")
+        )
+        with self._lock:
+            # Only added if the index wasn't swapped in the meantime.
+            if new and self._index is index:
+                for _, registered in new:
+                    index.add(normalize_plate(registered))
+                self._max_pk = max(self._max_pk, new[-1][0])
+        return index.match(plate)
+
+    def build(self) -> None:
+        """
+        Builds the index of all registered licence plates and swaps it in.
+        """
+        index, max_pk = PlateIndex(PLATE_MATCH_DISTANCE), 0
+        plates = LicencePlate.objects.order_by("pk").values_list("pk", "licence_plate")
+        for pk, registered in plates.iterator():
+            index.add(normalize_plate(registered))
+            max_pk = pk
+        with self._lock:
+            self._index, self._max_pk = index, max_pk
+
+    def _run(self) -> None:
+        while True:
+            close_old_connections()
+            try:
+                self.build()
+                delay = PLATE_INDEX_REBUILD
+            except Exception:
+                logger.exception("Building the index of the licence plates failed.")
+                delay = _BUILD_RETRY
+            # The connection isn't kept open until the next build.
+            connection.close()
+            sleep(delay.total_seconds())
+
+
+_registered_plates = _RegisteredPlates()
+
+
+def start_plate_matching() -> None:
+    """
+    Starts building the index of the registered licence plates, which is done when the
+    server starts, such that misread licence plates are matched from the first read.
+    """
+    _registered_plates.start()
+
+
+def match_licence_plate(plate: str) -> LicencePlate | None:
+    """
+    Returns the registered licence plate which `plate` is a misread of, like `1ABC0O1` for
+    `1ABC001`, or `None` if no licence plate is close enough, see `PlateIndex`. This is
+    used when the exact lookup of `plate` misses.
+    """
+    if (match := _registered_plates.match(normalize_plate(plate))) is None:
+        increment("plates:unmatched")
+        return None
+    increment("plates:matched")
+    return get_licence_plate(match)
+
+
+def _metrics() -> dict[str, int | float]:
+    hits, misses = get_count("plates:hits"), get_count("plates:misses")
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+def _matching_metrics() -> dict[str, int]:
+    return {
+        "matched": get_count("plates:matched"),
+        "unmatched": get_count("plates:unmatched"),
+    }
+
+
+register_metrics("plates_cache", _metrics)
+register_metrics("plate_matching", _matching_metrics)
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+from django.db import models
+from django.utils import timezone
+
+from src.core.models import TimeStampMixin
+
+
+class ParkingSessionManager(models.Manager):
+    """
+    Manager of the parking sessions, which are only appended on entry and closed on exit.
+    """
+
+    def enter(self, licence_plate, garage_id: int, entered_at: datetime):
+        """
+        Opens a session for `licence_plate` which entered the garage with `garage_id`.
+        """
+        return self.create(
+            licence_plate=licence_plate,
+            plate=licence_plate.licence_plate,
+            garage_id=garage_id,
+            entered_at=entered_at,
+        )
+
+    def exit(self, licence_plate_id: int, exited_at: datetime) -> None:
+        """
+        Closes the open session of the licence plate with `licence_plate_id`.
+        """
+        self.filter(licence_plate_id=licence_plate_id, exited_at=None).update(
+            exited_at=exited_at, updated_at=timezone.now()
+        )
+
+    def paid(self, licence_plate_id: int, paid_until: datetime | None) -> None:
+        """
+        Sets until when the open session of the licence plate with `licence_plate_id` is
+        paid.
+        """
+        self.filter(licence_plate_id=licence_plate_id, exited_at=None).update(
+            paid_until=paid_until
+        )
+
+    def last_entered(self, garage_id: int):
+        """
+        Returns the licence plate which entered the garage with `garage_id` last and is
+        still inside, or `None` if no licence plate is inside.
+        """
+        session = (
+            self.filter(garage_id=garage_id, exited_at=None)
+            .exclude(licence_plate=None)
+            .select_related("licence_plate")
+            .order_by("-entered_at")
+            .first()
+        )
+        return session.licence_plate if session is not None else None
+
+
+class ParkingSession(TimeStampMixin, models.Model):
+    """
+    Model for a stay of a licence plate in a garage, from `entered_at` until `exited_at`,
+    which is `null` as long as the licence plate is inside. A session is opened and closed
+    by `LicencePlate.save()`, while the `garage`, `entered_at` and `paid_at` columns of the
+    licence plate keep its current state. The `plate` is kept as well, such that the
+    history remains when the licence plate is deleted.
+    """
+
+    licence_plate = models.ForeignKey(
+        "api.LicencePlate", on_delete=models.SET_NULL, null=True
+    )
+    plate = models.CharField(max_length=192)
+    garage = models.ForeignKey("api.Garage", on_delete=models.CASCADE)
+    entered_at = models.DateTimeField()
+    exited_at = models.DateTimeField(null=True)
+    paid_until = models.DateTimeField(null=True)
+
+    objects = ParkingSessionManager()
+
+    class Meta:
+        db_table = "parking_sessions"
+        app_label = "api"
+        indexes = [
+            models.Index(fields=["garage", "entered_at"]),
+            models.Index(fields=["plate", "exited_at"]),
+            models.Index(fields=["licence_plate", "exited_at"]),
+        ]
@@ -12,3 +12,4 @@ class Notification(TimeStampMixin, models.Model):
     class Meta:
         db_table = "notifications"
         app_label = "api"
+        indexes = [models.Index(fields=["user", "seen"])]
@@ -1,8 +1,121 @@
+from copy import copy
 from datetime import timedelta, datetime
+from typing import Any
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
 
+from src.api.models.utils.garage_registry import GarageRegistry
 from src.core.models import TimeStampMixin
+from src.core.utils import IntervalIndex, sign_pass
+
+
+class _GarageIndex:
+    """
+    In-memory index of the reservations of a single garage, which are not ended at the
+    moment the index is built (`since`).
+    """
+
+    def __init__(self, since: datetime) -> None:
+        self.since = since
+        self.index: IntervalIndex["Reservation"] = IntervalIndex()
+
+    def add(self, reservation: "Reservation") -> None:
+        reservation = copy(reservation)
+        # Don't keep the related objects of the reservation alive in the index.
+        reservation._state.fields_cache = {}
+        self.index.add(
+            reservation.pk, reservation.from_date, reservation.to_date, reservation
+        )
+
+
+class _ReservationIndices(GarageRegistry[_GarageIndex]):
+    """
+    Registry of the in-memory reservation indices of the garages.
+    """
+
+    def build(self, garage_id: int) -> _GarageIndex:
+        return self.build_many([garage_id])[garage_id]
+
+    def build_many(self, garage_ids: list[int]) -> dict[int, _GarageIndex]:
+        since = timezone.now()
+        indices = {garage_id: _GarageIndex(since) for garage_id in garage_ids}
+        for reservation in Reservation.objects.filter(garage_id__in=garage_ids).filter(
+            Q(to_date__gte=since) | Q(from_date__gte=since)
+        ):
+            indices[reservation.garage_id].add(reservation)
+        return indices
+
+    def apply(
+        self,
+        index: _GarageIndex,
+        *,
+        reservation: "Reservation | None" = None,
+        deleted: bool = False,
+        **change: Any,
+    ) -> None:
+        if reservation is None:
+            return
+        if deleted:
+            index.index.remove(reservation.pk)
+        else:
+            index.add(reservation)
+
+
+_indices = _ReservationIndices()
+
+
+class ReservationManager(models.Manager):
+    """
+    Custom manager for the `Reservation`-class, which keeps an in-memory interval index of
+    the reservations per garage to answer overlap queries, see `IntervalIndex`.
+
+    The index of a garage is built from the database on first use and kept up to date on
+    every `save()` and `delete()` of a reservation, see `GarageRegistry`.
+    """
+
+    def overlapping(
+        self, garage_id: int, from_date: datetime, to_date: datetime
+    ) -> list["Reservation"]:
+        """
+        Returns the reservations in the garage with `garage_id` which overlap with the given
+        time frame, ordered on `pk`. The returned reservations are copies, thus they can be
+        changed and saved by the caller.
+        """
+        return self._overlapping(garage_id, _indices.get(garage_id), from_date, to_date)
+
+    def overlapping_many(
+        self, garage_ids: list[int], from_date: datetime, to_date: datetime
+    ) -> dict[int, list["Reservation"]]:
+        """
+        Returns the reservations per garage with `garage_ids` which overlap with the given
+        time frame, like `overlapping()`, of which the indices are looked up together.
+        """
+        return {
+            garage_id: self._overlapping(garage_id, index, from_date, to_date)
+            for garage_id, index in _indices.get_many(garage_ids).items()
+        }
+
+    def _overlapping(
+        self,
+        garage_id: int,
+        index: _GarageIndex,
+        from_date: datetime,
+        to_date: datetime,
+    ) -> list["Reservation"]:
+        if from_date.astimezone() < index.since:
+            # The index only holds the reservations which weren't ended when it was built.
+            reservations = list(
+                self.filter(
+                    garage_id=garage_id, from_date__lte=to_date, to_date__gte=from_date
+                )
+            )
+        else:
+            reservations = [
+                copy(r) for r in index.index.overlapping(from_date, to_date)
+            ]
+        return sorted(reservations, key=lambda r: r.pk)
 
 
 class Reservation(TimeStampMixin, models.Model):
@@ -14,11 +127,55 @@ class Reservation(TimeStampMixin, models.Model):
     to_date = models.DateTimeField()
     showed = models.BooleanField(default=False)
 
+    objects = ReservationManager()
+
+    # The parking lot of the reservation as last saved, see `save()`.
+    _saved_parking_lot_id: int | None = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_parking_lot_id = instance.parking_lot_id
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Saves the reservation and registers the change in its garage. The parking lots of
+        the reservation, before and after, get the new revision of the garage, as their
+        availability changed.
+        """
+        from src.api.models import Garage, ParkingLot
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            revision = GarageRegistry.changed(self.garage_id, reservation=self)
+            ParkingLot.objects.filter(
+                pk__in={self._saved_parking_lot_id, self.parking_lot_id} - {None}
+            ).update(revision=revision)
+        self._saved_parking_lot_id = self.parking_lot_id
+        Garage.objects.recount_booked(self.garage_id)
+
+    def delete(self) -> tuple[int, dict[str, int]]:
+        from src.api.models import Garage, ParkingLot
+
+        pk = self.pk
+        with transaction.atomic():
+            deleted = super().delete()
+            self.pk = pk
+            revision = GarageRegistry.changed(
+                self.garage_id, reservation=self, deleted=True
+            )
+            ParkingLot.objects.filter(pk=self.parking_lot_id).update(revision=revision)
+        Garage.objects.recount_booked(self.garage_id)
+        self.pk = None
+        return deleted
+
     def reassign(self) -> None:
-        from src.api.models import ParkingLot
+        from src.api.tasks import notify
 
         pl = self.garage.get_random(self.from_date, self.to_date)
-        self.user.notify(
+        notify.enqueue(
+            self.user_id,
             "Parking lot reassignment",
             f"Someone else parked on your reserved parking lot, thus it bas been reassigned from {self.parking_lot.parking_lot_no} to {pl.parking_lot_no}. The time of the reservation remains unchanged.",
         )
@@ -44,6 +201,24 @@ class Reservation(TimeStampMixin, models.Model):
         self.showed = True
         self.save()
 
+    def entry_pass(self) -> str:
+        """
+        Returns a signed pass with which the licence plate of the reservation can enter
+        the garage without the backend, during the same window as with
+        `LicencePlate.has_reservation()`.
+        """
+        return sign_pass(
+            {
+                "type": "reservation",
+                "reservation": self.pk,
+                "licence_plate": self.licence_plate.licence_plate,
+                "garage": self.garage_id,
+            },
+            self.from_date - timedelta(minutes=30),
+            self.from_date + (self.to_date - self.from_date) / 2,
+        )
+
     class Meta:
         db_table = "reservations"
         app_label = "api"
+        indexes = [models.Index(fields=["user", "from_date"])]
@@ -0,0 +1,139 @@
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import Any, Generic, TypeVar
+
+from django.db import transaction
+
+T = TypeVar("T")
+
+
+class GarageRegistry(ABC, Generic[T]):
+    """
+    Base class for in-memory data which is kept per garage, like an index of its
+    reservations. Subclasses implement `build()`, which computes the data of a garage from
+    the database, and `apply()`, which updates the data incrementally after a change.
+
+    Every piece of data is tagged with the revision of the garage it corresponds with.
+    Changes go through `GarageRegistry.changed()`, which bumps the revision of the garage in
+    the database and applies the change to the data of all registries of this worker once
+    the transaction is committed. When the data of a garage is requested and the revision
+    in the database differs, another worker changed the garage, thus the data is rebuilt.
+
+    Data which is built inside a transaction isn't kept, as it may contain changes which
+    are rolled back, while a later change can bump the garage to the same revision.
+    """
+
+    registries: list["GarageRegistry"] = []
+
+    def __init__(self) -> None:
+        self._entries: dict[int, tuple[int, T]] = {}
+        self._lock = Lock()
+        GarageRegistry.registries.append(self)
+
+    @abstractmethod
+    def build(self, garage_id: int) -> T:
+        """
+        Computes the data of the garage with `garage_id` from the database.
+        """
+
+    def build_many(self, garage_ids: list[int]) -> dict[int, T]:
+        """
+        Computes the data of multiple garages, which subclasses can override to do it with
+        a fixed amount of queries.
+        """
+        return {garage_id: self.build(garage_id) for garage_id in garage_ids}
+
+    def apply(self, value: T, **change: Any) -> None:
+        """
+        Applies a change to the data of a garage. The keyword arguments are the ones passed
+        to `GarageRegistry.changed()`.
+        """
+        pass
+
+    def get(self, garage_id: int) -> T:
+        """
+        Returns the data of the garage with `garage_id`, which is rebuilt if it doesn't
+        correspond with the revision of the garage in the database.
+        """
+        from src.api.models import Garage
+
+        revision = Garage.objects.revision(garage_id) or 0
+        with self._lock:
+            entry = self._entries.get(garage_id)
+            if entry is not None and entry[0] == revision:
+                return entry[1]
+        value = self.build(garage_id)
+        if not transaction.get_connection().in_atomic_block:
+            with self._lock:
+                self._entries[garage_id] = (revision, value)
+        return value
+
+    def get_many(self, garage_ids: list[int]) -> dict[int, T]:
+        """
+        Returns the data of the existing garages with `garage_ids`, of which the revisions
+        are read in a single query. The data which doesn't correspond with the revision of
+        its garage is rebuilt with `build_many()`.
+        """
+        from src.api.models import Garage
+
+        revisions = Garage.objects.revisions(garage_ids)
+        values = {}
+        with self._lock:
+            for garage_id, revision in revisions.items():
+                entry = self._entries.get(garage_id)
+                if entry is not None and entry[0] == revision:
+                    values[garage_id] = entry[1]
+        built = self.build_many([g for g in revisions if g not in values])
+        if not transaction.get_connection().in_atomic_block:
+            with self._lock:
+                for garage_id, value in built.items():
+                    self._entries[garage_id] = (revisions[garage_id], value)
+        values.update(built)
+        return values
+
+    def discard(self, garage_id: int) -> None:
+        """
+        Drops the data of the garage with `garage_id`, such that it's rebuilt on next use.
+        """
+        with self._lock:
+            self._entries.pop(garage_id, None)
+
+    def _update(self, garage_id: int, revision: int | None, change: dict) -> None:
+        with self._lock:
+            entry = self._entries.get(garage_id)
+            if entry is None:
+                return
+            if revision is None or entry[0] + 1 != revision:
+                # Another worker changed the garage as well.
+                del self._entries[garage_id]
+                return
+            self.apply(entry[1], **change)
+            self._entries[garage_id] = (revision, entry[1])
+
+    @staticmethod
+    def changed(
+        garage_id: int,
+        *,
+        counters: dict[str, int] | None = None,
+        resync: bool = False,
+        **change: Any,
+    ) -> int | None:
+        """
+        Registers a change in the garage with `garage_id`: the revision of the garage is
+        bumped together with the given `counters` of the garage and the change is applied
+        to the data of all registries once the transaction is committed, thus a change
+        which is rolled back never reaches them. Returns the new revision. If `resync`,
+        clients which synchronize the parking lots of the garage have to do it in full.
+        """
+        from src.api.models import Garage
+
+        revision = Garage.objects.bump_revision(
+            garage_id, resync=resync, **(counters or {})
+        )
+
+        def update() -> None:
+            for registry in GarageRegistry.registries:
+                registry._update(garage_id, revision, change)
+
+        transaction.on_commit(update)
+        return revision
@@ -5,24 +5,30 @@ from src.api.serializers.garages.garage_settings_serializer import (
     GarageSettingsSerializer,
 )
 
-from src.api.serializers.garages.garage_serializer import GarageSerializer
+from src.api.serializers.garages.garage_serializer import (
+    GarageSerializer,
+    GarageSummarySerializer,
+)
 
 from src.api.serializers.garages.opening_hour_serializer import OpeningHourSerializer
 
 from src.api.serializers.licence_plate_serializer import (
     LicencePlateSerializer,
     LicencePlateRPiSerializer,
+    OfflineDecisionsSerializer,
 )
 
 from src.api.serializers.garages.parking_lot_serializer import (
     ParkingLotSerializer,
     RPIParkingLotSerializer,
+    RPIParkingLotsSerializer,
 )
 
 from src.api.serializers.users.users_serializer import (
     UserSerializer,
     SignUpSerializer,
     LoginSerializer,
+    TokenLoginSerializer,
     ChangePasswordSerializer,
 )
 from src.api.serializers.users.reservation_serializer import (
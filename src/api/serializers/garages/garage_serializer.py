@@ -1,7 +1,10 @@
+from datetime import datetime
 from typing import Any
 
+from rest_framework import serializers
+
 from src.api.models import Garage, GarageSettings, Location
-from src.api.serializers import GarageSettingsSerializer
+from src.api.serializers import GarageSettingsSerializer, LocationsSerializer
 from src.api.serializers.garages.parking_lot_serializer import ParkingLotSerializer
 from src.core.serializers import APIForeignKeySerializer
 
@@ -50,12 +53,42 @@ class GarageSerializer(APIForeignKeySerializer):
             "reservations",
             "entered",
             "next_free_spot",
+            "parking_lots_count",
+            "occupied_count",
+            "free_lots",
         ]
         read_only_fields = [
             "parking_lots",
             "reservations",
             "entered",
             "next_free_spot",
+            "parking_lots_count",
+            "occupied_count",
+            "free_lots",
         ]
         optional_fields = ["parking_lots"]
         extra_kwargs = {"parking_lots": {"required": False, "allow_null": True}}
+
+
+class GarageSummarySerializer(serializers.ModelSerializer):
+    """
+    Serializer for serializing lists of garages, which only uses the counters of the
+    garages and their locations, instead of their parking lots and reservations. The
+    release indices of the garages are passed as `release_indices` in the context, such
+    that the next free spots are looked up with a fixed amount of queries.
+    """
+
+    location = LocationsSerializer(source="garage_settings.location")
+    free = serializers.IntegerField(source="free_lots")
+    total = serializers.IntegerField(source="parking_lots_count")
+    next_free_spot = serializers.SerializerMethodField()
+
+    def get_next_free_spot(self, garage: Garage) -> datetime | None:
+        if (index := self.context.get("release_indices", {}).get(garage.pk)) is None:
+            return garage.next_free_spot
+        return index.next_free_spot()
+
+    class Meta:
+        model = Garage
+        fields = ["id", "name", "location", "free", "total", "next_free_spot"]
+        read_only_fields = fields
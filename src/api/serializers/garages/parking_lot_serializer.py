@@ -32,3 +32,22 @@ class RPIParkingLotSerializer(APIForeignKeySerializer):
     class Meta:
         model = ParkingLot
         fields = ["id", "parking_lot_no", "occupied", "garage_id"]
+
+
+class RPIParkingLotStateSerializer(serializers.Serializer):
+    """
+    Serializer for a single sensor state in a batch update coming from the Raspberry Pi.
+    """
+
+    parking_lot_no = serializers.IntegerField()
+    occupied = serializers.BooleanField()
+
+
+class RPIParkingLotsSerializer(serializers.Serializer):
+    """
+    Serializer for serializing batch requests coming from the Raspberry Pi to update the
+    parking lots of a garage.
+    """
+
+    garage_id = serializers.IntegerField()
+    parking_lots = RPIParkingLotStateSerializer(many=True, allow_empty=False)
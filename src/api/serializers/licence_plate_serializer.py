@@ -17,7 +17,7 @@ class LicencePlateSerializer(serializers.ModelSerializer):
             "garage_id",
             "enabled",
             "licence_plate",
-            "can_leave"
+            "can_leave",
         ]
         read_only_field = ["garage_id"]
 
@@ -33,3 +33,24 @@ class LicencePlateRPiSerializer(APIForeignKeySerializer):
     class Meta:
         model = LicencePlate
         fields = ["garage_id", "licence_plate"]
+
+
+class OfflineDecisionSerializer(serializers.Serializer):
+    """
+    Serializer for a decision which the Raspberry Pi made while the backend was
+    unreachable.
+    """
+
+    licence_plate = serializers.CharField(max_length=7)
+    action = serializers.ChoiceField(choices=["enter", "exit"])
+    at = serializers.DateTimeField()
+    gate_pass = serializers.CharField(required=False)
+
+
+class OfflineDecisionsSerializer(serializers.Serializer):
+    """
+    Serializer for serializing the bulk upload of the offline decisions of the Raspberry
+    Pi at a garage.
+    """
+
+    decisions = OfflineDecisionSerializer(many=True, allow_empty=False)
@@ -50,7 +50,12 @@ class PostReservationSerializer(APIForeignKeySerializer):
         to_date: datetime = data["to_date"]
         lp_id: int = data["licence_plate_id"]
         lp = LicencePlate.objects.get(pk=lp_id)
-        if not lp.can_reserve(from_date, to_date):
+        if not lp.can_reserve(
+            data["garage_id"],
+            from_date,
+            to_date,
+            exclude=self.instance.pk if self.instance is not None else None,
+        ):
             raise serializers.ValidationError(
                 "This licence plate already has a reservation that time."
             )
@@ -92,6 +92,15 @@ class LoginSerializer(serializers.ModelSerializer):
         fields = ["email", "password"]
 
 
+class TokenLoginSerializer(serializers.Serializer):
+    """
+    Serializer for serializing the POST-requests for logging in generated users with the
+    login token of their QR-code.
+    """
+
+    token = serializers.CharField()
+
+
 class ChangePasswordSerializer(serializers.ModelSerializer):
     """
     Serializer for serializing the change password requests for users.
@@ -0,0 +1,174 @@
+import json
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from hashlib import md5
+
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+
+from src.api.models import Charge, Garage, LicencePlate, Price, Reservation
+from src.api.models.garage.sensor_ingestion import (
+    flush_pending_states,
+    oldest_pending_state,
+)
+from src.core.settings import EMAIL_HOST_USER, JOBS_EAGER, SENSOR_DEBOUNCE
+from src.core.utils import task
+from src.core.utils import payment_mails
+from src.users.backends import EmailVerificationTokenGenerator
+from src.users.models import User
+
+
+@task
+def send_email_verification(user_id: int) -> None:
+    """
+    Sends the mail with the link to activate the account of the user with `user_id`.
+    """
+    user = User.objects.get(pk=user_id)
+    token = EmailVerificationTokenGenerator().make_token(user)
+    encoded = urlsafe_b64encode(force_bytes(user.pk))
+    url = f"https://po3backend.ddns.net/app/user-activation?uidB64={str(encoded)[2:-1]}&token={token}"
+    msg_plain = render_to_string("activate_user_template.txt", {"activation_url": url})
+    msg_html = render_to_string("activate_user_template.html", {"activation_url": url})
+    send_mail(
+        "Activate Your Account",
+        msg_plain,
+        EMAIL_HOST_USER,
+        [user.email],
+        html_message=msg_html,
+    )
+
+
+@task
+def send_payment_mail(
+    result: int, user_id: int | str, invoice_url: str | None = None
+) -> None:
+    """
+    Sends the mail with the `payment_mails.PaymentResult` of a payment of the user.
+    """
+    payment_mails.send_payment_mail(result, user_id, invoice_url)  # type: ignore
+
+
+@task
+def send_invoice(
+    user_id: int, licence_plate: str, items: list[list[int]], key: str | None = None
+) -> None:
+    """
+    Sends an invoice for `licence_plate` to the user with `user_id`, given the pks and
+    quantities of the prices to pay, which are computed when the licence plate leaves.
+    The Stripe requests use the idempotency key `key`, which defaults to one derived from
+    the arguments of the job, such that a retry of the job doesn't invoice twice. As two
+    stays with the same prices get the same default, a `key` unique for the stay should
+    be passed.
+    """
+    if key is None:
+        job = json.dumps([user_id, licence_plate, items])
+        key = f"invoice-{md5(job.encode()).hexdigest()}"
+    prices = Price.objects.in_bulk([price_id for price_id, _ in items])
+    User.objects.get(pk=user_id).create_invoice(
+        licence_plate,
+        [
+            {"price": prices[price_id], "quantity": quantity}
+            for price_id, quantity in items
+        ],
+        idempotency_key=key,
+    )
+
+
+@task
+def flush_sensor_states(garage_id: int) -> None:
+    """
+    Writes the pending sensor states of the garage with `garage_id` which became stable,
+    see `flush_pending_states()`. The flush is scheduled again for the states which became
+    pending after it was scheduled, as at most one flush is waiting per garage.
+    """
+    flush_pending_states(garage_id)
+    # A task which runs directly can't wait for the states to become stable.
+    if not JOBS_EAGER and (oldest := oldest_pending_state(garage_id)) is not None:
+        flush_sensor_states.schedule_once(
+            max(oldest + SENSOR_DEBOUNCE - timezone.now(), timedelta(0)), garage_id
+        )
+
+
+@task
+def settle_charges(user_id: int) -> None:
+    """
+    Settles the pending charges of the user with `user_id` with Stripe, see
+    `ChargeManager.settle()`. A failure is retried by the job, while the charges stay
+    pending.
+    """
+    if (user := User.objects.filter(pk=user_id).first()) is not None:
+        Charge.objects.settle(user)
+
+
+@task
+def generate_qr_code(user_id: int, token: str) -> None:
+    """
+    Generates and prints the QR-code with the login token of the generated user with
+    `user_id`.
+    """
+    user = User.objects.get(pk=user_id)
+    user.generate_qr_code(token)
+    user.print_qr_code()
+
+
+@task
+def notify(user_id: int, title: str, content: str) -> None:
+    User.objects.get(pk=user_id).notify(title, content)
+
+
+@task
+def enter_garage(
+    licence_plate_id: int,
+    garage_id: int,
+    entered_at: str,
+    reservation_id: int | None = None,
+) -> None:
+    """
+    Writes that the licence plate with `licence_plate_id` entered the garage with
+    `garage_id` at `entered_at`, as decided by the gate, see `LicencePlateRPiView`.
+    """
+    from src.api.views.licence_plates.licence_plate_view import _enter
+
+    lp = LicencePlate.objects.get(pk=licence_plate_id)
+    garage = Garage.objects.get(pk=garage_id)
+    reservation = (
+        Reservation.objects.get(pk=reservation_id)
+        if reservation_id is not None
+        else None
+    )
+    with transaction.atomic():
+        _enter(lp, garage, parse_datetime(entered_at), reservation)  # type: ignore
+
+
+@task
+def enter_garage_as_guest(licence_plate: str, garage_id: int, entered_at: str) -> None:
+    """
+    Writes that the unregistered `licence_plate` entered the garage with `garage_id` at
+    `entered_at`, for which a generated user is created.
+    """
+    from src.api.views.licence_plates.licence_plate_view import _enter_generated_user
+
+    garage = Garage.objects.get(pk=garage_id)
+    with transaction.atomic():
+        _enter_generated_user(licence_plate, garage, parse_datetime(entered_at))  # type: ignore
+
+
+@task
+def leave_garage(licence_plate_id: int, garage_id: int) -> None:
+    """
+    Writes that the licence plate with `licence_plate_id` left the garage with `garage_id`.
+    Nothing is done if the licence plate isn't in the garage anymore.
+    """
+    from src.api.views.licence_plates.licence_plate_view import _leave
+
+    lp = (
+        LicencePlate.objects.select_related("user")
+        .filter(pk=licence_plate_id, garage_id=garage_id)
+        .first()
+    )
+    if lp is not None:
+        _leave(lp, Garage.objects.get(pk=garage_id))
@@ -2,6 +2,7 @@ from src.api.views.garages.garage_view import (
     GaragesDetailView,
     GaragesListView,
     GarageRPiView,
+    GaragesSearchView,
 )
 from src.api.views.garages.opening_hours_view import (
     OpeningHoursGarageView,
@@ -12,13 +13,16 @@ from src.api.views.garages.parking_lots_view import (
     ParkingLotsGarageView,
     ParkingLotDetailView,
     ParkingLotRPiView,
+    ParkingLotsRPiView,
     ParkingLotAssignView,
+    GarageOccupancyView,
 )
 from src.api.views.licence_plates.licence_plate_view import (
     LicencePlateDetailView,
     LicencePlateListView,
     LicencePlateRPiView,
 )
+from src.api.views.licence_plates.gate_sync_view import GateSyncView, GatePassKeyView
 
 from src.api.views.users.user_view import (
     UserDetailView,
@@ -31,7 +35,7 @@ from src.api.views.users.reservations_view import (
     ReservationsRPiView,
 )
 
-from src.api.views.auth.login_view import LoginView
+from src.api.views.auth.login_view import LoginView, TokenLoginView
 from src.api.views.auth.logout_view import LogoutView
 from src.api.views.auth.sign_up_view import SignUpView
 
@@ -53,3 +57,5 @@ from src.api.views.users.notifications_view import (
     NotificationsListView,
     NotificationsDetailView,
 )
+
+from src.api.views.metrics.metrics_view import MetricsView
@@ -8,8 +8,9 @@ from rest_framework.request import Request
 from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny
 
-from src.api.serializers import LoginSerializer, UserSerializer
-from src.core.views import BackendResponse, _OriginAPIView
+from src.api.serializers import LoginSerializer, TokenLoginSerializer, UserSerializer
+from src.core.views import BackendResponse, _OriginAPIView, parse_frontend_json
+from src.users.backends import login_token
 from src.users.models import User
 
 
@@ -31,27 +32,54 @@ class LoginView(_OriginAPIView):
         login_data = JSONParser().parse(request)
         login_serializer = LoginSerializer(data=login_data)
         if login_serializer.is_valid():
-            token_limit_per_user = self.get_token_limit_per_user()
             user: User = User.objects.get(email=login_serializer.validated_data)
-
-            if token_limit_per_user is not None:
-                now = timezone.now()
-                token = user.auth_token_set.filter(expiry__gt=now)  # type: ignore
-                if token.count() >= token_limit_per_user:
-                    return BackendResponse(
-                        ["Maximum amount of tokens allowed per user exceeded."],
-                        status=status.HTTP_403_FORBIDDEN,
-                    )
-
-            return BackendResponse(
-                {
-                    "user": UserSerializer(user).data,
-                    "token": AuthToken.objects.create(user)[1],
-                },
-                status=status.HTTP_200_OK,
-            )
+            return self.log_in(user)
 
         return BackendResponse(
             ["Invalid credentials entered."],
             status=status.HTTP_401_UNAUTHORIZED,
         )
+
+    def log_in(self, user: User) -> BackendResponse:
+        """
+        Creates an authentication token for `user`, if the user didn't exceed the amount
+        of tokens allowed.
+        """
+        token_limit_per_user = self.get_token_limit_per_user()
+        if token_limit_per_user is not None:
+            now = timezone.now()
+            token = user.auth_token_set.filter(expiry__gt=now)  # type: ignore
+            if token.count() >= token_limit_per_user:
+                return BackendResponse(
+                    ["Maximum amount of tokens allowed per user exceeded."],
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+
+        return BackendResponse(
+            {
+                "user": UserSerializer(user).data,
+                "token": AuthToken.objects.create(user)[1],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class TokenLoginView(LoginView):
+    """
+    A view to log in a generated user with the login token of its QR-code. The token is
+    verified with its signature, thus no password is hashed.
+    """
+
+    def post(self, request: Request, format=None) -> BackendResponse:
+        if (resp := _OriginAPIView.post(self, request, format)) is not None:
+            return resp
+        data = parse_frontend_json(request)
+        serializer = TokenLoginSerializer(data=data)  # type: ignore
+        if serializer.is_valid():
+            user = login_token.check_token(serializer.validated_data["token"])  # type: ignore
+            if user is not None:
+                return self.log_in(user)
+        return BackendResponse(
+            ["Invalid or expired login token."],
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
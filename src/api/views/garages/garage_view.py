@@ -1,9 +1,22 @@
+from typing import Any
+
+from django.db.models import QuerySet
+from rest_framework import serializers, status
+from rest_framework.request import Request
 from rest_framework.permissions import AllowAny
 
-from src.core.views import PkAPIView, BaseAPIView
-from src.api.models import Garage
+from src.core.views import PkAPIView, BaseAPIView, BackendResponse, _OriginAPIView
+from src.core.settings import CAPACITY_HORIZON, VALIDATOR_INTERVAL
+from src.api.models import Garage, ProvincesEnum
+from src.api.models.garage.capacity_ledger import get_capacity_ledgers
+from src.api.models.garage.release_index import get_release_indices
 
-from src.api.serializers import GarageSerializer
+from src.api.serializers import (
+    GarageSerializer,
+    GarageSummarySerializer,
+    LocationsSerializer,
+    AssignReservationSerializer,
+)
 from src.users.permissions import IsGarageOwner
 
 
@@ -17,6 +30,9 @@ class GaragesDetailView(PkAPIView):
     origins = ["app", "web", "rpi"]
     permission_classes = [IsGarageOwner]
     model = Garage
+    conditional = True
+    validator_fields = ["revision"]
+    validator_interval = VALIDATOR_INTERVAL
     serializer = GarageSerializer
     user_id = True
     http_method_names = ["get", "put", "delete"]
@@ -24,20 +40,109 @@ class GaragesDetailView(PkAPIView):
 
 class GaragesListView(BaseAPIView):
     """
-    A view class to get all the garages and to post a new garage.
+    A view class to get all the garages and to post a new garage. The garages are listed
+    as summaries, the full garage is only returned by `GaragesDetailView`.
     """
 
     origins = ["app", "web"]
     permission_classes = [IsGarageOwner]
-    serializer = {"get": GarageSerializer, "post": GarageSerializer}
+    serializer = {"get": GarageSummarySerializer, "post": GarageSerializer}
     model = Garage
+    conditional = True
+    validator_fields = ["revision"]
+    validator_interval = VALIDATOR_INTERVAL
     post_user_id = True
 
+    filters = {
+        "province": (
+            "garage_settings__location__province",
+            serializers.ChoiceField(ProvincesEnum.values),
+        ),
+        "municipality": (
+            "garage_settings__location__municipality__iexact",
+            serializers.CharField(),
+        ),
+    }
+
+    def get_objects(self, request: Request) -> QuerySet:
+        return Garage.objects.select_related("garage_settings__location")
+
+    def serializer_context(
+        self, objects: list[Garage], fields: set[str] | None
+    ) -> dict[str, Any]:
+        if fields is None or "free" in fields:
+            # The free parking lots are computed from the booked ones.
+            Garage.objects.refresh_booked_counts(objects)
+        if fields is not None and "next_free_spot" not in fields:
+            return {}
+        return {"release_indices": get_release_indices([g.pk for g in objects])}
+
 
 class GarageRPiView(PkAPIView):
     origins = ["app", "web", "rpi"]
     permission_classes = [AllowAny]
     model = Garage
+    conditional = True
+    validator_fields = ["revision"]
+    validator_interval = VALIDATOR_INTERVAL
     serializer = GarageSerializer
     user_id = True
     http_method_names = ["get"]
+
+
+class GaragesSearchView(_OriginAPIView):
+    """
+    View class to search the garages with free parking lots for the time frame given with
+    `fromDate` and `toDate`, optionally in a `province` and/or `municipality`. The garages
+    are ranked on the amount of parking lots which are free during the whole time frame,
+    which is taken from the capacity ledgers of the garages.
+    """
+
+    origins = ["app", "web"]
+    http_method_names = ["get"]
+
+    def get(self, request: Request, format=None) -> BackendResponse:
+        if (resp := super().get(request, format)) is not None:
+            return resp
+        request_data = {
+            "from_date": str(request.query_params.get("fromDate")).replace(" ", "+"),
+            "to_date": str(request.query_params.get("toDate")).replace(" ", "+"),
+        }
+        serializer = AssignReservationSerializer(data=request_data)  # type: ignore
+        if not serializer.is_valid():
+            return BackendResponse(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST  # type: ignore
+            )
+        from_date = serializer.validated_data["from_date"]  # type: ignore
+        to_date = serializer.validated_data["to_date"]  # type: ignore
+        if to_date - from_date > CAPACITY_HORIZON:
+            return BackendResponse(
+                [f"The time frame can be at most {CAPACITY_HORIZON.days} days long."],
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        garages = Garage.objects.select_related("garage_settings__location")
+        if (province := request.query_params.get("province")) is not None:
+            if province not in ProvincesEnum.values:
+                return BackendResponse(
+                    [f"Province `{province}` does not exist."],
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            garages = garages.filter(garage_settings__location__province=province)
+        if (municipality := request.query_params.get("municipality")) is not None:
+            garages = garages.filter(
+                garage_settings__location__municipality__iexact=municipality
+            )
+        garages = list(garages)
+        ledgers = get_capacity_ledgers([g.pk for g in garages], to_date)
+        results = [
+            {
+                "id": garage.pk,
+                "name": garage.name,
+                "location": LocationsSerializer(garage.garage_settings.location).data,
+                "free_lots": ledgers[garage.pk].min_free(from_date, to_date),
+            }
+            for garage in garages
+            if garage.pk in ledgers
+        ]
+        results.sort(key=lambda r: (-r["free_lots"], r["name"]))
+        return BackendResponse(results, status=status.HTTP_200_OK)
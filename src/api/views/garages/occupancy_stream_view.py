@@ -0,0 +1,161 @@
+import asyncio
+import json
+import re
+from io import BytesIO
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from rest_framework.exceptions import APIException
+
+from src.api.models.garage.occupancy_events import (
+    occupancy_broker,
+    occupancy_channel,
+    occupancy_poller,
+    garage_occupancy,
+    parking_lot_occupancy,
+)
+from src.core.exceptions import OriginValidationException
+from src.core.views import _OriginAPIView, _ValidateOrigin, _dict_key_to_case
+from src.core.utils import to_camel_case
+
+
+class OccupancyStreamView(_OriginAPIView):
+    """
+    View class which is only used to authorize the requests of the occupancy stream, in
+    the same way as the other views of the app.
+    """
+
+    origins = ["app", "web"]
+
+    def authorize(self, scope: dict[str, Any]) -> tuple[int, str] | None:
+        """
+        Returns the status code and error of the request with `scope`, or `None` if the
+        request is allowed.
+        """
+        request = self.initialize_request(ASGIRequest(scope, BytesIO()))
+        self.request = request
+        self.format_kwarg = None
+        try:
+            _ValidateOrigin._validate_origins(self, request)
+            self.initial(request)
+        except OriginValidationException as e:
+            return e.status, str(e)
+        except APIException as e:
+            return e.status_code, str(e.detail)
+        return None
+
+
+class OccupancyStreamApp:
+    """
+    ASGI application which streams the occupancy of a garage as Server-Sent Events on
+    `api/stream/occupancy/<garage_pk>`, while all other requests are passed to `app`.
+
+    On connect, the counters and the parking lots of the garage are sent, whereafter
+    every change written to the garage, by any process, is pushed, see `OccupancyPoller`.
+    A subscriber waits on its queue of the in-process broker, thus idle subscribers cost
+    nearly nothing. If a subscriber falls behind, a `resync` event is sent and the stream
+    is closed.
+    """
+
+    path = re.compile(r"^/api/stream/occupancy/(?P<garage_pk>[0-9]+)$")
+    keep_alive = 15.0
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not (match := self.path.match(scope["path"])):
+            return await self.app(scope, receive, send)
+        garage_pk = int(match["garage_pk"])
+        error = await sync_to_async(OccupancyStreamView().authorize)(scope)
+        snapshot = None
+        if error is None:
+            # The snapshot is taken after subscribing, thus no change is missed in between.
+            subscription = occupancy_broker.subscribe(occupancy_channel(garage_pk))
+            snapshot = await sync_to_async(_snapshot)(garage_pk)
+            if snapshot is None:
+                occupancy_broker.unsubscribe(subscription)
+                error = (
+                    404,
+                    f"The corresponding Garage with 'pk' `{garage_pk}` does not exist.",
+                )
+        if error is not None:
+            status, message = error
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": status,
+                    "headers": [(b"content-type", b"application/json")],
+                }
+            )
+            body = json.dumps({"errors": [message]}).encode()
+            return await send({"type": "http.response.body", "body": body})
+
+        occupancy_poller.watch(snapshot["garage"], garage_pk)  # type: ignore
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/event-stream"),
+                        (b"cache-control", b"no-cache"),
+                        # Lets nginx pass the events on instead of buffering them.
+                        (b"x-accel-buffering", b"no"),
+                    ],
+                }
+            )
+            await _send_event(send, "snapshot", snapshot)
+            while not disconnected.done():
+                message = asyncio.ensure_future(subscription.get())
+                await asyncio.wait(
+                    [message, disconnected],
+                    timeout=self.keep_alive,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not message.done():
+                    message.cancel()
+                    if not disconnected.done():
+                        await send(
+                            {
+                                "type": "http.response.body",
+                                "body": b": keep-alive\n\n",
+                                "more_body": True,
+                            }
+                        )
+                    continue
+                await _send_event(send, "occupancy", message.result())
+                if subscription.overflowed:
+                    await _send_event(send, "resync", {})
+                    break
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            occupancy_broker.unsubscribe(subscription)
+            disconnected.cancel()
+
+
+def _snapshot(garage_pk: int) -> dict[str, Any] | None:
+    from src.api.models import ParkingLot
+
+    if (garage := garage_occupancy(garage_pk)) is None:
+        return None
+    return {
+        "garage": garage,
+        "parking_lots": [
+            parking_lot_occupancy(pl)
+            for pl in ParkingLot.objects.filter(garage_id=garage_pk)
+        ],
+    }
+
+
+async def _wait_for_disconnect(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _send_event(send, event: str, data: dict[str, Any]) -> None:
+    data = _dict_key_to_case(data, to_camel_case)  # type: ignore
+    body = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+    await send({"type": "http.response.body", "body": body, "more_body": True})
@@ -17,6 +17,7 @@ class OpeningHoursDetailView(PkAPIView):
     model = OpeningHour
     permission_classes = [IsGarageOwner]
     http_method_names = ["get", "put", "delete"]
+    conditional = True
 
 
 class OpeningHoursGarageView(PkAPIView):
@@ -32,6 +33,7 @@ class OpeningHoursGarageView(PkAPIView):
     model = OpeningHour
     permission_classes = [IsGarageOwner]
     return_list = True
+    conditional = True
     http_method_names = ["get", "post"]
 
     def get(self, request: Request, garage_pk: int, format=None) -> BackendResponse:
@@ -1,21 +1,52 @@
-from typing import Any
+from typing import Any, Callable
+from datetime import datetime, timedelta
+from math import ceil, floor
 from dateutil.parser import parse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 
 from src.api.models import ParkingLot, Garage
-from src.api.serializers import ParkingLotSerializer, RPIParkingLotSerializer
+from src.api.models.garage.capacity_ledger import get_capacity_ledger
+from src.api.models.garage.sensor_ingestion import ingest_sensor_states
+from src.api.serializers import (
+    ParkingLotSerializer,
+    RPIParkingLotSerializer,
+    RPIParkingLotsSerializer,
+)
 from src.api.serializers import AssignReservationSerializer
+from src.core.exceptions import QueryParameterException
 from src.core.views import (
     PkAPIView,
     _OriginAPIView,
     parse_frontend_json,
     BackendResponse,
 )
+from src.core.settings import (
+    CAPACITY_BUCKET,
+    CAPACITY_HORIZON,
+    DELTA_SYNC_MAX_REVISIONS,
+    OFFSET,
+)
+from src.core.utils import VersionedCache
 from src.users.permissions import IsGarageOwner
 
+_availability_cache = VersionedCache("availability", CAPACITY_BUCKET)
+
+# The fields of `ParkingLotSerializer` which need the reservations of the parking lots.
+_AVAILABILITY_FIELDS = {"available", "booked"}
+
+
+def _round_to_bucket(date: datetime, up: bool = False) -> datetime:
+    """
+    Rounds `date` down, or up if `up`, to a multiple of `CAPACITY_BUCKET`.
+    """
+    size = CAPACITY_BUCKET.total_seconds()
+    rounded = (ceil if up else floor)(date.timestamp() / size) * size
+    return datetime.fromtimestamp(rounded).astimezone()
+
 
 class ParkingLotDetailView(PkAPIView):
     """
@@ -32,6 +63,16 @@ class ParkingLotsGarageView(PkAPIView):
     """
     View class which handles GET- and POST-requests for parking lots of a garage with
     `garage_pk`.
+
+    The parking lots of a garage with their reservations are cached per garage, for the
+    time frame rounded outwards to `CAPACITY_BUCKET`, from which the availability for the
+    exact time frame is computed. The entries are versioned with the revision of the
+    garage, which is bumped on every change of its reservations, parking lots or licence
+    plates, thus a change in any worker invalidates them.
+
+    With `sinceRevision`, only the parking lots which changed after that revision of the
+    garage are returned, together with the current revision. If the client has to fetch
+    all parking lots again, `resync` is set and all parking lots are returned.
     """
 
     origins = ["app", "web"]
@@ -43,6 +84,23 @@ class ParkingLotsGarageView(PkAPIView):
     http_method_names = ["get", "post"]
 
     def get(self, request: Request, garage_pk: int, format=None) -> BackendResponse:
+        try:
+            fields = self.requested_fields(request)
+            if "sinceRevision" in request.query_params:
+                return self._get_changed(
+                    int(garage_pk), str(request.query_params["sinceRevision"]), fields
+                )
+            return self._get_all(request, int(garage_pk), fields)
+        except QueryParameterException as e:
+            return BackendResponse([str(e)], status=status.HTTP_400_BAD_REQUEST)
+
+    def _get_all(
+        self, request: Request, garage_pk: int, fields: set[str] | None
+    ) -> BackendResponse:
+        """
+        Returns all parking lots of the garage, with their availability for the time frame
+        given with `fromDate` and `toDate`, or for the one of a default user.
+        """
         try:
             request_data = {
                 "from_date": parse(str(request.query_params["fromDate"])),
@@ -51,21 +109,162 @@ class ParkingLotsGarageView(PkAPIView):
             # Used to validate the `from_date` and `to_date`.
             serializer = AssignReservationSerializer(data=request_data)  # type: ignore
             if serializer.is_valid():
-                pls = ParkingLot.objects.is_available(
-                    int(garage_pk),
-                    serializer.validated_data["from_date"],  # type: ignore
-                    serializer.validated_data["to_date"],  # type: ignore
+                from_date = serializer.validated_data["from_date"]  # type: ignore
+                to_date = serializer.validated_data["to_date"]  # type: ignore
+                data = self._serialize(
+                    garage_pk,
+                    fields,
+                    lambda: self._get_available(garage_pk, from_date, to_date),
                 )
-                serializer = ParkingLotSerializer(pls, many=True)  # type: ignore
-                return BackendResponse(serializer.data, status=status.HTTP_200_OK)
+                return BackendResponse(data, status=status.HTTP_200_OK)
             return BackendResponse(
                 [serializer.errors], status=status.HTTP_400_BAD_REQUEST  # type: ignore
             )
         except KeyError:
-            serializer = ParkingLotSerializer(
-                ParkingLot.objects.filter(garage_id=garage_pk), many=True
+            data = self._serialize(
+                garage_pk, fields, lambda: ParkingLot.objects.is_available(garage_pk)
             )
-            return BackendResponse(serializer.data, status=status.HTTP_200_OK)
+            return BackendResponse(data, status=status.HTTP_200_OK)
+
+    def _serialize(
+        self,
+        garage_pk: int,
+        fields: set[str] | None,
+        compute_available: Callable[[], list[ParkingLot]],
+        since_revision: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Returns the serialized parking lots of the garage limited to `fields`. The
+        parking lots with their availability are returned by `compute_available()`, which
+        is only called if `available` or `booked` is requested, otherwise the parking lots
+        are read without their reservations.
+        """
+        if fields is None or fields & _AVAILABILITY_FIELDS:
+            pls = compute_available()
+        else:
+            pls = ParkingLot.objects.filter(garage_id=garage_pk)
+            if since_revision is not None:
+                pls = pls.filter(revision__gt=since_revision)
+        return self.select_fields(ParkingLotSerializer(pls, many=True), fields).data
+
+    def _get_changed(
+        self, garage_pk: int, since_revision: str, fields: set[str] | None
+    ) -> BackendResponse:
+        """
+        Returns the parking lots of the garage which changed after `since_revision`, or all
+        parking lots if the client has to resynchronize.
+        """
+        if not since_revision.isdigit():
+            return BackendResponse(
+                ["`sinceRevision` must be a non-negative integer."],
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        since = int(since_revision)
+        # The revision is read before the parking lots, as a parking lot is written in the
+        # same transaction as the revision it gets.
+        garage = (
+            Garage.objects.filter(pk=garage_pk)
+            .values("revision", "resync_revision")
+            .first()
+        )
+        if garage is None:
+            return BackendResponse(
+                [f"The corresponding Garage with 'pk' `{garage_pk}` does not exist."],
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        resync = (
+            since < garage["resync_revision"]
+            or since > garage["revision"]
+            or garage["revision"] - since > DELTA_SYNC_MAX_REVISIONS
+        )
+        changed_after = None if resync else since
+        data = self._serialize(
+            garage_pk,
+            fields,
+            lambda: ParkingLot.objects.is_available(
+                garage_pk, since_revision=changed_after
+            ),
+            changed_after,
+        )
+        return BackendResponse(
+            {
+                "revision": garage["revision"],
+                "resync": resync,
+                "parking_lots": data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @staticmethod
+    def _get_available(
+        garage_pk: int, from_date: datetime, to_date: datetime
+    ) -> list[ParkingLot]:
+        """
+        Returns the parking lots of the garage with their availability for the given time
+        frame, computed from the parking lots with their reservations in the availability
+        cache if present.
+        """
+        # The availability depends on the current time as well, see `is_available()`.
+        now = timezone.now()
+        window_from = _round_to_bucket(min(from_date.astimezone(), now))
+        window_to = _round_to_bucket(max(to_date.astimezone(), now + OFFSET), up=True)
+        key = f"{garage_pk}:{window_from.timestamp():.0f}:{window_to.timestamp():.0f}"
+        pls = _availability_cache.get_or_set(
+            key,
+            Garage.objects.revision(garage_pk) or 0,
+            lambda: ParkingLot.objects.with_reservations(
+                garage_pk, window_from, window_to
+            ),
+        )
+        return ParkingLot.objects.compute_available(pls, from_date, to_date)
+
+
+class GarageOccupancyView(_OriginAPIView):
+    """
+    View class which returns the occupancy heatmap of a garage with `garage_pk`: the amount
+    of reserved, occupied and free parking lots per time bucket, taken from the capacity
+    ledger of the garage. The time frame is given with `fromDate` and `toDate` and defaults
+    to the coming week.
+    """
+
+    origins = ["app", "web"]
+    http_method_names = ["get"]
+
+    def get(self, request: Request, garage_pk: int, format=None) -> BackendResponse:
+        if (resp := super().get(request, format)) is not None:
+            return resp
+        now = timezone.now()
+        request_data = {
+            "from_date": str(
+                request.query_params.get("fromDate", now.isoformat())
+            ).replace(" ", "+"),
+            "to_date": str(
+                request.query_params.get(
+                    "toDate", (now + timedelta(weeks=1)).isoformat()
+                )
+            ).replace(" ", "+"),
+        }
+        serializer = AssignReservationSerializer(data=request_data)  # type: ignore
+        if not serializer.is_valid():
+            return BackendResponse(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST  # type: ignore
+            )
+        from_date = serializer.validated_data["from_date"]  # type: ignore
+        to_date = serializer.validated_data["to_date"]  # type: ignore
+        if to_date - from_date > CAPACITY_HORIZON:
+            return BackendResponse(
+                [f"The time frame can be at most {CAPACITY_HORIZON.days} days long."],
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not Garage.objects.filter(pk=garage_pk).exists():
+            return BackendResponse(
+                [f"The corresponding Garage with 'pk' `{garage_pk}` does not exist."],
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        ledger = get_capacity_ledger(int(garage_pk), to_date)
+        return BackendResponse(
+            ledger.heatmap(from_date, to_date), status=status.HTTP_200_OK
+        )
 
 
 class ParkingLotAssignView(_OriginAPIView):
@@ -98,7 +297,8 @@ class ParkingLotAssignView(_OriginAPIView):
 class ParkingLotRPiView(_OriginAPIView):
     """
     View class for handling request coming from the Raspberry Pi. The request only contains the
-    garage id and parking lot number.
+    garage id and parking lot number. The state goes through the sensor ingestion, see
+    `ingest_sensor_states()`.
     """
 
     permission_classes = [AllowAny]
@@ -111,17 +311,54 @@ class ParkingLotRPiView(_OriginAPIView):
         data = parse_frontend_json(request)
         serializer = RPIParkingLotSerializer(data=data)  # type: ignore
         if serializer.is_valid():
-            parking_lot: ParkingLot = ParkingLot.objects.get(
-                garage_id=serializer.validated_data["garage_id"],  # type: ignore
-                parking_lot_no=serializer.validated_data["parking_lot_no"],  # type: ignore
-            )
-
+            garage_id: int = serializer.validated_data["garage_id"]  # type: ignore
+            parking_lot_no: int = serializer.validated_data["parking_lot_no"]  # type: ignore
             occupied: bool = serializer.validated_data["occupied"]  # type: ignore
-            if occupied:
-                parking_lot.reassign()
-                parking_lot.set_lp()
-            parking_lot.occupied = occupied
-            parking_lot.save()
+            [result] = ingest_sensor_states(garage_id, [(parking_lot_no, occupied)])
+            if result == "not_found":
+                return Response(
+                    [
+                        f"The parking lot {parking_lot_no} of the garage with 'pk' `{garage_id}` does not exist."
+                    ],
+                    status=status.HTTP_404_NOT_FOUND,
+                )
             return Response(None, status=status.HTTP_204_NO_CONTENT)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ParkingLotsRPiView(_OriginAPIView):
+    """
+    View class for handling batch requests coming from the Raspberry Pi, which contain the
+    garage id and the occupied state of multiple parking lots. The states go through the
+    sensor ingestion, see `ingest_sensor_states()`, and the ones which are written are
+    applied in a single transaction. The result is returned per parking lot.
+    """
+
+    permission_classes = [AllowAny]
+    origins = ["rpi"]
+    http_method_names = ["put"]
+
+    def put(self, request: Request, format=None) -> BackendResponse:
+        if (resp := super().put(request, format)) is not None:
+            return resp
+        data = parse_frontend_json(request)
+        serializer = RPIParkingLotsSerializer(data=data)  # type: ignore
+        if not serializer.is_valid():
+            return BackendResponse(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST  # type: ignore
+            )
+        states = [
+            (state["parking_lot_no"], state["occupied"])
+            for state in serializer.validated_data["parking_lots"]  # type: ignore
+        ]
+        results = ingest_sensor_states(
+            serializer.validated_data["garage_id"], states  # type: ignore
+        )
+        return BackendResponse(
+            [
+                {"parking_lot_no": no, "occupied": occupied, "result": result}
+                for (no, occupied), result in zip(states, results)
+            ],
+            status=status.HTTP_200_OK,
+        )
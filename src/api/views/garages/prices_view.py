@@ -24,6 +24,7 @@ class PricesDetailView(PkAPIView):
     permission_classes = [IsGarageOwner]
     origins = ["web", "app"]
     http_method_names = ["get", "put", "delete"]
+    conditional = True
     column = "price_id"
     model = Price
     serializer = PriceSerializer
@@ -107,6 +108,7 @@ class PricesGarageView(PkAPIView):
     model = Price
     serializer = PriceSerializer
     return_list = True
+    conditional = True
     http_method_names = ["get", "post"]
 
     def get(self, request: Request, garage_pk: int, format=None) -> BackendResponse:
@@ -0,0 +1,261 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.permissions import AllowAny
+
+from src.api.models import (
+    Garage,
+    LicencePlate,
+    ParkingSession,
+    Price,
+    RemovedLicencePlate,
+    Reservation,
+)
+from src.api.models.licence_plate_cache import get_licence_plate, normalize_plate
+from src.api.serializers import OfflineDecisionsSerializer
+from src.api.views.licence_plates.licence_plate_view import (
+    _enter,
+    _enter_generated_user,
+    _leave,
+)
+from src.core.settings import SYNC_MARGIN, SYNC_MAX_AGE, SYNC_RESERVATION_HORIZON
+from src.core.utils import passes_enabled, public_key, verify_pass
+from src.core.views import BackendResponse, _OriginAPIView, parse_frontend_json
+
+
+class GateSyncView(_OriginAPIView):
+    """
+    View class which lets the Raspberry Pi of the garage with `garage_pk` decide on
+    entries and exits while the backend is unreachable.
+
+    A GET-request returns the state the Pi needs for that: the licence plates, which of
+    them are inside the garage and which of them pay automatically, each as a sorted array
+    such that the Pi can test membership with a binary search, the reservations of the
+    coming `SYNC_RESERVATION_HORIZON` and the free parking lots. With `since`, the `version`
+    of an earlier response, only the licence plates which changed after it are returned,
+    together with the ones which were `removed`. If the version is older than
+    `SYNC_MAX_AGE`, `resync` is set and the full state is returned.
+
+    If gate passes are enabled, the signed `passes` of the reservations and of the paid
+    licence plates inside the garage are returned as well, which the Pi verifies with the
+    public key of `GatePassKeyView`, see `Reservation.entry_pass()` and
+    `LicencePlate.exit_pass()`.
+
+    A POST-request uploads the decisions the Pi made offline, which are applied in the
+    order they were made, see `_reconcile()`, and returns the result per decision.
+    """
+
+    permission_classes = [AllowAny]
+    origins = ["rpi"]
+    http_method_names = ["get", "post"]
+
+    def get(self, request: Request, garage_pk: int, format=None) -> BackendResponse:
+        if (resp := super().get(request, format)) is not None:
+            return resp
+        since = None
+        if "since" in request.query_params:
+            if not (version := str(request.query_params["since"])).isdigit():
+                return BackendResponse(
+                    ["`since` must be a non-negative integer."],
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            since = datetime.fromtimestamp(int(version) / 1000).astimezone()
+        if (garage := Garage.objects.filter(pk=garage_pk).first()) is None:
+            return _garage_not_found(garage_pk)
+        now = timezone.now()
+        resync = since is not None and (since > now or now - since > SYNC_MAX_AGE)
+        if resync:
+            since = None
+        # Changes which are committed after this query started, but were written before
+        # it, are only seen by the next request.
+        version = now - SYNC_MARGIN
+        fields = ["licence_plate", "garage_id", "paid_at", "user__stripe_identifier"]
+        states = LicencePlate.objects.values_list(*fields)
+        removed = []
+        if since is not None:
+            # Both are looked up on their own index, instead of filtering the join.
+            states = (
+                LicencePlate.objects.filter(updated_at__gte=since)
+                .values_list(*fields)
+                .union(
+                    LicencePlate.objects.filter(
+                        user__updated_at__gte=since
+                    ).values_list(*fields)
+                )
+            )
+            removed = RemovedLicencePlate.objects.filter(
+                removed_at__gte=since
+            ).values_list("plate", flat=True)
+        plates, inside, autopay, paid = [], [], [], []
+        for plate, garage_id, paid_at, stripe_identifier in states:
+            plates.append(plate)
+            if garage_id == garage.pk:
+                inside.append(plate)
+                if paid_at is not None:
+                    paid.append(
+                        LicencePlate(
+                            licence_plate=plate, garage_id=garage_id, paid_at=paid_at
+                        )
+                    )
+            if stripe_identifier is not None:
+                autopay.append(plate)
+        reservations = list(
+            Reservation.objects.filter(
+                garage_id=garage.pk,
+                to_date__gte=now,
+                from_date__lte=now + SYNC_RESERVATION_HORIZON,
+            ).select_related("licence_plate")
+        )
+        return BackendResponse(
+            {
+                "version": int(version.timestamp() * 1000),
+                "resync": resync,
+                "plates": sorted(plates),
+                "inside": sorted(inside),
+                "autopay": sorted(autopay),
+                "removed": sorted(set(removed) - set(plates)),
+                "reservations": [
+                    [
+                        r.licence_plate.licence_plate,
+                        r.from_date.isoformat(),
+                        r.to_date.isoformat(),
+                    ]
+                    for r in reservations
+                ],
+                "passes": _passes(garage, reservations, paid),
+                "free_lots": garage.free_lots,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    def post(self, request: Request, garage_pk: int, format=None) -> BackendResponse:
+        if (resp := super().post(request, format)) is not None:
+            return resp
+        serializer = OfflineDecisionsSerializer(data=parse_frontend_json(request))  # type: ignore
+        if not serializer.is_valid():
+            return BackendResponse(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST  # type: ignore
+            )
+        if (garage := Garage.objects.filter(pk=garage_pk).first()) is None:
+            return _garage_not_found(garage_pk)
+        decisions = sorted(
+            serializer.validated_data["decisions"], key=lambda d: d["at"]  # type: ignore
+        )
+        return BackendResponse(
+            [
+                {
+                    "licence_plate": decision["licence_plate"],
+                    "action": decision["action"],
+                    "at": decision["at"].isoformat(),
+                    "result": _reconcile(garage, **decision),
+                }
+                for decision in decisions
+            ],
+            status=status.HTTP_200_OK,
+        )
+
+
+class GatePassKeyView(_OriginAPIView):
+    """
+    View class which returns the public key with which the Raspberry Pi verifies the
+    passes of the gate, which it stores locally.
+    """
+
+    permission_classes = [AllowAny]
+    origins = ["rpi"]
+    http_method_names = ["get"]
+
+    def get(self, request: Request, format=None) -> BackendResponse:
+        if (resp := super().get(request, format)) is not None:
+            return resp
+        if not passes_enabled():
+            return BackendResponse(
+                ["Gate passes are not enabled."], status=status.HTTP_404_NOT_FOUND
+            )
+        return BackendResponse({"public_key": public_key()}, status=status.HTTP_200_OK)
+
+
+def _passes(
+    garage: Garage, reservations: list[Reservation], paid: list[LicencePlate]
+) -> list[str]:
+    """
+    Returns the entry passes of `reservations` and the exit passes of the `paid` licence
+    plates in the garage, if gate passes are enabled.
+    """
+    if not passes_enabled():
+        return []
+    durations = [
+        p.duration
+        for p in Price.objects.filter(garage_id=garage.pk)
+        if p.duration > timedelta(0)
+    ]
+    exit_passes = [lp.exit_pass(min(durations)) for lp in paid] if durations else []
+    return [r.entry_pass() for r in reservations] + exit_passes  # type: ignore
+
+
+def _reconcile(
+    garage: Garage,
+    licence_plate: str,
+    action: str,
+    at: datetime,
+    gate_pass: str | None = None,
+) -> str:
+    """
+    Applies a decision of the Pi to enter or exit the garage at `at`, which already
+    happened, thus it's applied even if the gate would have decided otherwise. Returns
+    `"entered"`, `"left"`, `"invoiced"` if the stay is charged, `"unpaid"` if
+    the stay isn't paid and the user doesn't pay automatically, or `"duplicate"` and
+    `"not_inside"` for decisions which are already applied, like an upload which is
+    retried.
+
+    If the Pi decided with a `gate_pass` which is valid for the licence plate in the
+    garage at `at`, its reservation is marked as showed up, or its stay as paid.
+    """
+    licence_plate = normalize_plate(licence_plate)
+    lp = get_licence_plate(licence_plate)
+    claims = (
+        verify_pass(gate_pass, at)
+        if gate_pass is not None and passes_enabled()
+        else None
+    )
+    if claims is not None and (
+        claims["licence_plate"] != licence_plate or claims["garage"] != garage.pk
+    ):
+        claims = None
+    if action == "enter":
+        if lp is None:
+            _enter_generated_user(licence_plate, garage, at)
+        elif lp.garage_id == garage.pk:
+            return "duplicate"
+        else:
+            reservation = (
+                Reservation.objects.filter(pk=claims["reservation"]).first()
+                if claims is not None and claims["type"] == "reservation"
+                else lp.has_reservation(garage)
+            )
+            _enter(lp, garage, at, reservation)
+        return "entered"
+    if lp is None or lp.garage_id != garage.pk:
+        return "not_inside"
+    # The session is closed at the time of the exit, instead of when it's applied.
+    ParkingSession.objects.exit(lp.pk, at)
+    result, items = "left", None
+    paid = claims is not None and claims["type"] == "paid"
+    # The stay is charged until the exit, instead of until it's applied.
+    if not paid and not lp.can_leave_at(at):
+        if lp.user.has_automatic_payment:
+            items, _ = lp.get_prices_to_pay(at)
+            result = "invoiced"
+        else:
+            result = "unpaid"
+    _leave(lp, garage, items)
+    return result
+
+
+def _garage_not_found(garage_pk: int) -> BackendResponse:
+    return BackendResponse(
+        [f"The corresponding Garage with 'pk' `{garage_pk}` does not exist."],
+        status=status.HTTP_404_NOT_FOUND,
+    )
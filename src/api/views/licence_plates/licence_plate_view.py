@@ -1,12 +1,21 @@
 from datetime import datetime
 from typing import Any
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.request import Request
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
-from src.api.models import LicencePlate, ParkingLot, Garage
+from src.api.models import Charge, LicencePlate, Garage, Reservation
+from src.api.models.licence_plate_cache import (
+    get_licence_plate,
+    match_licence_plate,
+    normalize_plate,
+)
 from src.api.serializers import LicencePlateSerializer, LicencePlateRPiSerializer
-from src.core.settings import OFFSET
 from src.core.views import (
     PkAPIView,
     BaseAPIView,
@@ -14,6 +23,16 @@ from src.core.views import (
     _OriginAPIView,
     parse_frontend_json,
 )
+from src.api.tasks import (
+    enter_garage,
+    enter_garage_as_guest,
+    generate_qr_code,
+    leave_garage,
+    settle_charges,
+)
+from src.core.settings import GATE_DEBOUNCE
+from src.core.utils import after_response, get_count, increment, register_metrics
+from src.users.backends import login_token
 from src.users.models import User
 
 
@@ -65,7 +84,10 @@ class LicencePlateRPiView(_OriginAPIView):
         )
 
     def _register_licence_plate(
-        self, licence_plate: str, garage_id: int
+        self,
+        licence_plate: str,
+        garage: Garage,
+        lp: LicencePlate | None = None,
     ) -> BackendResponse:
         """
         This registers that a `LicencePlate` is entering a `Garage`. If the `LicencePlate`
@@ -73,113 +95,69 @@ class LicencePlateRPiView(_OriginAPIView):
 
         If the `LicencePlate` doesn't exist in the database, a new dummy `User` with role 0
         is created, which is linked to the given `LicencePlate`.
+
+        The decision is made from the counters of the garage and the reservation of the
+        licence plate, while the licence plate, the counters and the reservation are only
+        written after the response is sent, such that the barrier doesn't wait for them.
         """
-        garage = Garage.objects.get(pk=garage_id)
-        queryset = LicencePlate.objects.filter(licence_plate=licence_plate)
-        pls = ParkingLot.objects.is_available(
-            garage_id,
-            datetime.now(),
-            datetime.now() + OFFSET,
-        )
-        now = datetime.now().astimezone().isoformat()
-        is_fully_occupied = _is_fully_occupied(list(pls))
-        is_full = _is_full(list(pls), garage)
-        if is_fully_occupied:
+        now = timezone.now()
+        reservation = lp.has_reservation(garage) if lp is not None else None
+        if garage.is_fully_occupied or (garage.is_full and reservation is None):
             return BackendResponse(
                 ["Parking garage is completely full."], status=status.HTTP_403_FORBIDDEN
             )
-        elif not queryset and is_full:
-            return BackendResponse(
-                ["Parking garage is completely full."], status=status.HTTP_403_FORBIDDEN
-            )
-        elif not queryset and not is_full:
-            email = User.email_generator()
-            password = User.objects.make_random_password(
-                length=30,
-                allowed_chars="ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz1234567890!@#$%^&*();,./<>",
-            )
-            generated_user = User.objects.create_user(
-                email=email,
-                password=password,
-                role=0,
-            )
-            LicencePlate.objects.create(
-                user=generated_user,
-                licence_plate=licence_plate,
-                garage=garage,
-                updated_at=now,
-                entered_at=now,
-                enabled=True,
-            )
-            generated_user.generate_qr_code(password)
-            generated_user.print_qr_code()
-            garage.increment_entered
-            return BackendResponse(
-                f"Successfully registered licence plate {licence_plate}.",
-                status=status.HTTP_200_OK,
-            )
-        else:
-            lp = queryset[0]
-            if not self.can_enter(lp, garage, list(pls)):
-                return BackendResponse(
-                    ["Parking garage is completely full."],
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-            queryset.update(garage=garage, updated_at=now, entered_at=now)
-            garage.increment_entered
-            return BackendResponse(
-                f"Successfully registered licence plate {licence_plate}.",
-                status=status.HTTP_200_OK,
+        response = BackendResponse(
+            f"Successfully registered licence plate {licence_plate}.",
+            status=status.HTTP_200_OK,
+        )
+        if lp is None:
+            return after_response(
+                response,
+                enter_garage_as_guest,
+                licence_plate,
+                garage.pk,
+                now.isoformat(),
             )
+        return after_response(
+            response,
+            enter_garage,
+            lp.pk,
+            garage.pk,
+            now.isoformat(),
+            reservation.pk if reservation is not None else None,
+        )
 
     def _sign_out_licence_plate(
-        self, licence_plate: LicencePlate, garage_id: int
+        self, licence_plate: LicencePlate, garage: Garage
     ) -> BackendResponse:
         """
         This signs out the `LicencePlate` from a `Garage`, setting its `garage_id` to `null`
         in the database. If the `LicencePlate` is associated with a dummy `User` of role 0,
-        the `User` is also deleted from the database.
+        the `User` is also deleted from the database. As for entering, the writes are done
+        after the response is sent.
+
+        If the stay isn't paid and the user pays automatically, the stay is closed together
+        with recording its charge before the response is sent, such that the charge can't
+        be lost. The charge is settled with Stripe in the background, thus a failure of
+        Stripe doesn't keep the car at the gate with a 402 anymore: the settlement is
+        retried by the job while the charge stays pending.
         """
-        garage = Garage.objects.get(pk=garage_id)
-        user: User = licence_plate.user  # User.objects.get(pk=user_id)
+        user: User = licence_plate.user
         if licence_plate.can_leave:
-            if user.is_generated_user:
-                licence_plate.delete()
-                user.delete()
-            else:
-                # Check if the user paid before trying to leave
-                licence_plate.garage = None
-                licence_plate.entered_at = None
-                licence_plate.paid_at = None
-                licence_plate.save()
-            garage.entered -= 1
-            garage.save()
-            return BackendResponse(
+            response = BackendResponse(
                 [
                     f"Successfully signed out licence plate {licence_plate.licence_plate}."
                 ],
                 status=status.HTTP_200_OK,
             )
+            return after_response(response, leave_garage, licence_plate.pk, garage.pk)
         elif user.has_automatic_payment:
-            try:
-                user.send_invoice(licence_plate)
-                licence_plate.garage = None
-                licence_plate.entered_at = None
-                licence_plate.paid_at = None
-                licence_plate.save()
-                garage.entered -= 1
-                garage.save()
-                return BackendResponse(
-                    [f"Sent invoice to user of {licence_plate}."],
-                    status=status.HTTP_200_OK,
-                )
-            except Exception as e:
-                return BackendResponse(
-                    [
-                        f"User needs to pay for {licence_plate} before leaving the garage and failed to sent invoice."
-                    ],
-                    status=status.HTTP_402_PAYMENT_REQUIRED,
-                )
+            items, _ = licence_plate.get_prices_to_pay()
+            _leave(licence_plate, garage, items)
+            return BackendResponse(
+                [f"Sent invoice to user of {licence_plate}."],
+                status=status.HTTP_200_OK,
+            )
         return BackendResponse(
             [f"User needs to pay for {licence_plate} before leaving the garage."],
             status=status.HTTP_402_PAYMENT_REQUIRED,
@@ -194,44 +172,120 @@ class LicencePlateRPiView(_OriginAPIView):
         the database. If it's `null`, the `LicencePlate` is considered NOT in the garage,
         thus the `_register_licence_plate()` is called.
 
+        If the licence plate isn't registered, it's matched with the registered licence
+        plate it's a misread of, like `1ABC0O1` for `1ABC001`, before a generated user is
+        created for it, see `match_licence_plate()`.
+
         The variable `params` contains the fields `garageId` and `licencePlate` from the
         `LicencePlateSerializer`.
+
+        Both flows take a constant number of queries, irrespective of the size of the
+        garage: one for the licence plate with its user, which is mostly served by the
+        cache as the same licence plates return, one for the garage with its counters and
+        one for the reservation or the prices of the licence plate.
+
+        Reads of the same licence plate at the same garage within `GATE_DEBOUNCE`, like a
+        camera reporting a licence plate multiple times or a retry of the Raspberry Pi, get
+        the response of the first read, instead of entering and leaving again. The
+        decisions are kept in the cache of Django, such that they're shared between the
+        workers, which takes a write to claim the read and one to store its decision. The
+        metrics of the gate are counted in the worker, see `increment()`.
         """
-        licence_plate: str = data["licence_plate"]
+        licence_plate = normalize_plate(data["licence_plate"])
         garage_id: int = data["garage_id"]
-        queryset = LicencePlate.objects.filter(licence_plate=licence_plate)
-        if not queryset:
-            return self._register_licence_plate(licence_plate, garage_id)
-        else:
-            lp = queryset[0]
-            return (
-                self._register_licence_plate(licence_plate, garage_id)
-                if lp.in_garage
-                else self._sign_out_licence_plate(lp, garage_id)
+        lp = get_licence_plate(licence_plate)
+        if lp is None and (lp := match_licence_plate(licence_plate)) is not None:
+            licence_plate = lp.licence_plate
+        key = f"gate:{garage_id}:{licence_plate}"
+        timeout = GATE_DEBOUNCE.total_seconds()
+        # If the entry of the first read expired in between, the key is claimed again.
+        if not cache.add(key, _PENDING, timeout) and (
+            (decision := cache.get(key)) is not None
+            or not cache.add(key, _PENDING, timeout)
+        ):
+            increment("gate:debounced")
+            if decision in (None, _PENDING):
+                return BackendResponse(
+                    [f"Licence plate {licence_plate} is already being handled."],
+                    status=status.HTTP_409_CONFLICT,
+                )
+            body, status_code = decision
+            return Response(body, status=status_code, content_type="application/json")
+        increment("gate:decided")
+        if (garage := Garage.objects.filter(pk=garage_id).first()) is None:
+            cache.delete(key)
+            return BackendResponse(
+                [f"The corresponding Garage with 'pk' `{garage_id}` does not exist."],
+                status=status.HTTP_404_NOT_FOUND,
             )
+        try:
+            if lp is None or lp.in_garage:
+                response = self._register_licence_plate(licence_plate, garage, lp)
+            else:
+                response = self._sign_out_licence_plate(lp, garage)
+        except Exception:
+            cache.delete(key)
+            raise
+        cache.set(key, (response.data, response.status_code), timeout)
+        return response
+
+
+# The decision of a read which is still being handled, see `handle_licence_plate()`.
+_PENDING = "pending"
+
+
+def _gate_metrics() -> dict[str, int]:
+    return {
+        "decided": get_count("gate:decided"),
+        "debounced": get_count("gate:debounced"),
+    }
 
-    def can_enter(
-        self, licence_plate: LicencePlate, garage: Garage, pls: list[ParkingLot]
-    ) -> bool:
-        """
-        Determines if the licence plate can enter the garage if it's full with reservations and physical occupancies.
-        """
-        if _is_fully_occupied(pls):
-            return False
-        elif _is_full(pls, garage):
-            enter = licence_plate.can_enter(garage)
-            return enter
-        r = licence_plate.has_reservation()
-        if r is not None:
-            r.set_showed  # type: ignore
-        return True
 
+register_metrics("gate", _gate_metrics)
 
-def _is_fully_occupied(pls: list[ParkingLot]) -> bool:
-    return len(pls) == len(list(filter(lambda pl: pl.occupied, pls)))
 
+def _enter(
+    lp: LicencePlate, garage: Garage, now: datetime, reservation: Reservation | None
+) -> None:
+    if reservation is not None:
+        reservation.set_showed  # type: ignore
+    lp.garage = garage
+    lp.entered_at = now
+    lp.save()
+    garage.increment_entered
+    garage.refresh_booked()
 
-def _is_full(pls: list[ParkingLot], garage: Garage) -> bool:
-    booked = list(filter(lambda pl: pl.booked(), pls))
-    occupied = list(filter(lambda pl: pl.occupied, pls))
-    return len(booked) + len(occupied) == len(pls)
+
+def _enter_generated_user(licence_plate: str, garage: Garage, now: datetime) -> None:
+    generated_user = User.objects.create_generated_user(User.email_generator())
+    LicencePlate.objects.create(
+        user=generated_user,
+        licence_plate=licence_plate,
+        garage=garage,
+        updated_at=now,
+        entered_at=now,
+        enabled=True,
+    )
+    generate_qr_code.enqueue(generated_user.pk, login_token.make_token(generated_user))
+    garage.increment_entered
+    garage.refresh_booked()
+
+
+def _leave(lp: LicencePlate, garage: Garage, items: list[dict] | None = None) -> None:
+    """
+    Closes the stay of `lp` in `garage`. If `items` are given, the stay is charged with
+    them in the same transaction, and the charge is settled once it's committed.
+    """
+    with transaction.atomic():
+        if items is not None:
+            Charge.objects.record(lp, garage.pk, items)
+            settle_charges.enqueue(lp.user_id)
+        if lp.user.is_generated_user:
+            lp.delete()
+            lp.user.delete()
+        else:
+            lp.garage = None
+            lp.entered_at = None
+            lp.paid_at = None
+            lp.save()
+        garage.decrement_entered
@@ -0,0 +1,22 @@
+from rest_framework import status
+from rest_framework.request import Request
+
+from src.core.utils import collect_metrics
+from src.core.views import _OriginAPIView, BackendResponse
+from src.users.permissions import OnlyAdmins
+
+
+class MetricsView(_OriginAPIView):
+    """
+    View class which returns the metrics of the backend, like the hits and misses of its
+    caches, for admins.
+    """
+
+    origins = ["web"]
+    permission_classes = [OnlyAdmins]
+    http_method_names = ["get"]
+
+    def get(self, request: Request, format=None) -> BackendResponse:
+        if (resp := super().get(request, format)) is not None:
+            return resp
+        return BackendResponse(collect_metrics(), status=status.HTTP_200_OK)
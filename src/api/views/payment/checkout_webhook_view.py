@@ -8,7 +8,8 @@ from rest_framework.request import Request
 from rest_framework.permissions import AllowAny
 
 from src.api.models import LicencePlate
-from src.core.utils.payment_mails import PaymentResult, send_payment_mail
+from src.api.tasks import send_payment_mail
+from src.core.utils.payment_mails import PaymentResult
 from src.core.views import BackendResponse
 from src.users.models import User
 
@@ -18,6 +19,9 @@ import stripe
 
 def complete_payment(metadata: dict) -> BackendResponse:
     metadata = metadata
+    if "charges" in metadata.keys():
+        # The stays of the charges are closed already, see `Charge`.
+        return BackendResponse(["Settled charges"], status=status.HTTP_200_OK)
     if "licence_plate" in metadata.keys() and "user_id" in metadata.keys():
         licence_plate = metadata["licence_plate"]
         user_id = metadata["user_id"]
@@ -89,19 +93,19 @@ class CheckoutWebhookView(APIView):
             # account.
             if session.payment_status == "paid":
                 # Fulfil the purchase
-                send_payment_mail(PaymentResult.Succeeded, session.metadata["user_id"])  # type: ignore
+                send_payment_mail.enqueue(PaymentResult.Succeeded, session.metadata["user_id"])  # type: ignore
                 return complete_payment(session.metadata)
 
         elif event["type"] == "checkout.session.async_payment_succeeded":  # type: ignore
             session = event["data"]["object"]  # type: ignore
 
             # Fulfil the purchase
-            send_payment_mail(PaymentResult.Succeeded, session.metadata["user_id"])  # type: ignore
+            send_payment_mail.enqueue(PaymentResult.Succeeded, session.metadata["user_id"])  # type: ignore
             complete_payment(session.metadata)
 
         elif event["type"] == "checkout.session.async_payment_failed":  # type: ignore
             session = event["data"]["object"]  # type: ignore
-            send_payment_mail(PaymentResult.CheckoutFailed, session.metadata["user_id"])  # type: ignore
+            send_payment_mail.enqueue(PaymentResult.CheckoutFailed, session.metadata["user_id"])  # type: ignore
             return BackendResponse(
                 "Payment failed, notified user.",
                 status=status.HTTP_200_OK,
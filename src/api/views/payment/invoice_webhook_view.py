@@ -6,7 +6,8 @@ from rest_framework.request import Request
 from rest_framework.permissions import AllowAny
 
 from src.api.views.payment.checkout_webhook_view import complete_payment
-from src.core.utils.payment_mails import send_payment_mail, PaymentResult
+from src.api.tasks import send_payment_mail
+from src.core.utils.payment_mails import PaymentResult
 from src.core.views import BackendResponse
 
 import stripe
@@ -67,7 +68,7 @@ class InvoiceWebhookView(APIView):
             # These events correspond to a failed automatic charge, we have to send an email with another payment option
             # to the user
             invoice = event["data"]["object"]  # type: ignore
-            send_payment_mail(
+            send_payment_mail.enqueue(
                 PaymentResult.InvoiceFailed,  # type: ignore
                 invoice.metadata["user_id"],
                 invoice_url=invoice.hosted_invoice_url,
@@ -79,7 +80,7 @@ class InvoiceWebhookView(APIView):
         if event["type"] == "invoice.payment_succeeded":  # type: ignore
             # The payment succeeded and the user can be notified
             invoice = event["data"]["object"]  # type: ignore
-            send_payment_mail(PaymentResult.Succeeded, invoice.metadata["user_id"])  # type: ignore
+            send_payment_mail.enqueue(PaymentResult.Succeeded, invoice.metadata["user_id"])  # type: ignore
             return BackendResponse(
                 f"Payment succeeded, sent email to user.",
                 status=status.HTTP_200_OK,
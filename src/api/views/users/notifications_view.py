@@ -1,3 +1,5 @@
+from rest_framework import serializers
+
 from src.api.models import Notification
 from src.api.serializers import NotificationSerializer, PutNotificationSerializer
 
@@ -26,3 +28,6 @@ class NotificationsListView(BaseAPIView):
     serializer = {"get": NotificationSerializer}
     model = Notification
     get_user_id = True
+    conditional = True
+    filters = {"seen": ("seen", serializers.BooleanField())}
+    ordering = ["-pk"]
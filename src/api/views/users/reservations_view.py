@@ -1,4 +1,6 @@
-from rest_framework import status
+from django.db import models
+from django.utils import timezone
+from rest_framework import serializers, status
 from rest_framework.request import Request
 from rest_framework.permissions import AllowAny
 
@@ -10,6 +12,7 @@ from src.api.serializers import (
 )
 
 from src.core.views import BackendResponse, parse_frontend_json
+from src.core.settings import VALIDATOR_INTERVAL
 from src.core.views import BaseAPIView, PkAPIView
 from src.users.permissions import IsUserReservation
 
@@ -26,6 +29,15 @@ class ReservationsListView(BaseAPIView):
     }
     model = Reservation
     get_user_id = True
+    conditional = True
+    validator_fields = ["garage__revision"]
+    validator_interval = VALIDATOR_INTERVAL
+    filters = {
+        "fromDate": ("to_date__gte", serializers.DateTimeField()),
+        "toDate": ("from_date__lte", serializers.DateTimeField()),
+        "garageId": ("garage_id", serializers.IntegerField()),
+    }
+    ordering = ["from_date", "pk"]
 
     def post(self, request: Request, format=None) -> BackendResponse | None:
         data = parse_frontend_json(request)
@@ -51,6 +63,7 @@ class ReservationsDetailView(PkAPIView):
 class ReservationsRPiView(PkAPIView):
     """
     View class which handles GET-requests for reservations of the garage the RPi is located in.
+    Only the current and upcoming reservations are returned, sorted on their start.
     """
 
     origins = ["rpi"]
@@ -60,6 +73,10 @@ class ReservationsRPiView(PkAPIView):
     return_list = True
     http_method_names = ["get"]
     column = "garage_id"
+    ordering = ["from_date", "pk"]
+
+    def get_list(self, pk: int) -> models.QuerySet:
+        return super().get_list(pk).filter(to_date__gte=timezone.now())
 
     def get(self, request: Request, garage_pk: int, format=None) -> BackendResponse:
         return super().get(request, garage_pk, format)
@@ -11,6 +11,14 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Backend.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "src.core.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after the setup of Django, as it uses the models.
+from src.api.models.licence_plate_cache import start_plate_matching
+from src.api.views.garages.occupancy_stream_view import OccupancyStreamApp
+
+start_plate_matching()
+
+application = OccupancyStreamApp(django_application)
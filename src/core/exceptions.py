@@ -24,3 +24,12 @@ class DeletionException(Exception):
 
     def __init__(self, message: str) -> None:
         super().__init__(message)
+
+
+class QueryParameterException(Exception):
+    """
+    Exception raised when a query parameter of a request has an invalid value.
+    """
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
@@ -97,6 +97,18 @@ DATABASES = {
     }
 }
 
+# The cache is kept in the database, such that it's shared between the workers.
+# The maximum amount of entries in the cache, before a part of them is culled.
+CACHE_MAX_ENTRIES = 100_000
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "cache",
+        "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+    }
+}
+
 
 PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.PBKDF2PasswordHasher",
@@ -153,6 +165,9 @@ REST_KNOX = {
     "AUTO_REFRESH": True,
 }
 
+# How long the login token in the QR-code of a generated user is valid.
+LOGIN_TOKEN_MAX_AGE = timedelta(days=7)
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -186,3 +201,78 @@ EMAIL_HOST_USER = getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = getenv("EMAIL_HOST_PASSWORD")
 
 OFFSET = timedelta(hours=8)
+
+# Size of the time buckets of the capacity ledger of a garage and how far ahead it reaches.
+CAPACITY_BUCKET = timedelta(minutes=15)
+CAPACITY_HORIZON = timedelta(weeks=4)
+
+# How long the counted booked parking lots of a garage are used before being recounted.
+BOOKED_COUNT_TTL = timedelta(minutes=5)
+
+# The default and maximum amount of objects in a page of a list view.
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# How long the validators of conditional GET-requests are valid for data which depends on
+# the time, like the next free spot of a garage.
+VALIDATOR_INTERVAL = timedelta(minutes=1)
+
+# How many revisions of a garage a client can be behind before it has to fetch all parking
+# lots again, instead of the ones which changed.
+DELTA_SYNC_MAX_REVISIONS = 1000
+
+# How often each process polls the garages it streams the occupancy of for changes
+# written by other processes.
+OCCUPANCY_POLL = timedelta(seconds=1)
+
+# How often the metrics counted by a worker are added to the shared counters in the cache.
+METRICS_FLUSH = timedelta(seconds=10)
+
+# How long a new state reported by a sensor has to stay the same before it's written.
+SENSOR_DEBOUNCE = timedelta(seconds=int(getenv("SENSOR_DEBOUNCE_SECONDS", 10)))
+
+# Background jobs: if they run directly when enqueued (for tests), how often a job is
+# attempted before it's moved to the dead jobs, the delay before the first retry, which
+# doubles on every attempt, and how long a worker may run a job before another worker
+# takes it over.
+JOBS_EAGER = getenv("JOBS_EAGER", "0") == "1"
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = timedelta(seconds=30)
+JOB_LEASE = timedelta(minutes=5)
+
+# How long the licence plates looked up by the gate are kept in the cache.
+PLATE_CACHE_TIMEOUT = timedelta(hours=1)
+
+# The maximum distance between a misread licence plate and the registered licence plate
+# it's matched with, where swapping confusable characters like `O` and `0` costs 0.25 and
+# any other edit costs 1, and how often the index of the registered licence plates is
+# rebuilt by a worker, which drops the deleted ones.
+PLATE_MATCH_DISTANCE = float(getenv("PLATE_MATCH_DISTANCE", 0.5))
+PLATE_INDEX_REBUILD = timedelta(hours=1)
+
+# The format of the licence plates, with `9` for a digit and `A` for a letter, from which
+# the class of every position is taken when matching misread licence plates.
+PLATE_FORMAT = getenv("PLATE_FORMAT", "9AAA999")
+
+# How long reads of the same licence plate at the same garage get the response of the
+# first read, instead of being handled again.
+GATE_DEBOUNCE = timedelta(seconds=int(getenv("GATE_DEBOUNCE_SECONDS", 5)))
+
+# Synchronization of the gate state to the Raspberry Pi for offline decisions: how far
+# ahead the reservations are sent, how far back changes are sent again to cover the
+# transactions which were still running, and how old a version can be before a full
+# snapshot is sent again.
+SYNC_RESERVATION_HORIZON = timedelta(hours=6)
+SYNC_MARGIN = timedelta(minutes=1)
+SYNC_MAX_AGE = timedelta(days=1)
+
+# The Ed25519 private key in PEM-format with which the passes of the gate are signed, see
+# `src.core.utils.passes`. Without it, no passes are issued.
+GATE_PASS_PRIVATE_KEY = (
+    getenv("GATE_PASS_PRIVATE_KEY").replace("\\n", "\n")  # type: ignore
+    if getenv("GATE_PASS_PRIVATE_KEY")
+    else None
+)
+
+# The maximum amount of charges of a user which are settled with a single invoice.
+CHARGE_BATCH = 50
@@ -3,9 +3,12 @@ from src.api.views import (
     GaragesDetailView,
     GaragesListView,
     GarageRPiView,
+    GaragesSearchView,
     LicencePlateDetailView,
     LicencePlateListView,
     LicencePlateRPiView,
+    GateSyncView,
+    GatePassKeyView,
     UserDetailView,
     UserActivationView,
     ReservationsListView,
@@ -16,10 +19,13 @@ from src.api.views import (
     ParkingLotsGarageView,
     ParkingLotDetailView,
     ParkingLotRPiView,
+    ParkingLotsRPiView,
     ParkingLotAssignView,
+    GarageOccupancyView,
     PricesDetailView,
     PricesGarageView,
     LoginView,
+    TokenLoginView,
     LogoutView,
     SignUpView,
     ChangePasswordView,
@@ -29,6 +35,7 @@ from src.api.views import (
     Disable2FAView,
     NotificationsListView,
     NotificationsDetailView,
+    MetricsView,
 )
 from src.api.views.garages.prices_view import PricesGarageView
 from src.api.views.licence_plates.licence_plate_view import LicencePlateListView
@@ -57,6 +64,7 @@ By convention, the routes should be build in the following way:
 urlpatterns = [
     path("api/garage/<int:pk>", GaragesDetailView.as_view()),
     path("api/garages", GaragesListView.as_view()),
+    path("api/garages/search", GaragesSearchView.as_view()),
 ]
 
 # Parking lots
@@ -64,6 +72,7 @@ urlpatterns += [
     path("api/parking-lot/<int:garage_pk>", ParkingLotDetailView.as_view()),  #!
     path("api/parking-lots/<int:garage_pk>", ParkingLotsGarageView.as_view()),
     path("api/assign-parking-lot/<int:garage_pk>", ParkingLotAssignView.as_view()),
+    path("api/occupancy/<int:garage_pk>", GarageOccupancyView.as_view()),
 ]
 
 # Prices
@@ -110,6 +119,7 @@ urlpatterns += [
 ##################
 urlpatterns += [
     path("api/auth/login", LoginView.as_view()),
+    path("api/auth/token-login", TokenLoginView.as_view()),
     path("api/auth/logout", LogoutView.as_view()),
     path("api/auth/sign-up", SignUpView.as_view()),
     path(
@@ -128,7 +138,10 @@ urlpatterns += [
 ################
 urlpatterns += [
     path("api/rpi/licence-plates", LicencePlateRPiView.as_view()),
+    path("api/rpi/sync/<int:garage_pk>", GateSyncView.as_view()),
+    path("api/rpi/pass-key", GatePassKeyView.as_view()),
     path("api/rpi/parking-lot", ParkingLotRPiView.as_view()),
+    path("api/rpi/parking-lots", ParkingLotsRPiView.as_view()),
     path("api/rpi/reservations/<int:garage_pk>", ReservationsRPiView.as_view()),
     path("api/rpi/garage/<int:pk>", GarageRPiView.as_view()),
 ]
@@ -145,6 +158,14 @@ urlpatterns += [
     path("api/invoice/webhook", InvoiceWebhookView.as_view()),
 ]
 
+
+###########
+# Metrics #
+###########
+urlpatterns += [
+    path("api/metrics", MetricsView.as_view()),
+]
+
 if DEBUG:
     urlpatterns += [
         path("api/send-invoice", SendInvoiceView.as_view()),
@@ -4,6 +4,25 @@ from src.core.utils.password_validators import (
     SpecialCharacterValidation,
 )
 from src.core.utils.utils import to_camel_case, to_snake_case, decode_jwt, overlap
+from src.core.utils.interval_index import IntervalIndex
+from src.core.utils.plate_index import PlateIndex, canonical_plate, plate_distance
+from src.core.utils.metrics import (
+    register_metrics,
+    collect_metrics,
+    increment,
+    flush_metrics,
+    get_count,
+)
+from src.core.utils.versioned_cache import VersionedCache
+from src.core.utils.broker import InProcessBroker, Subscription
+from src.core.utils.after_response import after_response
+from src.core.utils.jobs import Task, task, get_task
+from src.core.utils.passes import (
+    passes_enabled,
+    sign_pass,
+    verify_pass,
+    public_key,
+)
 from src.core.utils.stripe_endpoints import (
     get_stripe_price,
     create_stripe_price,
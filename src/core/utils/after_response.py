@@ -0,0 +1,51 @@
+import logging
+from contextvars import ContextVar
+from typing import Any
+
+from django.core.signals import request_finished
+from django.http import HttpResponse
+
+from src.core.utils.jobs import Task
+
+logger = logging.getLogger(__name__)
+
+# The tasks to run once the response of the current request is sent, see
+# `after_response()`. A context variable is used as every request of the ASGI server runs
+# in its own context.
+_pending: ContextVar[list[tuple[Task, tuple, dict]] | None] = ContextVar(
+    "after_response", default=None
+)
+
+
+def after_response(
+    response: HttpResponse, task: Task, *args: Any, **kwargs: Any
+) -> HttpResponse:
+    """
+    Runs `task(*args, **kwargs)` once `response` is sent, on the `request_finished` signal,
+    which is used for side effects the client doesn't have to wait for. As the response is
+    already sent, a task which fails is enqueued as a job instead, such that the
+    `run_jobs`-command retries it. Thus the arguments have to be serializable to JSON, and
+    a task has to be safe to run again after it failed, e.g. by running in a transaction.
+    """
+    if (pending := _pending.get()) is None:
+        pending = []
+        _pending.set(pending)
+    pending.append((task, args, kwargs))
+    return response
+
+
+def _run_pending(**kwargs: Any) -> None:
+    if not (pending := _pending.get()):
+        return
+    _pending.set(None)
+    for task, args, task_kwargs in pending:
+        try:
+            task(*args, **task_kwargs)
+        except Exception:
+            logger.exception(
+                "Failed to run %s after the response, retrying it.", task.name
+            )
+            task.enqueue(*args, **task_kwargs)
+
+
+request_finished.connect(_run_pending)
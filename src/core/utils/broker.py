@@ -0,0 +1,83 @@
+import asyncio
+from collections import defaultdict
+from threading import Lock
+from typing import Any
+
+
+class Subscription:
+    """
+    Subscription on a channel of a broker, which queues the messages for a subscriber in
+    the event loop it was created in. If the subscriber doesn't keep up and more than
+    `max_queued` messages are waiting, new messages are dropped and `overflowed` is set,
+    such that the subscriber knows it has to resynchronize.
+    """
+
+    def __init__(self, channel: str, max_queued: int) -> None:
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.overflowed = False
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(max_queued)
+
+    async def get(self) -> Any:
+        return await self._queue.get()
+
+    def _put(self, message: Any) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class InProcessBroker:
+    """
+    Broker which delivers the messages published on a channel to the subscribers of the
+    channel in the same process. Messages can be published from any thread, like the ones
+    in which the sync views run, while the subscribers wait in an event loop. An idle
+    subscriber is only a queue, and a message is handed to every event loop with one
+    callback, which puts it in the queues of the subscribers of that loop.
+    """
+
+    def __init__(self, max_queued: int = 100) -> None:
+        self.max_queued = max_queued
+        self._subscriptions: dict[str, set[Subscription]] = defaultdict(set)
+        self._lock = Lock()
+
+    def has_subscribers(self, channel: str) -> bool:
+        return bool(self._subscriptions.get(channel))
+
+    def subscribe(self, channel: str) -> Subscription:
+        """
+        Subscribes on `channel`, which has to be called from within an event loop.
+        """
+        subscription = Subscription(channel, self.max_queued)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.channel, None)
+
+    def publish(self, channel: str, message: Any) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        per_loop: dict[asyncio.AbstractEventLoop, list[Subscription]] = defaultdict(
+            list
+        )
+        for subscription in subscriptions:
+            per_loop[subscription.loop].append(subscription)
+        for loop, group in per_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, group, message)
+            except RuntimeError:
+                # The event loop is closed.
+                for subscription in group:
+                    self.unsubscribe(subscription)
+
+
+def _deliver(subscriptions: list[Subscription], message: Any) -> None:
+    for subscription in subscriptions:
+        subscription._put(message)
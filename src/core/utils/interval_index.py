@@ -0,0 +1,97 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _LengthClass:
+    """
+    The ranges of an `IntervalIndex` of which the length is in `[2^(c - 1), 2^c)` seconds,
+    sorted on their start, together with their lengths, sorted as well.
+    """
+
+    def __init__(self) -> None:
+        self.starts: list[tuple[float, int]] = []
+        self.lengths: list[float] = []
+
+    @property
+    def longest(self) -> float:
+        return self.lengths[-1]
+
+
+class IntervalIndex(Generic[T]):
+    """
+    Index over closed date ranges `[start, end]`, which returns the ranges overlapping a
+    given date range.
+
+    The ranges are grouped in classes of which the lengths differ at most a factor two, and
+    each class is kept in a list sorted on the start of its ranges. A range of a class
+    which overlaps `[from_date, to_date]` has to start in `[from_date - longest, to_date]`,
+    where `longest` is the longest range of that class, thus only that slice of every
+    class is scanned. As the ranges of a class are at least half as long as `longest`, the
+    ranges which are scanned but don't overlap all contain `from_date - longest / 2`, thus
+    a long range only widens the scans of its own class. A query takes O(c log n + k + s),
+    with `c` the number of classes, `k` the number of overlapping ranges and `s` the number
+    of ranges of the scanned classes which contain that date.
+
+    Ranges are identified by an integer `key`, which is used to update or remove them.
+    """
+
+    def __init__(self) -> None:
+        self._classes: dict[int, _LengthClass] = {}
+        self._ranges: dict[int, tuple[float, float, T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ranges)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._ranges
+
+    def add(self, key: int, start: datetime, end: datetime, value: T) -> None:
+        """
+        Adds the range `[start, end]` with `value` to the index. If a range with `key` is
+        already present, it's replaced.
+        """
+        self.remove(key)
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        length = end_ts - start_ts
+        length_class = self._classes.setdefault(_class_of(length), _LengthClass())
+        insort(length_class.starts, (start_ts, key))
+        insort(length_class.lengths, length)
+        self._ranges[key] = (start_ts, end_ts, value)
+
+    def remove(self, key: int) -> None:
+        """
+        Removes the range with `key` from the index, if present.
+        """
+        if (r := self._ranges.pop(key, None)) is None:
+            return
+        length = r[1] - r[0]
+        c = _class_of(length)
+        length_class = self._classes[c]
+        del length_class.starts[bisect_left(length_class.starts, (r[0], key))]
+        del length_class.lengths[bisect_left(length_class.lengths, length)]
+        if not length_class.starts:
+            del self._classes[c]
+
+    def overlapping(self, from_date: datetime, to_date: datetime) -> list[T]:
+        """
+        Returns the values of all ranges which overlap with `[from_date, to_date]`, in the
+        same way as `src.core.utils.overlap`.
+        """
+        from_ts, to_ts = from_date.timestamp(), to_date.timestamp()
+        values = []
+        for length_class in self._classes.values():
+            starts = length_class.starts
+            lo = bisect_left(starts, (from_ts - length_class.longest,))
+            hi = bisect_right(starts, (to_ts, float("inf")))
+            for _, key in starts[lo:hi]:
+                _, end_ts, value = self._ranges[key]
+                if from_ts <= end_ts:
+                    values.append(value)
+        return values
+
+
+def _class_of(length: float) -> int:
+    return int(length).bit_length()
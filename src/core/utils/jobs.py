@@ -0,0 +1,99 @@
+from datetime import timedelta
+from importlib import import_module
+from typing import Any, Callable
+
+from django.db.models import Q
+from django.utils import timezone
+
+from src.core.settings import JOB_MAX_ATTEMPTS, JOBS_EAGER
+
+_tasks: dict[str, "Task"] = {}
+
+
+class Task:
+    """
+    Function which can be run in the background by the `run_jobs`-command. Calling the
+    task runs it directly, while `enqueue()` stores a job which runs it later. The arguments
+    of an enqueued task have to be serializable to JSON.
+    """
+
+    def __init__(self, func: Callable[..., Any], max_attempts: int) -> None:
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Stores a job which runs the task with `args` and `kwargs`. The job is part of the
+        current transaction, thus it's only run if the transaction is committed. If
+        `JOBS_EAGER`, the task is run directly instead.
+        """
+        if JOBS_EAGER:
+            self.func(*args, **kwargs)
+            return
+        from src.api.models import Job
+
+        Job.objects.create(task=self.name, args=list(args), kwargs=kwargs)
+
+    def schedule(self, delay: timedelta, *args: Any, **kwargs: Any) -> None:
+        """
+        Stores a job which runs the task with `args` and `kwargs` after `delay`, like
+        `enqueue()`. If `JOBS_EAGER`, the task is run directly instead.
+        """
+        if JOBS_EAGER:
+            self.func(*args, **kwargs)
+            return
+        from src.api.models import Job
+
+        Job.objects.create(
+            task=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            run_at=timezone.now() + delay,
+        )
+
+    def schedule_once(self, delay: timedelta, *args: Any, **kwargs: Any) -> None:
+        """
+        Schedules the task with `args` and `kwargs` after `delay`, like `schedule()`, unless
+        a job of it with the same arguments is already waiting to be claimed.
+        """
+        if not JOBS_EAGER:
+            from src.api.models import Job
+
+            now = timezone.now()
+            if (
+                Job.objects.filter(task=self.name, args=list(args), kwargs=kwargs)
+                .filter(Q(locked_until=None) | Q(locked_until__lt=now))
+                .exists()
+            ):
+                return
+        self.schedule(delay, *args, **kwargs)
+
+
+def task(
+    func: Callable[..., Any] | None = None, *, max_attempts: int = JOB_MAX_ATTEMPTS
+) -> Any:
+    """
+    Decorator which registers a function as a `Task`, which is attempted `max_attempts`
+    times when enqueued.
+    """
+
+    def register(func: Callable[..., Any]) -> Task:
+        registered = Task(func, max_attempts)
+        _tasks[registered.name] = registered
+        return registered
+
+    return register(func) if func is not None else register
+
+
+def get_task(name: str) -> Task:
+    """
+    Returns the task registered with `name`, of which the module is imported if it isn't
+    yet. Raises a `KeyError` if no such task exists.
+    """
+    if name not in _tasks:
+        import_module(name.rsplit(".", 1)[0])
+    return _tasks[name]
@@ -0,0 +1,74 @@
+import atexit
+from collections import defaultdict
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable
+
+from django.core.cache import cache
+
+from src.core.settings import METRICS_FLUSH
+
+_collectors: dict[str, Callable[[], dict[str, Any]]] = {}
+
+# The increments of this worker which aren't added to the cache yet, see `increment()`.
+_counts: dict[str, int] = defaultdict(int)
+_counts_lock = Lock()
+_flushed_at = monotonic()
+
+
+def register_metrics(name: str, collect: Callable[[], dict[str, Any]]) -> None:
+    """
+    Registers a group of metrics with `name`, of which the values are returned by
+    `collect()`.
+    """
+    _collectors[name] = collect
+
+
+def collect_metrics() -> dict[str, dict[str, Any]]:
+    """
+    Returns the values of all registered groups of metrics.
+    """
+    flush_metrics()
+    return {name: collect() for name, collect in _collectors.items()}
+
+
+def increment(name: str, amount: int = 1) -> None:
+    """
+    Increments the counter with `name`, which is kept in the cache of Django such that it's
+    shared between the workers. The increments are buffered in the worker and added to the
+    cache at most every `METRICS_FLUSH`, instead of writing to the cache on every call.
+    """
+    with _counts_lock:
+        _counts[name] += amount
+        if monotonic() - _flushed_at < METRICS_FLUSH.total_seconds():
+            return
+    flush_metrics()
+
+
+def flush_metrics() -> None:
+    """
+    Adds the buffered increments of this worker to the counters in the cache.
+    """
+    global _flushed_at
+    with _counts_lock:
+        counts = dict(_counts)
+        _counts.clear()
+        _flushed_at = monotonic()
+    for name, amount in counts.items():
+        key = f"metrics:{name}"
+        if cache.add(key, amount, None):
+            continue
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # The counter got evicted in between.
+            cache.set(key, amount, None)
+
+
+def get_count(name: str) -> int:
+    with _counts_lock:
+        buffered = _counts.get(name, 0)
+    return cache.get(f"metrics:{name}", 0) + buffered
+
+
+atexit.register(flush_metrics)
@@ -0,0 +1,72 @@
+from base64 import b64encode
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import (
+    Encoding,
+    PublicFormat,
+    load_pem_private_key,
+)
+
+from src.core.exceptions import BackendException
+from src.core.settings import GATE_PASS_PRIVATE_KEY
+
+_ALGORITHM = "EdDSA"
+
+
+def passes_enabled() -> bool:
+    return GATE_PASS_PRIVATE_KEY is not None
+
+
+def sign_pass(claims: dict[str, Any], not_before: datetime, expires: datetime) -> str:
+    """
+    Returns a pass with `claims`, which is valid from `not_before` until `expires`. The
+    pass is a JWT signed with the Ed25519 key in `GATE_PASS_PRIVATE_KEY`, thus anyone with
+    the public key can verify it, without being able to issue passes.
+    """
+    payload = claims | {
+        "nbf": int(not_before.timestamp()),
+        "exp": int(expires.timestamp()),
+    }
+    return jwt.encode(payload, _private_key(), algorithm=_ALGORITHM)
+
+
+def verify_pass(token: str, at: datetime) -> dict[str, Any] | None:
+    """
+    Returns the claims of the pass `token` if it's signed with the key of the gate passes
+    and valid `at`, otherwise `None`.
+    """
+    try:
+        claims = jwt.decode(
+            token,
+            _private_key().public_key(),
+            algorithms=[_ALGORITHM],
+            options={"verify_exp": False, "verify_nbf": False},
+        )
+    except jwt.InvalidTokenError:
+        return None
+    if not claims["nbf"] <= at.timestamp() <= claims["exp"]:
+        return None
+    return claims
+
+
+def public_key() -> str:
+    """
+    Returns the raw Ed25519 public key with which the gate passes are verified, encoded
+    in base64.
+    """
+    raw = _private_key().public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+    return b64encode(raw).decode()
+
+
+@lru_cache(maxsize=1)
+def _private_key() -> Ed25519PrivateKey:
+    if GATE_PASS_PRIVATE_KEY is None:
+        raise BackendException("No private key present for signing gate passes.")
+    key = load_pem_private_key(GATE_PASS_PRIVATE_KEY.encode(), password=None)
+    if not isinstance(key, Ed25519PrivateKey):
+        raise BackendException("The private key for signing gate passes isn't Ed25519.")
+    return key
@@ -0,0 +1,123 @@
+from typing import Iterable
+
+from src.core.settings import PLATE_FORMAT
+
+# Letters and the digit they're often confused with when a licence plate is read by a
+# camera. Only a letter and a digit are confused, as a letter read at a position of a
+# digit, or the other way around, can't be right, while two letters or two digits which
+# look alike are both valid and belong to different licence plates.
+CONFUSABLE_CHARACTERS = ["O0", "I1", "Z2", "S5", "G6", "B8"]
+
+# The cost of substituting a character by one which it's confused with, while any other
+# substitution, insertion or deletion costs 1.
+CONFUSION_COST = 0.25
+
+_AS_LETTER = str.maketrans({digit: letter for letter, digit in CONFUSABLE_CHARACTERS})
+_AS_DIGIT = str.maketrans({letter: digit for letter, digit in CONFUSABLE_CHARACTERS})
+
+
+def canonical_plate(plate: str) -> str:
+    """
+    Returns `plate` in upper case with every confusable character which has the wrong
+    class for its position in `PLATE_FORMAT` replaced by the character of the right class,
+    like `O` by `0` at the position of a digit. Thus plates which only differ in confused
+    characters are equal. A plate which doesn't have the length of the format is returned
+    as is.
+    """
+    plate = plate.upper()
+    if len(plate) != len(PLATE_FORMAT):
+        return plate
+    return "".join(
+        c.translate(_AS_DIGIT if kind == "9" else _AS_LETTER)
+        for c, kind in zip(plate, PLATE_FORMAT)
+    )
+
+
+def plate_distance(a: str, b: str) -> float:
+    """
+    Returns the edit distance between the plates `a` and `b`, where a substitution of a
+    character by the one it's confused with at its position costs `CONFUSION_COST`, see
+    `canonical_plate()`.
+    """
+    a, b = a.upper(), b.upper()
+    ca, cb = canonical_plate(a), canonical_plate(b)
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [float(i)] + [0.0] * len(b)
+        for j in range(1, len(b) + 1):
+            if a[i - 1] == b[j - 1]:
+                substitution = 0.0
+            elif ca[i - 1] == cb[j - 1]:
+                substitution = CONFUSION_COST
+            else:
+                substitution = 1.0
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + substitution,
+            )
+        previous = current
+    return previous[-1]
+
+
+def _deletions(key: str) -> set[str]:
+    return {key[:i] + key[i + 1 :] for i in range(len(key))}
+
+
+class PlateIndex:
+    """
+    Index over licence plates, which returns the plate closest to a misread plate within
+    `max_distance`, see `plate_distance()`.
+
+    The plates are indexed on their canonical form, thus a read in which only confusable
+    characters are swapped is found with a single lookup. If `max_distance` allows another
+    edit, the canonical forms with one character deleted are indexed as well: two plates
+    which differ in one substitution, insertion or deletion share such a key. A lookup then
+    takes at most one lookup per character of the read, irrespective of the amount of
+    plates, after which the candidates are verified with `plate_distance()`.
+    """
+
+    def __init__(self, max_distance: float, plates: Iterable[str] = ()) -> None:
+        self.max_distance = max_distance
+        self._plates: set[str] = set()
+        self._keys: dict[str, list[str]] = {}
+        for plate in plates:
+            self.add(plate)
+
+    def __len__(self) -> int:
+        return len(self._plates)
+
+    def __contains__(self, plate: str) -> bool:
+        return plate in self._plates
+
+    def add(self, plate: str) -> None:
+        if plate in self._plates:
+            return
+        self._plates.add(plate)
+        for key in self._lookup_keys(canonical_plate(plate)):
+            self._keys.setdefault(key, []).append(plate)
+
+    def match(self, plate: str) -> str | None:
+        """
+        Returns the indexed plate closest to `plate` within the maximum distance, or `None`
+        if there's none or if multiple plates are equally close, as the read can't be
+        attributed then.
+        """
+        candidates = {
+            candidate
+            for key in self._lookup_keys(canonical_plate(plate))
+            for candidate in self._keys.get(key, ())
+        }
+        best, best_distance, ambiguous = None, self.max_distance, False
+        for candidate in candidates:
+            distance = plate_distance(plate, candidate)
+            if distance < best_distance or (best is None and distance == best_distance):
+                best, best_distance, ambiguous = candidate, distance, False
+            elif distance == best_distance:
+                ambiguous = True
+        return None if ambiguous else best
+
+    def _lookup_keys(self, canonical: str) -> set[str]:
+        if self.max_distance < 1:
+            return {canonical}
+        return {canonical} | _deletions(canonical)
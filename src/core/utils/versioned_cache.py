@@ -0,0 +1,52 @@
+from datetime import timedelta
+from typing import Callable, TypeVar
+
+from django.core.cache import cache
+
+from src.core.utils.metrics import get_count, increment, register_metrics
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class VersionedCache:
+    """
+    Cache of computed values, which are stored in the cache of Django under a `version`,
+    like the revision of a garage. As the version is part of the key of every entry, a
+    write which bumps the version makes all entries with the old version unreachable, in
+    every worker which shares the cache. Those entries expire after `timeout`.
+
+    The hits and misses of the cache are registered as the metrics `<name>_cache`.
+    """
+
+    def __init__(self, name: str, timeout: timedelta) -> None:
+        self.name = name
+        self.timeout = timeout.total_seconds()
+        register_metrics(f"{name}_cache", self.metrics)
+
+    def get_or_set(self, key: str, version: int, compute: Callable[[], T]) -> T:
+        """
+        Returns the value stored for `key` and `version`, which is computed and stored with
+        `compute()` if it isn't present.
+        """
+        value = cache.get(f"{self.name}:{key}", _MISSING, version=version)
+        if value is not _MISSING:
+            increment(f"{self.name}:hits")
+            return value  # type: ignore
+        increment(f"{self.name}:misses")
+        value = compute()
+        cache.set(f"{self.name}:{key}", value, self.timeout, version=version)
+        return value
+
+    def metrics(self) -> dict[str, int | float]:
+        """
+        Returns the amount of hits and misses of the cache and its hit ratio.
+        """
+        hits = get_count(f"{self.name}:hits")
+        misses = get_count(f"{self.name}:misses")
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+        }
@@ -1,11 +1,17 @@
 from collections import OrderedDict
+from datetime import timedelta
+from hashlib import md5
 import os
 import json
 
 from typing import Callable, TypeVar, Any
 
+from django.core import signing
 from django.db import models
-from django.http import Http404, JsonResponse
+from django.db.models import Count, Max, Q, Sum
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.contrib.auth.hashers import check_password
 from jwt.exceptions import DecodeError, ExpiredSignatureError
 
@@ -23,6 +29,8 @@ from src.core.utils import to_camel_case, to_snake_case, decode_jwt
 from src.core.exceptions import BackendException
 from src.core.utils import to_camel_case, to_snake_case
 from src.core.exceptions import OriginValidationException, DeletionException
+from src.core.exceptions import QueryParameterException
+from src.core.settings import MAX_PAGE_SIZE, PAGE_SIZE
 from src.users.permissions import IsGarageOwner
 
 T = TypeVar("T")
@@ -268,7 +276,222 @@ class GetObjectMixin:
             raise Http404
 
 
-class BaseAPIView(_OriginAPIView, GetObjectMixin):
+class ConditionalGetMixin:
+    """
+    Mixin which adds conditional GET-requests to a view, when `conditional` is set. The
+    `ETag` header is computed from the `updated_at`-column of the objects, their amount,
+    which changes when one is deleted, and the sum of the columns in `validator_fields`.
+    These have to be columns which only increase, like the `revision` of a garage which is
+    bumped when its counters change. Thus, the `ETag` is fetched with a single aggregate
+    and if it matches the `If-None-Match` header of the request, `304 Not Modified` is
+    returned without serializing the objects.
+
+    No `Last-Modified` header is sent, as the changes which don't touch `updated_at`, like
+    the counters and deletions, can't be expressed as a date, thus `If-Modified-Since` is
+    ignored.
+
+    If the serialized data depends on the time, like the next free spot of a garage,
+    `validator_interval` can be set, such that the validators change every interval.
+    """
+
+    conditional = False
+    validator_fields: list[str] = []
+    validator_interval: timedelta | None = None
+
+    def get_validators(
+        self, request: Request, data: models.Model | models.QuerySet
+    ) -> str | None:
+        """
+        Returns the `ETag` of `data`, or `None` if the view isn't conditional or `data` has
+        no `updated_at`-column.
+        """
+        if not self.conditional:
+            return None
+        if isinstance(data, models.QuerySet):
+            validators = data.aggregate(
+                count=Count("pk"),
+                updated_at=Max("updated_at"),
+                **{field: Sum(field) for field in self.validator_fields},
+            )
+        elif hasattr(data, "updated_at"):
+            validators = {"updated_at": data.updated_at}  # type: ignore
+            for field in self.validator_fields:
+                value = data
+                for attr in field.split("__"):
+                    value = getattr(value, attr)
+                validators[field] = value
+        else:
+            return None
+        updated_at = validators.pop("updated_at")
+        if self.validator_interval is not None:
+            validators["interval"] = int(
+                timezone.now().timestamp() // self.validator_interval.total_seconds()
+            )
+        key = ":".join(
+            [
+                self.__class__.__name__,
+                str(request.user.pk),
+                str(updated_at and updated_at.timestamp()),
+                *(f"{key}={value}" for key, value in sorted(validators.items())),
+            ]
+        )
+        return f'"{md5(key.encode()).hexdigest()}"'
+
+    def conditional_response(
+        self, request: Request, etag: str | None
+    ) -> HttpResponse | None:
+        """
+        Returns `304 Not Modified` if `etag` matches the conditional headers of `request`.
+        """
+        if etag is None:
+            return None
+        return get_conditional_response(request, etag=etag)
+
+    def set_validators(
+        self, response: BackendResponse, etag: str | None
+    ) -> BackendResponse:
+        if etag is not None:
+            response["ETag"] = etag
+        return response
+
+
+class ListMixin:
+    """
+    Mixin which adds filtering and cursor pagination to the GET-requests of list views.
+
+    The query parameters in `filters` are mapped to lookups on the objects, given as
+    `{parameter: (lookup, field)}`, where the value of the parameter is validated with the
+    serializer `field`. The filtered objects are sorted on `ordering`, of which the last
+    column has to be unique. Pagination is opt-in for the clients: only if `pageSize` or
+    `cursor` is given, the objects are returned in pages of `pageSize` objects. If there
+    are more objects, the `Link`-header of the response contains the url of the next page,
+    which continues after the values of the last object, such that every page is an
+    indexed query, irrespective of how far the client paged. Otherwise all objects are
+    returned, as before.
+    """
+
+    filters: dict[str, tuple[str, serializers.Field]] = {}
+    ordering: list[str] = ["pk"]
+
+    def filter_objects(
+        self, request: Request, objects: models.QuerySet
+    ) -> models.QuerySet:
+        """
+        Returns `objects` filtered on the query parameters in `filters` of `request`.
+        """
+        lookups = {}
+        for parameter, (lookup, field) in self.filters.items():
+            if (value := request.query_params.get(parameter)) is None:
+                continue
+            try:
+                lookups[lookup] = field.run_validation(value)
+            except serializers.ValidationError as e:
+                raise QueryParameterException(
+                    f"Invalid value for `{parameter}`: {' '.join(map(str, e.detail))}"
+                )
+        return objects.filter(**lookups)
+
+    def paginate(
+        self, request: Request, objects: models.QuerySet
+    ) -> tuple[list, str | None]:
+        """
+        Returns the page of `objects` requested with `request` and the cursor of the next
+        page, which is `None` if it's the last page. All objects are returned if `request`
+        doesn't ask for a page.
+        """
+        objects = objects.order_by(*self.ordering)
+        if not {"pageSize", "cursor"} & set(request.query_params):
+            return list(objects), None
+        try:
+            page_size = int(request.query_params.get("pageSize", PAGE_SIZE))
+        except ValueError:
+            raise QueryParameterException("`pageSize` has to be an integer.")
+        if not 0 < page_size <= MAX_PAGE_SIZE:
+            raise QueryParameterException(
+                f"`pageSize` has to be between 1 and {MAX_PAGE_SIZE}."
+            )
+        if (cursor := request.query_params.get("cursor")) is not None:
+            try:
+                values = signing.loads(cursor, salt="cursor")
+            except signing.BadSignature:
+                raise QueryParameterException("Invalid value for `cursor`.")
+            objects = objects.filter(self._after(values))
+        page = list(objects[: page_size + 1])
+        if len(page) <= page_size:
+            return page, None
+        page = page[:page_size]
+        values = [self._value(page[-1], column) for column in self.ordering]
+        return page, signing.dumps(values, salt="cursor")
+
+    def set_next_link(
+        self, response: BackendResponse, request: Request, cursor: str | None
+    ) -> BackendResponse:
+        if cursor is not None:
+            query = request.query_params.copy()
+            query["cursor"] = cursor
+            url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+            response["Link"] = f'<{url}>; rel="next"'
+        return response
+
+    def _after(self, values: list[Any]) -> Q:
+        """
+        Returns the condition for the objects which come after the object with `values` for
+        the columns in `ordering`.
+        """
+        after = Q()
+        for i, column in enumerate(self.ordering):
+            lookup = "lt" if column.startswith("-") else "gt"
+            equal = {c.lstrip("-"): v for c, v in zip(self.ordering[:i], values)}
+            after |= Q(**equal, **{f"{column.lstrip('-')}__{lookup}": values[i]})
+        return after
+
+    @staticmethod
+    def _value(obj: models.Model, column: str) -> Any:
+        value = obj
+        for attr in column.lstrip("-").split("__"):
+            value = getattr(value, attr)
+        return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+class SparseFieldsMixin:
+    """
+    Mixin which limits the serialized fields to the ones requested with the `fields` query
+    parameter, e.g. `?fields=id,name`. The other fields are removed from the serializer
+    before serializing, thus computed fields which aren't requested, like the
+    availability of parking lots, are never evaluated.
+    """
+
+    def requested_fields(self, request: Request) -> set[str] | None:
+        """
+        Returns the names of the fields requested with `request`, or `None` if all fields
+        are requested.
+        """
+        if (fields := request.query_params.get("fields")) is None:
+            return None
+        requested = {to_snake_case(f.strip()) for f in fields.split(",") if f.strip()}
+        if not requested:
+            raise QueryParameterException("`fields` has to contain at least one field.")
+        return requested
+
+    def select_fields(self, serializer: U, fields: set[str] | None) -> U:
+        """
+        Removes the fields of `serializer` which aren't in `fields`.
+        """
+        if fields is None:
+            return serializer
+        child = getattr(serializer, "child", serializer)
+        if unknown := fields - set(child.fields):
+            raise QueryParameterException(
+                f"Unknown fields: {', '.join(f'`{to_camel_case(f)}`' for f in sorted(unknown))}."
+            )
+        for name in set(child.fields) - fields:
+            child.fields.pop(name)
+        return serializer
+
+
+class BaseAPIView(
+    _OriginAPIView, GetObjectMixin, ConditionalGetMixin, ListMixin, SparseFieldsMixin
+):
     serializer: dict[str, U] = None  # type: ignore
     model: V = None  # type: ignore
     get_user_id = False
@@ -278,13 +501,38 @@ class BaseAPIView(_OriginAPIView, GetObjectMixin):
     def get(self, request: Request, format=None) -> BackendResponse:
         if (resp := super().get(request, format)) is not None:
             return resp
+        try:
+            fields = self.requested_fields(request)
+            objects = self.filter_objects(request, self.get_objects(request))
+            etag = self.get_validators(request, objects)
+            if (resp := self.conditional_response(request, etag)) is not None:
+                return resp  # type: ignore
+            page, cursor = self.paginate(request, objects)
+            serializer = self.select_fields(
+                self.serializer["get"](page, many=True, context=self.serializer_context(page, fields)),  # type: ignore
+                fields,
+            )
+        except QueryParameterException as e:
+            return BackendResponse([str(e)], status=status.HTTP_400_BAD_REQUEST)
+        response = BackendResponse(serializer.data, status=status.HTTP_200_OK)
+        return self.set_next_link(self.set_validators(response, etag), request, cursor)
+
+    def get_objects(self, request: Request) -> models.QuerySet:
+        """
+        Returns the objects which are listed on a GET-request.
+        """
         if self.model and not self.get_user_id:
-            objects = self.model.objects.all()  # type: ignore
-            serializer = self.serializer["get"](objects, many=True)  # type: ignore
-        else:
-            objects = self.model.objects.filter(**{"user_id": request.user.pk})  # type: ignore
-            serializer = self.serializer["get"](objects, many=True)  # type: ignore
-        return BackendResponse(serializer.data, status=status.HTTP_200_OK)
+            return self.model.objects.all()  # type: ignore
+        return self.model.objects.filter(**{"user_id": request.user.pk})  # type: ignore
+
+    def serializer_context(
+        self, objects: list, fields: set[str] | None
+    ) -> dict[str, Any]:
+        """
+        Returns the context passed to the serializer of the listed `objects`, of which
+        only `fields` are serialized if given.
+        """
+        return {}
 
     def post(self, request: Request, format=None) -> BackendResponse | None:
         if (resp := super().post(request, format)) is not None:
@@ -306,7 +554,9 @@ class BaseAPIView(_OriginAPIView, GetObjectMixin):
         return BackendResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PkAPIView(_OriginAPIView, GetObjectMixin):
+class PkAPIView(
+    _OriginAPIView, GetObjectMixin, ConditionalGetMixin, ListMixin, SparseFieldsMixin
+):
     model: V = None  # type: ignore
     fk_model = None  # type: ignore
     serializer: U = None  # type: ignore
@@ -326,7 +576,7 @@ class PkAPIView(_OriginAPIView, GetObjectMixin):
                 # Special case for the UserView
                 data = request.user  # type: ignore
             elif self.return_list:
-                data: list[V] = self.model.objects.filter(**{self.column: pk})  # type: ignore
+                data: list[V] = self.get_list(pk)  # type: ignore
             elif self.fk_model is None:
                 data: V = self.get_object(self.model, pk)  # type: ignore
             else:
@@ -338,8 +588,29 @@ class PkAPIView(_OriginAPIView, GetObjectMixin):
                 ],
                 status=status.HTTP_404_NOT_FOUND,
             )
-        serializer: U = self.serializer(data, many=self.return_list)  # type: ignore
-        return BackendResponse(serializer.data, status=status.HTTP_200_OK)
+        cursor = None
+        try:
+            fields = self.requested_fields(request)
+            if self.return_list:
+                data = self.filter_objects(request, data)  # type: ignore
+            etag = self.get_validators(request, data)
+            if (resp := self.conditional_response(request, etag)) is not None:
+                return resp  # type: ignore
+            if self.return_list:
+                data, cursor = self.paginate(request, data)  # type: ignore
+            serializer: U = self.select_fields(
+                self.serializer(data, many=self.return_list), fields  # type: ignore
+            )
+        except QueryParameterException as e:
+            return BackendResponse([str(e)], status=status.HTTP_400_BAD_REQUEST)
+        response = BackendResponse(serializer.data, status=status.HTTP_200_OK)
+        return self.set_next_link(self.set_validators(response, etag), request, cursor)
+
+    def get_list(self, pk: int) -> models.QuerySet:
+        """
+        Returns the objects of which `column` is `pk`, if `return_list` is set.
+        """
+        return self.model.objects.filter(**{self.column: pk})  # type: ignore
 
     def post(self, request: Request, garage_pk: int, format=None) -> BackendResponse:
         if (resp := super().post(request, format)) is not None:
@@ -1,8 +1,10 @@
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.contrib.auth.backends import BaseBackend
+from django.core import signing
 
 from rest_framework.request import Request
 
+from src.core.settings import LOGIN_TOKEN_MAX_AGE
 from src.users.models import User
 
 
@@ -38,10 +40,45 @@ class EmailVerificationTokenGenerator(PasswordResetTokenGenerator):
 
     def _make_hash_value(self, user: User, timestamp) -> str:
         """
-        Creates a hash of the user's active state, primary key and the timestamp of token 
+        Creates a hash of the user's active state, primary key and the timestamp of token
         creation.
         """
         return str(user.is_active) + str(user.pk) + str(timestamp)
 
 
 email_verification_token = EmailVerificationTokenGenerator()
+
+
+class LoginTokenGenerator:
+    """
+    Generator of the login tokens of generated users, which are signed with an HMAC of the
+    secret key and expire after `LOGIN_TOKEN_MAX_AGE`. A token is bound to the primary key
+    and the (random) email of the user, thus it's invalid once the user is deleted.
+    """
+
+    salt = "src.users.backends.LoginTokenGenerator"
+
+    def make_token(self, user: User) -> str:
+        """
+        Create a token that can be used to log in as the generated `user`.
+        """
+        return signing.dumps([user.pk, user.email], salt=self.salt)
+
+    def check_token(self, token: str) -> User | None:
+        """
+        Returns the generated user of `token`, or `None` if the token is invalid or
+        expired.
+        """
+        try:
+            pk, email = signing.loads(
+                token, salt=self.salt, max_age=LOGIN_TOKEN_MAX_AGE
+            )
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+        user = User.objects.filter(pk=pk, email=email).first()
+        if user is None or not user.is_generated_user or not user.is_active:
+            return None
+        return user
+
+
+login_token = LoginTokenGenerator()
@@ -34,6 +34,19 @@ class UserManager(BaseUserManager):
         user.save()
         return user
 
+    def create_generated_user(self, email, **extra_fields) -> User:
+        """
+        Create and save a generated User with the given email, which is used for licence
+        plates unknown at the gate. The user gets an unusable password, thus it can only
+        log in with the login token of its QR-code, see `LoginTokenGenerator`.
+        """
+        user = self.model(
+            email=self.normalize_email(email), role=0, is_active=True, **extra_fields
+        )
+        user.set_unusable_password()
+        user.save()
+        return user
+
     def create_superuser(self, email, password, **extra_fields) -> User:
         """
         Create and save a SuperUser with the given email and password.
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.2 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_alter_user_strikes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["updated_at"], name="users_user_updated_cc7221_idx"
+            ),
+        ),
+    ]
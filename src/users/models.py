@@ -5,6 +5,7 @@ import stripe
 from qrcode import make, QRCode
 
 
+from hashlib import md5
 from secrets import token_hex
 from knox.models import AuthToken
 
@@ -13,7 +14,7 @@ from django.db import models
 from src.api.models.licence_plate import LicencePlate
 
 from src.users.managers import UserManager
-from src.api.models import ProvincesEnum
+from src.api.models import Price, ProvincesEnum
 from src.core.models import TimeStampMixin
 from src.core.exceptions import DeletionException
 from src.core.exceptions import BackendException
@@ -49,6 +50,31 @@ class User(AbstractBaseUser, TimeStampMixin, PermissionsMixin):
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [models.Index(fields=["updated_at"])]
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Saves the user and invalidates the cached lookups of its licence plates, unless
+        only fields which aren't cached with them are saved, like `last_login`.
+        """
+        from src.api.models.licence_plate_cache import (
+            CACHED_USER_FIELDS,
+            invalidate_plates,
+        )
+
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if not adding and (
+            update_fields is None or set(update_fields) & set(CACHED_USER_FIELDS)
+        ):
+            invalidate_plates(
+                *LicencePlate.objects.filter(user_id=self.pk).values_list(
+                    "licence_plate", flat=True
+                )
+            )
+
     def delete(self) -> tuple[int, dict[str, int]]:
         from src.api.models import LicencePlate, Reservation
 
@@ -74,7 +100,7 @@ class User(AbstractBaseUser, TimeStampMixin, PermissionsMixin):
         from src.api.models import Notification
 
         Notification.objects.create(
-            user=self.pk,
+            user=self,
             seen=False,
             title=title,
             content=content,
@@ -109,19 +135,19 @@ class User(AbstractBaseUser, TimeStampMixin, PermissionsMixin):
                 f"You did not show up for the reservation in {reservation.garage.name}, where you booked from {reservation.from_date} to {reservation.to_date}. Therefore your strikes have increased to {self.strikes}. When you receive your third strike, your account will be deactivated for one month.",
             )
 
-    def _generate_log_in_url(self, password: str) -> str:
+    def _generate_log_in_url(self, token: str) -> str:
         """
-        Generates a url for logging into the Frontend application given a generated user's email and password.
+        Generates a url for logging into the Frontend application given a generated user's login token.
         Returns the URL.
         """
-        return f"https://po3backend.ddns.net/app/login?email={self.email}&password={password}"
+        return f"https://po3backend.ddns.net/app/login?token={token}"
 
-    def generate_qr_code(self, password: str) -> None:
+    def generate_qr_code(self, token: str) -> None:
         """
-        Generates a QR-code for logging into the Frontend application given a generated user's email and password.
+        Generates a QR-code for logging into the Frontend application given a generated user's login token.
         The QR-code is saved in the folder qr_codes.
         """
-        img = make(self._generate_log_in_url(password))
+        img = make(self._generate_log_in_url(token))
         img.save(
             os.path.join(
                 os.getcwd(), f"src/api/qr_codes/{self.email.split('@')[0]}.png"
@@ -221,42 +247,96 @@ class User(AbstractBaseUser, TimeStampMixin, PermissionsMixin):
             stripe.Customer.delete(self.stripe_identifier)
 
     def send_invoice(self, licence_plate: LicencePlate) -> None:
+        # Get items to pay for licence plate
+        items, _ = licence_plate.get_prices_to_pay()
+        self.create_invoice(licence_plate.licence_plate, items)
+
+    def create_invoice(
+        self,
+        licence_plate: str,
+        items: list[dict[str, Price | int]],
+        idempotency_key: str | None = None,
+    ) -> None:
+        """
+        Creates and finalizes a Stripe invoice for `licence_plate` with the prices and
+        quantities in `items`, as returned by `LicencePlate.get_prices_to_pay()`. With an
+        `idempotency_key`, a retry after a failure completes the same invoice instead of
+        creating another one. The invoice is only advanced once it's finalized, such that
+        the draft of an attempt which failed halfway is never collected.
+        """
         # Look up a customer in your database
 
         if self.has_automatic_payment:
             stripe_identifier = self.stripe_identifier
-            # Get items to pay for licence plate
-            items, _ = licence_plate.get_prices_to_pay()
+
+            def key(suffix: str) -> dict[str, str]:
+                if idempotency_key is None:
+                    return {}
+                return {"idempotency_key": f"{idempotency_key}-{suffix}"}
 
             # Create an Invoice
             invoice = stripe.Invoice.create(
                 customer=stripe_identifier,
-                auto_advance=True,
+                auto_advance=False,
                 collection_method="charge_automatically",
                 metadata={
                     "user_id": self.pk,
-                    "licence_plate": licence_plate.licence_plate,
+                    "licence_plate": licence_plate,
                 },
+                **key("invoice"),
             )
 
-            for item in items:
+            for line, item in enumerate(items):
                 price: Price = item["price"]  # type: ignore
                 # Create an Invoice Item with the Price and Customer you want to charge
                 stripe.InvoiceItem.create(
                     customer=stripe_identifier,
-                    amount=int(price.price * 100 * item["quantity"]),  # type: ignore
+                    amount=price.amount(item["quantity"]),  # type: ignore
                     description=f'{price.price_string} x{item["quantity"]}',
                     # price=item['price'].stripe_identifier,
                     invoice=invoice.id,
                     currency=price.valuta,
+                    **key(f"item-{line}"),
                 )
 
             # Complete invoice, this will send a request to the webhook view which then can use invoice.pay() to charge
             # the user.
-            invoice.finalize_invoice()
+            invoice.finalize_invoice(auto_advance=True, **key("finalize"))
         else:
             raise BackendException("User is not connected to stripe")
 
+    def invoice_charges(self, charges: list) -> str:
+        """
+        Creates and finalizes a single Stripe invoice for the `Charge`s of the user, with a
+        line per item of every charge, and returns its id. The charges are used as the
+        idempotency key, thus a retry after a failure doesn't invoice them twice. The
+        invoice is only advanced once it's finalized, such that the draft of an attempt
+        which failed halfway is never collected.
+        """
+        if not self.has_automatic_payment:
+            raise BackendException("User is not connected to stripe")
+        ids = ",".join(str(charge.pk) for charge in charges)
+        key = f"charges-{md5(ids.encode()).hexdigest()}"
+        invoice = stripe.Invoice.create(
+            customer=self.stripe_identifier,
+            collection_method="charge_automatically",
+            metadata={"user_id": self.pk, "charges": ids},
+            auto_advance=False,
+            idempotency_key=key,
+        )
+        for charge in charges:
+            for line, item in enumerate(charge.items):
+                stripe.InvoiceItem.create(
+                    customer=self.stripe_identifier,
+                    amount=item["amount"],
+                    description=f"{charge.plate}: {item['description']}",
+                    invoice=invoice.id,
+                    currency=item["currency"],
+                    idempotency_key=f"{key}-{charge.pk}-{line}",
+                )
+        invoice.finalize_invoice(auto_advance=True, idempotency_key=f"{key}-finalize")
+        return invoice.id
+
 
 def _read_qr_code(qr_code_path: str) -> QRCode:
     """
@@ -20,6 +20,18 @@ class OnlyGarageOwners(BasePermission):
             return True
 
 
+class OnlyAdmins(BasePermission):
+    """
+    Global permission to check if the user has the role admin.
+    """
+
+    def has_permission(self, request, view) -> bool:
+        try:
+            return request.user.is_admin
+        except AttributeError:
+            return False
+
+
 class IsGarageOwner(OnlyGarageOwners, BasePermission):
     """
     Object-level permission to only allow owners of the garage to edit it.